@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 from pages import home, acudes, docs, dados, vazoes_dashboard, fale_conosco, o_comite
 from utils.common import render_header, render_footer
+from utils.instrumentacao import iniciar_execucao, finalizar_execucao
 
 # ---------------- CONFIG GERAL ----------------
 st.set_page_config(
@@ -10,6 +11,8 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="collapsed"  # Adicione esta linha
 )
+iniciar_execucao()  # tempos por etapa desta execução (painel com ?debug=1, log em PORTAL_PERFIL_LOG)
+
 # ----------------- BARRA FIXA (HEADER) ------------
 render_header()
 
@@ -41,6 +44,7 @@ with tab7:
 
 # ======================RODAPÉ (GLOBAL)
 render_footer()
+finalizar_execucao()
 
 
 
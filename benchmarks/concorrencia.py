@@ -0,0 +1,127 @@
+"""
+Sessões concorrentes filtrando o mesmo dataset (reservatórios sintéticos).
+
+    python -m benchmarks.concorrencia
+    python -m benchmarks.concorrencia --escala 100 --threads 1 8 --reruns 10
+
+Cada thread simula uma sessão fazendo `--reruns` reruns com uma seleção própria.
+Compara o caminho antigo das páginas (acerto do `st.cache_data`, que devolve uma
+cópia desserializada, + `df.copy()` + filtros encadeados) com o registro de
+utils/registro.py (snapshot compartilhado + uma máscara, alocando só o
+resultado). Registra reruns/s e, numa segunda passada com tracemalloc, o pico de
+memória alocada durante a carga concorrente.
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from benchmarks.executar import PASTA_RESULTADOS, commit_atual, _sem_cache, _CsvLocal
+from benchmarks import dados_sinteticos as sint
+
+import utils.common as common
+from utils.cache import cache_arrow
+from utils.registro import dataset
+
+FAIXA = (10.0, 90.0)
+
+
+def caminho_antigo(corpo):
+    loader = st.cache_data(ttl=3600)(lambda: corpo())
+
+    def rerun(selecao):
+        dff = loader().copy()
+        dff = dff[dff["Reservatório"].isin(selecao)]
+        dff = dff[dff["Percentual"].between(*FAIXA)]
+        return len(dff)
+
+    return loader, rerun
+
+
+def caminho_registro(corpo, pasta):
+    loader = cache_arrow("concorrencia", ttl=3600, pasta=pasta)(lambda: corpo())
+
+    def rerun(selecao):
+        ds = dataset(loader)
+        return len(ds.filtrar(isin={"Reservatório": selecao}, entre={"Percentual": FAIXA}))
+
+    return loader, rerun
+
+
+def carga(rerun, selecoes, threads, reruns):
+    """Executa `reruns` reruns em cada uma das `threads` sessões; devolve o tempo total (s)."""
+    def sessao(i):
+        for _ in range(reruns):
+            rerun(selecoes[i % len(selecoes)])
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(sessao, range(threads)))
+    return time.perf_counter() - t0
+
+
+def medir_caminho(rerun, selecoes, threads, reruns):
+    tempo = carga(rerun, selecoes, threads, reruns)
+    tracemalloc.start()
+    try:
+        carga(rerun, selecoes, threads, reruns)
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    total = threads * reruns
+    return {"reruns": total, "reruns_por_s": round(total / tempo, 1), "ms_por_rerun": round(tempo * 1000 / total, 3),
+            "pico_alocado_bytes": pico}
+
+
+def executar(escala, lista_threads, reruns):
+    leitor = _CsvLocal()
+    leitor.texto = sint.reservatorios_csv(escala)
+    common.ler_csv_remoto = leitor
+    corpo = _sem_cache(common.load_reservatorios_data)
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        for nome, (loader, rerun) in [("st.cache_data + copy", caminho_antigo(corpo)),
+                                      ("registro (mmap + máscara)", caminho_registro(corpo, pasta))]:
+            df = loader()  # aquece o cache fora da medição
+            nomes = sorted(df["Reservatório"].dropna().unique())
+            selecoes = [nomes[i:i + 2] for i in range(0, len(nomes), 2)]
+            resultados[nome] = {"linhas": len(df), "bytes_df": int(df.memory_usage(deep=True).sum())}
+            for threads in lista_threads:
+                resultados[nome][f"{threads} threads"] = medir_caminho(rerun, selecoes, threads, reruns)
+            loader.clear()
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sessões concorrentes: cópias por rerun x registro compartilhado.")
+    parser.add_argument("--escala", type=int, default=10)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--reruns", type=int, default=20, help="reruns por thread")
+    parser.add_argument("--saida", help="arquivo JSON (padrão: benchmarks/resultados/concorrencia_<commit>.json)")
+    args = parser.parse_args(argv)
+
+    commit = commit_atual()
+    resultados = executar(args.escala, args.threads, args.reruns)
+    for nome, r in resultados.items():
+        print(f"{nome}  ({r['linhas']} linhas, {r['bytes_df'] / 2**20:.1f} MiB)")
+        for chave, m in r.items():
+            if isinstance(m, dict):
+                print(f"  {chave:>11}: {m['reruns_por_s']:>9.1f} reruns/s {m['ms_por_rerun']:>9.2f} ms/rerun "
+                      f"{m['pico_alocado_bytes'] / 2**20:>8.1f} MiB pico")
+
+    destino = args.saida or os.path.join(PASTA_RESULTADOS, f"concorrencia_{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump({"commit": commit, "escala": args.escala, "reruns_por_thread": args.reruns, "caminhos": resultados},
+                  f, ensure_ascii=False, indent=2)
+    print(destino)
+
+
+if __name__ == "__main__":
+    main()
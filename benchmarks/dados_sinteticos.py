@@ -0,0 +1,158 @@
+"""
+Geradores de dados sintéticos com o formato das planilhas do portal.
+
+`escala=1` aproxima o tamanho atual de cada planilha; 10 e 100 simulam o
+crescimento (mais histórico nas séries de vazão/simulação, mais açudes nos
+monitorados, mais linhas nos documentos e no roster). Tudo determinístico
+(semente fixa) e offline.
+"""
+import numpy as np
+import pandas as pd
+
+# Tamanho atual aproximado (escala 1)
+VAZOES_RESERVATORIOS = 6
+VAZOES_LEITURAS = 62          # por reservatório (~370 linhas, como GRBANABUIU_VAZÕES.xlsx)
+RESERVATORIOS_ACUDES = 20
+RESERVATORIOS_DIAS = 365
+SIMULACOES_ACUDES = 15
+SIMULACOES_SEMANAS = 52
+DOCS_LINHAS = 150
+ROSTER_LINHAS = 60
+
+# Retângulo da bacia do Banabuiú (lon/lat)
+LON_MIN, LON_MAX = -40.3, -38.5
+LAT_MIN, LAT_MAX = -6.2, -4.6
+
+SEGMENTOS = ["Usuários - Agricultura", "Usuários - Indústria", "Poder Público Municipal",
+             "Poder Público Estadual/Federal", "Sociedade Civil - Comunidades", "Sociedade Civil - Educação"]
+MUNICIPIOS = ["Quixadá", "Quixeramobim", "Banabuiú", "Boa Viagem", "Senador Pompeu", "Pedra Branca",
+              "Mombaça", "Piquet Carneiro", "Madalena", "Monsenhor Tabosa", "Itatira", "Milhã"]
+CLASSIFICACOES = ["Criticidade Alta", "Criticidade Média", "Criticidade Baixa", "Fora de Criticidade", "Normal", ""]
+
+
+def _rng(semente):
+    return np.random.default_rng(semente)
+
+
+def _pontos(rng, n):
+    return rng.uniform(LAT_MIN, LAT_MAX, n).round(5), rng.uniform(LON_MIN, LON_MAX, n).round(5)
+
+
+def _virgula(valores, casas=2):
+    """Número no formato da planilha (vírgula decimal)."""
+    return pd.Series(np.round(valores, casas)).map(lambda v: f"{v:.{casas}f}".replace(".", ","))
+
+
+def vazoes(escala=1, semente=1):
+    """Colunas de carregar_dados_vazoes (Data já convertida, Mês, Operação)."""
+    rng = _rng(semente)
+    leituras = VAZOES_LEITURAS * escala
+    partes = []
+    for i in range(VAZOES_RESERVATORIOS):
+        datas = pd.Timestamp("2024-07-01") + pd.to_timedelta(np.sort(rng.choice(leituras * 4, leituras, replace=False)), unit="D")
+        partes.append(pd.DataFrame({
+            "Reservatório Monitorado": f"Reservatório {i + 1:02d}",
+            "Data": datas,
+            "Vazão Operada": rng.choice([0, 150, 300, 500, 800, 1200], leituras).astype("float64"),
+            "Vazao_Aloc": np.where(rng.random(leituras) < 0.3, 800.0, np.nan),
+            "Operação": rng.choice(["2024.2", "2025.1", "2025.2"], leituras),
+        }))
+    df = pd.concat(partes, ignore_index=True)
+    df["Mês"] = df["Data"].dt.to_period("M").astype(str)
+    return df
+
+
+def vazoes_csv(escala=1, semente=1):
+    """CSV da planilha de vazões (Data em dd/mm/aaaa; Mês é derivado pelo loader)."""
+    df = vazoes(escala, semente).drop(columns=["Mês"])
+    df["Data"] = df["Data"].dt.strftime("%d/%m/%Y")
+    return df.to_csv(index=False)
+
+
+def reservatorios_csv(escala=1, semente=2):
+    """CSV (texto) como exportado pela planilha dos açudes monitorados."""
+    rng = _rng(semente)
+    n_acudes = RESERVATORIOS_ACUDES * escala
+    lat, lon = _pontos(rng, n_acudes)
+    datas = pd.date_range(end="2025-10-01", periods=RESERVATORIOS_DIAS, freq="D")
+    idx_acude = np.repeat(np.arange(n_acudes), len(datas))
+    n = len(idx_acude)
+    percentual = np.clip(rng.normal(45, 30, n), 0, 120)
+    df = pd.DataFrame({
+        "Data de Coleta": np.tile(datas.strftime("%d/%m/%Y"), n_acudes),
+        "Reservatório": [f"Açude {i:04d}" for i in idx_acude],
+        "Município": np.array(MUNICIPIOS)[idx_acude % len(MUNICIPIOS)],
+        "Latitude": _virgula(lat[idx_acude], 5),
+        "Longitude": _virgula(lon[idx_acude], 5),
+        "Volume": _virgula(rng.uniform(0.5, 1500, n)),
+        "Percentual": _virgula(percentual) + "%",
+        "Cota Sangria": _virgula(rng.uniform(100, 300, n)),
+        "Nivel": _virgula(rng.uniform(90, 300, n)),
+    })
+    return df.to_csv(index=False)
+
+
+def situacao_sedes_csv(escala=1, semente=3):
+    """CSV da aba simulacoes_data (Situação das Sedes), com a grafia 'Coordendas' da planilha."""
+    rng = _rng(semente)
+    semanas = SIMULACOES_SEMANAS * escala
+    lat, lon = _pontos(rng, SIMULACOES_ACUDES)
+    datas = pd.date_range(end="2025-10-01", periods=semanas, freq="7D")
+    idx = np.repeat(np.arange(SIMULACOES_ACUDES), semanas)
+    n = len(idx)
+    df = pd.DataFrame({
+        "Data": np.tile(datas.strftime("%d/%m/%Y"), SIMULACOES_ACUDES),
+        "Açude": [f"Açude {i:02d}" for i in idx],
+        "Município": np.array(MUNICIPIOS)[idx % len(MUNICIPIOS)],
+        "Região Hidrográfica": "Banabuiú",
+        "Cota Simulada (m)": rng.uniform(100, 200, n).round(3),
+        "Cota Realizada (m)": rng.uniform(100, 200, n).round(3),
+        "Volume(m³)": rng.uniform(1e5, 1e9, n).round(2),
+        "Volume Observado (m³)": rng.uniform(1e5, 1e9, n).round(2),
+        "Volume (%)": rng.uniform(0, 100, n).round(2),
+        "Evapor. Parcial(mm)": rng.uniform(0, 10, n).round(2),
+        "Cota Interm. (m)": rng.uniform(100, 200, n).round(3),
+        "Liberação (m³/s)": rng.uniform(0, 5, n).round(2),
+        "Liberação (m³)": rng.uniform(0, 1e6, n).round(2),
+        "Classificação": rng.choice(CLASSIFICACOES, n),
+        "Coordendas": [f"{a},{o}" for a, o in zip(lat[idx], lon[idx])],
+    })
+    return df.to_csv(index=False)
+
+
+def docs_csv(escala=1, semente=4):
+    """CSV da planilha de documentos (deliberações/atas)."""
+    rng = _rng(semente)
+    n = DOCS_LINHAS * escala
+    df = pd.DataFrame({
+        "Operação": rng.choice(["2023.2", "2024.1", "2024.2", "2025.1", "2025.2"], n),
+        "Data da Reunião": pd.Series(pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 2000, n), unit="D")).dt.strftime("%d/%m/%Y"),
+        "Reservatório/Sistema": rng.choice([f"Sistema {i}" for i in range(30)], n),
+        "Local da Reunião": rng.choice(MUNICIPIOS, n),
+        "Parâmetros aprovados": "Vazão média de operação conforme ata",
+        "Vazão média": _virgula(rng.uniform(0, 3, n)),
+        "Apresentação": "https://example.org/apresentacao.pdf",
+        "Ata": "https://example.org/ata.pdf",
+    })
+    return df.to_csv(index=False)
+
+
+def roster_csv(escala=1, semente=5):
+    """CSV do roster de representantes do comitê (aba de O Comitê)."""
+    rng = _rng(semente)
+    n = ROSTER_LINHAS * escala
+    lat, lon = _pontos(rng, n)
+    sem_coord = rng.random(n) < 0.05
+    df = pd.DataFrame({
+        "Nome do(a) representante": [f"Representante Número {i} da Silva Sauípe" for i in range(n)],
+        "Sigla": rng.choice(["COGERH", "SRH", "FETRAECE", "SAAE", "STR", "IFCE"], n),
+        "Função": rng.choice(["Titular", "Suplente"], n),
+        "Segmento": rng.choice(SEGMENTOS + [""], n),
+        "Diretoria": rng.choice(["Presidente", "Secretário", "", ""], n),
+        "Município": np.where(rng.random(n) < 0.1, "", rng.choice(MUNICIPIOS, n)),
+        "Mandato": rng.choice(["2021-2025", "2025-2029"], n),
+        "Telefone": "(88) 99999-0000",
+        "E-mail": "representante@example.org",
+        "Coordenadas": np.where(sem_coord, "", [f"{a}, {o}" for a, o in zip(lat, lon)]),
+    })
+    return df.to_csv(index=False)
@@ -0,0 +1,276 @@
+"""
+Suíte de benchmarks do portal (offline).
+
+    python -m benchmarks.executar                     # escalas 1, 10 e 100
+    python -m benchmarks.executar --escalas 1 10 --repeticoes 3
+    python -m benchmarks.executar --comparar antes.json depois.json
+
+Mede os loaders (parse + normalização sobre CSVs sintéticos, sem rede), as
+agregações de vazões, a geração do HTML dos mapas folium e a serialização das
+figuras Plotly. O resultado vai para benchmarks/resultados/<commit>.json, para
+comparar commits entre si.
+"""
+import io
+import os
+import sys
+import json
+import time
+import inspect
+import argparse
+import platform
+import statistics
+import subprocess
+import warnings
+import logging
+from datetime import datetime, timezone
+
+import tempfile
+
+import folium
+import pandas as pd
+import streamlit as st
+import plotly
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Roda a partir da raiz do repositório (caminhos relativos dos GeoJSON/xlsx)
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(RAIZ)
+sys.path.insert(0, RAIZ)
+warnings.filterwarnings("ignore")
+
+from streamlit import logger as st_logger  # noqa: E402
+st_logger.set_log_level(logging.ERROR)  # avisos de "bare mode" fora do `streamlit run`
+
+import utils.common as common  # noqa: E402
+from utils.cache import cache_arrow  # noqa: E402
+import pages.o_comite as o_comite  # noqa: E402
+from pages.acudes import construir_mapa_acudes, status_por_percentual, EstadoPorData  # noqa: E402
+from pages.dados import construir_mapa_sedes  # noqa: E402
+from pages.vazoes_dashboard import volume_acumulado_por_reservatorio, media_ponderada_mensal  # noqa: E402
+from benchmarks import dados_sinteticos as sint  # noqa: E402
+
+PASTA_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+MAX_MARCADORES = 20000  # acima disso o mapa é registrado como pulado (levaria minutos)
+
+
+# ====================== Medição ======================
+def medir(func, repeticoes, preparar=None):
+    """Mediana/mínimo (ms) de `repeticoes` chamadas; `preparar()` roda antes de cada uma, fora do tempo."""
+    tempos, resultado = [], None
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        t0 = time.perf_counter()
+        resultado = func()
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return {"mediana_ms": round(statistics.median(tempos), 3), "min_ms": round(min(tempos), 3)}, resultado
+
+
+def _sem_cache(func):
+    """Função original por baixo de @instrumentar/@st.cache_data/@cache_swr/@registrar_miss."""
+    return inspect.unwrap(func)
+
+
+class _CsvLocal:
+    """Substitui `ler_csv_remoto`: devolve o CSV sintético da vez, com os mesmos kwargs do pd.read_csv."""
+    texto = ""
+
+    def __call__(self, url, **kwargs):
+        return pd.read_csv(io.StringIO(self.texto), **kwargs)
+
+
+def _html_mapa(m):
+    return m.get_root().render()
+
+
+# ====================== Casos ======================
+def casos_loaders(escala, repeticoes):
+    leitor = _CsvLocal()
+    common.ler_csv_remoto = leitor
+    o_comite.ler_csv_remoto = leitor
+    resultados = {}
+    for nome, gerar, loader in [
+        ("loader reservatorios", sint.reservatorios_csv, common.load_reservatorios_data),
+        ("loader situacao_sedes", sint.situacao_sedes_csv, common.load_situacao_sedes_data),
+        ("loader docs", sint.docs_csv, common.load_docs_data),
+        ("loader representantes", sint.roster_csv, o_comite.load_representantes_data),
+    ]:
+        leitor.texto = gerar(escala)
+        r, df = medir(_sem_cache(loader), repeticoes)
+        df = getattr(df, "df", df)
+        r.update(linhas=len(df), bytes_entrada=len(leitor.texto.encode("utf-8")))
+        resultados[nome] = r
+    return resultados
+
+
+def casos_cache(escala, repeticoes):
+    """Acerto de cache do dataset de reservatórios: st.cache_data (unpickle a cada chamada) x snapshot Arrow (mmap)."""
+    leitor = _CsvLocal()
+    common.ler_csv_remoto = leitor
+    leitor.texto = sint.reservatorios_csv(escala)
+    corpo = _sem_cache(common.load_reservatorios_data)
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        for nome, cache in [("hit st.cache_data reservatorios", st.cache_data(ttl=3600)),
+                            ("hit cache_arrow reservatorios", cache_arrow("bench", ttl=3600, pasta=pasta))]:
+            loader = cache(lambda: corpo())
+            df = loader()  # miss fora do tempo
+            r, _ = medir(loader, repeticoes)
+            resultados[nome] = {**r, "linhas": len(df), "bytes_df": int(df.memory_usage(deep=True).sum())}
+            loader.clear()
+    return resultados
+
+
+def casos_geojson(repeticoes):
+    loader = common.load_geojson_data
+    r, camadas = medir(loader, repeticoes, preparar=loader.cache_clear)
+    r["camadas"] = len(camadas)
+    return {"load_geojson_data (frio)": r}
+
+
+def casos_vazoes(escala, repeticoes):
+    df = sint.vazoes(escala)
+    resultados = {}
+    r, _ = medir(lambda: volume_acumulado_por_reservatorio(df), repeticoes)
+    resultados["vazoes volume acumulado"] = {**r, "linhas": len(df)}
+    r, media = medir(lambda: media_ponderada_mensal(df), repeticoes)
+    resultados["vazoes media ponderada mensal"] = {**r, "linhas": len(df)}
+
+    def figura_media():
+        fig = px.bar(media, y="Reservatório Monitorado", x="Vazão Operada", color="MêsRef", orientation="h",
+                     text="Vazão Operada", barmode="stack")
+        return fig.to_json()
+
+    def figura_evolucao():
+        fig = go.Figure()
+        for r_, dfr in df.sort_values("Data").groupby("Reservatório Monitorado"):
+            fig.add_trace(go.Scatter(x=dfr["Data"], y=dfr["Vazão Operada"], mode="lines+markers", name=r_,
+                                     line=dict(shape="hv", width=2)))
+        return fig.to_json()
+
+    for nome, func in [("plotly media mensal (to_json)", figura_media), ("plotly evolucao (to_json)", figura_evolucao)]:
+        r, js = medir(func, repeticoes)
+        resultados[nome] = {**r, "bytes": len(js.encode("utf-8"))}
+    return resultados
+
+
+def _medir_mapa(construir, repeticoes, marcadores, max_marcadores):
+    if marcadores > max_marcadores:
+        return {"pulado": f"{marcadores} marcadores > {max_marcadores}", "marcadores": marcadores}
+    r, html = medir(construir, repeticoes)
+    return {**r, "marcadores": marcadores, "bytes": len(html.encode("utf-8"))}
+
+
+def casos_mapas(escala, repeticoes, max_marcadores=MAX_MARCADORES):
+    resultados = {}
+    geojson_data = common.load_geojson_data()
+
+    leitor = _CsvLocal()
+    common.ler_csv_remoto = leitor
+    leitor.texto = sint.reservatorios_csv(escala)
+    df_res = _sem_cache(common.load_reservatorios_data)()
+    r, df_mapa = medir(lambda: df_res.sort_values("Data de Coleta", ascending=False).drop_duplicates(subset=["Reservatório"]), repeticoes)
+    resultados["acudes df_mapa (sort + drop_duplicates)"] = {**r, "linhas": len(df_res)}
+    r, estado = medir(lambda: EstadoPorData(df_res), repeticoes)
+    resultados["acudes EstadoPorData (montagem por versão)"] = {**r, "linhas": len(df_res)}
+    nomes, fim = list(estado.nomes), df_res["Data de Coleta"].max()
+    r, _ = medir(lambda: df_res.iloc[estado.ultimas(nomes, df_res["Data de Coleta"].min(), fim)], repeticoes)
+    resultados["acudes df_mapa (busca binária)"] = {**r, "linhas": len(df_res), "reservatorios": len(nomes)}
+    resultados["mapa acudes (html)"] = _medir_mapa(
+        lambda: _html_mapa(construir_mapa_acudes(df_mapa, "OpenStreetMap")), repeticoes, len(df_mapa), max_marcadores)
+
+    r, _ = medir(lambda: status_por_percentual(df_res["Percentual"]), repeticoes)
+    resultados["acudes status_por_percentual"] = {**r, "linhas": len(df_res)}
+
+    leitor.texto = sint.situacao_sedes_csv(escala)
+    dff = _sem_cache(common.load_situacao_sedes_data)()
+    latlon = dff["Coordenadas"].astype(str).str.split(",", n=1, expand=True)
+    dff["Latitude"] = pd.to_numeric(latlon[0], errors="coerce")
+    dff["Longitude"] = pd.to_numeric(latlon[1], errors="coerce")
+    classes = list(dff["Classificação Padronizada"].cat.categories)
+    resultados["mapa sedes (html)"] = _medir_mapa(
+        lambda: _html_mapa(construir_mapa_sedes(dff, geojson_data, classes, "OpenStreetMap")), repeticoes, len(dff), max_marcadores)
+
+    o_comite.ler_csv_remoto = leitor
+    leitor.texto = sint.roster_csv(escala)
+    pontos = _sem_cache(o_comite.load_representantes_data)().df.dropna(subset=["Latitude", "Longitude"])
+    for nome, adicionar in [("mapa representantes por segmento (html)", o_comite.adicionar_marcadores_por_segmento),
+                            ("mapa representantes agrupado (html)", o_comite.adicionar_marcadores_agrupados)]:
+        def construir(adicionar=adicionar):
+            m = folium.Map(location=[-5.2, -39.5], zoom_start=8)
+            adicionar(m, pontos)
+            return _html_mapa(m)
+        resultados[nome] = _medir_mapa(construir, repeticoes, len(pontos), max_marcadores)
+    return resultados
+
+
+# ====================== Execução ======================
+def commit_atual():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        sujo = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+        return sha + ("-sujo" if sujo else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "sem-git"
+
+
+def executar(escalas, repeticoes, max_marcadores=MAX_MARCADORES):
+    saida = {
+        "commit": commit_atual(),
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "ambiente": {"python": platform.python_version(), "pandas": pd.__version__, "plotly": plotly.__version__,
+                     "plataforma": platform.platform()},
+        "repeticoes": repeticoes,
+        "resultados": {"geral": casos_geojson(repeticoes)},
+    }
+    for escala in escalas:
+        print(f"escala {escala}x...", file=sys.stderr)
+        resultados = {}
+        resultados.update(casos_loaders(escala, repeticoes))
+        resultados.update(casos_cache(escala, repeticoes))
+        resultados.update(casos_vazoes(escala, repeticoes))
+        resultados.update(casos_mapas(escala, repeticoes, max_marcadores))
+        saida["resultados"][f"{escala}x"] = resultados
+    return saida
+
+
+def comparar(antes, depois):
+    """Tabela com a razão depois/antes da mediana de cada caso presente nos dois arquivos."""
+    with open(antes, encoding="utf-8") as f:
+        a = json.load(f)
+    with open(depois, encoding="utf-8") as f:
+        d = json.load(f)
+    print(f"{a['commit']} → {d['commit']}")
+    for grupo, casos in d["resultados"].items():
+        for caso, r in casos.items():
+            base = a["resultados"].get(grupo, {}).get(caso)
+            if not base or "mediana_ms" not in base or "mediana_ms" not in r:
+                continue
+            razao = r["mediana_ms"] / base["mediana_ms"] if base["mediana_ms"] else float("nan")
+            print(f"{grupo:>6}  {caso:<42} {base['mediana_ms']:>10.1f} → {r['mediana_ms']:>10.1f} ms  ({razao:.2f}x)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks offline do portal.")
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--max-marcadores", type=int, default=MAX_MARCADORES)
+    parser.add_argument("--saida", help="arquivo JSON (padrão: benchmarks/resultados/<commit>.json)")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"))
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    saida = executar(args.escalas, args.repeticoes, args.max_marcadores)
+    destino = args.saida or os.path.join(PASTA_RESULTADOS, f"{saida['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump(saida, f, ensure_ascii=False, indent=2)
+    print(destino)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Memória residente do cache global de GeoJSON: árvore de dicts (`json.load`,
+como era) versus a forma compacta de `load_geojson_data` (arrays NumPy).
+
+    python -m benchmarks.memoria_geojson
+
+Cada modo roda em subprocessos limpos; mede o acréscimo de RSS (/proc) e, em
+outro subprocesso (o tracemalloc infla o RSS), da memória alocada em Python,
+depois de importar o app e carregar as camadas.
+"""
+import os
+import sys
+import gc
+import json
+import argparse
+import subprocess
+import tracemalloc
+
+from benchmarks.executar import RAIZ, PASTA_RESULTADOS, commit_atual
+
+MODOS = ["dicts", "compacta", "compacta + materializada"]
+
+
+def rss_bytes():
+    """RSS atual do processo (Linux); None em outros sistemas."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _carregar_dicts():
+    arquivos = ["trechos_perene.geojson", "Açudes_Monitorados.geojson", "Sedes_Municipais.geojson",
+                "c_gestoras.geojson", "poligno_municipios.geojson", "bacia_banabuiu.geojson",
+                "pontos_controle.geojson", "situa_municipio.geojson"]
+    dados = {}
+    for nome in arquivos:
+        try:
+            with open(os.path.join("data", nome), "r", encoding="utf-8") as f:
+                dados[nome] = json.load(f)
+        except FileNotFoundError:
+            dados[nome] = {}
+    return dados
+
+
+def medir_modo(modo, com_tracemalloc):
+    """Roda dentro do subprocesso: importa o app, mede a base e carrega as camadas no modo pedido."""
+    os.chdir(RAIZ)
+    sys.path.insert(0, RAIZ)
+    import utils.common as common  # noqa: F401  (importa streamlit/pandas antes da base)
+
+    gc.collect()
+    if com_tracemalloc:
+        tracemalloc.start()
+    rss0 = rss_bytes()
+    if modo == "dicts":
+        retidos = _carregar_dicts()
+    else:
+        retidos = common.load_geojson_data()
+        if modo == "compacta + materializada":
+            retidos = (retidos, [retidos[nome] for nome in retidos])
+    gc.collect()
+    if com_tracemalloc:
+        return {"tracemalloc_bytes": tracemalloc.get_traced_memory()[0]}
+    rss1 = rss_bytes()
+    return {"rss_bytes": rss1 - rss0 if rss0 is not None and rss1 is not None else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memória do cache de GeoJSON (dicts x compacta).")
+    parser.add_argument("--modo", choices=MODOS, help=argparse.SUPPRESS)  # uso interno (subprocesso)
+    parser.add_argument("--tracemalloc", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--saida", help="arquivo JSON (padrão: benchmarks/resultados/memoria_geojson_<commit>.json)")
+    args = parser.parse_args(argv)
+
+    if args.modo:
+        print(json.dumps(medir_modo(args.modo, args.tracemalloc)))
+        return
+
+    resultados = {}
+    for modo in MODOS:
+        r = resultados[modo] = {}
+        for extra in ([], ["--tracemalloc"]):
+            proc = subprocess.run([sys.executable, "-m", "benchmarks.memoria_geojson", "--modo", modo, *extra],
+                                  cwd=RAIZ, capture_output=True, text=True, check=True)
+            r.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+        rss = f"{r['rss_bytes'] / 2**20:7.1f} MiB RSS" if r["rss_bytes"] is not None else ""
+        print(f"{modo:<26} {r['tracemalloc_bytes'] / 2**20:7.1f} MiB alocados {rss}")
+
+    commit = commit_atual()
+    destino = args.saida or os.path.join(PASTA_RESULTADOS, f"memoria_geojson_{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump({"commit": commit, "modos": resultados}, f, ensure_ascii=False, indent=2)
+    print(destino)
+
+
+if __name__ == "__main__":
+    main()
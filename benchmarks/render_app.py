@@ -0,0 +1,208 @@
+"""
+Custo de um rerun completo do app (as sete abas), sem navegador e sem rede.
+
+    python -m benchmarks.render_app
+    python -m benchmarks.render_app --escala 10 --sem-tracemalloc
+
+Roda `app.py` com o `AppTest` do Streamlit, trocando os downloads das planilhas
+do Google por CSVs sintéticos (benchmarks/dados_sinteticos.py). Para cada
+cenário (primeira execução, rerun sem mudanças e interações típicas) registra
+o tempo total, o pico de memória alocada (tracemalloc), o tempo de cada aba
+(pela instrumentação de utils/instrumentacao.py) e os bytes dos elementos
+emitidos por aba e por tipo (markdown, iframe do folium, JSON dos gráficos...).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+from benchmarks.executar import RAIZ, PASTA_RESULTADOS, commit_atual
+from benchmarks import dados_sinteticos as sint
+
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.element_tree import Block
+
+import utils.conexoes as conexoes
+import utils.instrumentacao as instrumentacao
+
+APP = os.path.join(RAIZ, "app.py")
+TIMEOUT = 300
+
+# Ordem das abas em app.py → função que renderiza cada uma
+RENDERS = ["render_home", "render_vazoes_dashboard", "render_acudes", "render_dados",
+           "render_docs", "render_fale_conosco", "render_o_comite"]
+
+# Trecho do ID da planilha → gerador do CSV sintético
+PLANILHAS = {
+    "1pbNcZ9hS8DhotdkYuPc8kIOy5dgyoYQb384-jgqLDfA": sint.vazoes_csv,
+    "1zZ0RCyYj-AzA_dhWzxRziDWjgforbaH7WIoSEd2EKdk": sint.reservatorios_csv,
+    "1-Tn_ZDHH-mNgJAY1WtjWd_Pyd2f5kv_ZU8dhL0caGDI": sint.docs_csv,
+    "1C40uaNmLUeu-k_FGEPZOgF8FwpSU00C9PtQu8Co4AUI": sint.situacao_sedes_csv,
+    "14Hb7N5yq4u-B3JN8Stpvpbdlt3sL0JxWUYpJK4fzLV8": sint.roster_csv,
+}
+
+
+def instalar_planilhas_locais(escala=1):
+    """Troca `utils.conexoes.baixar` (usado por todos os loaders) por CSVs sintéticos em memória."""
+    conteudos = {chave: gerar(escala).encode("utf-8") for chave, gerar in PLANILHAS.items()}
+
+    def baixar_local(url, timeout=None):
+        for chave, conteudo in conteudos.items():
+            if chave in url:
+                return conteudo
+        raise ConnectionError(f"Sem fixture local para {url}")
+
+    conexoes.baixar = baixar_local
+
+
+# ====================== Interações ======================
+def _na_aba(at, i, tipo, rotulo):
+    """Widget `tipo` com o rótulo dado dentro da aba `i` (os rótulos se repetem entre abas)."""
+    for w in getattr(at.tabs[i], tipo):
+        if w.label == rotulo:
+            return w
+    raise LookupError(f"{tipo} '{rotulo}' não encontrado na aba {i}")
+
+
+def _segunda_opcao(w):
+    return w.set_value(w.options[1] if len(w.options) > 1 else w.options[0])
+
+
+CENARIOS = {
+    "vazoes: um reservatório": lambda at: at.multiselect(key="estacoes_vazao").set_value(
+        at.multiselect(key="estacoes_vazao").options[:1]),
+    "vazoes: trocar unidade": lambda at: _segunda_opcao(at.selectbox(key="unidade_vazao")),
+    "vazoes: próxima página da tabela": lambda at: at.number_input(key="tabela_vazao_pagina").increment(),
+    "acudes: trocar mapa de fundo": lambda at: _segunda_opcao(_na_aba(at, 2, "selectbox", "Estilo do Mapa:")),
+    "sedes: uma classificação": lambda at: (lambda w: w.set_value(w.options[:1]))(
+        _na_aba(at, 3, "multiselect", "Classificação")),
+    "docs: busca por texto": lambda at: _na_aba(at, 4, "text_input", "Buscar em todos os campos").input("Sistema 1"),
+    "comite: mapa agrupado": lambda at: _na_aba(at, 6, "toggle", "Agrupar marcadores (modo rápido)").set_value(True),
+}
+
+
+# ====================== Medição ======================
+def _elementos(no):
+    if isinstance(no, Block):
+        for filho in no.children.values():
+            yield from _elementos(filho)
+    else:
+        yield no
+
+
+def bytes_por_tipo(no):
+    """Bytes do proto de cada elemento (o que vai ao navegador), somados por tipo."""
+    tipos = {}
+    for e in _elementos(no):
+        proto = getattr(e, "proto", None)
+        tamanho = proto.ByteSize() if hasattr(proto, "ByteSize") else 0
+        t = tipos.setdefault(e.type, {"elementos": 0, "bytes": 0})
+        t["elementos"] += 1
+        t["bytes"] += tamanho
+    return dict(sorted(tipos.items(), key=lambda kv: -kv[1]["bytes"]))
+
+
+def _ultima_linha(log):
+    with open(log, encoding="utf-8") as f:
+        linhas = f.read().splitlines()
+    return json.loads(linhas[-1]) if linhas else {"etapas": []}
+
+
+def medir_execucao(at, log, com_tracemalloc=True):
+    """Roda o script uma vez e devolve tempo, pico de memória, tempo por aba e bytes emitidos."""
+    if com_tracemalloc:
+        tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    at.run(timeout=TIMEOUT)
+    total_ms = (time.perf_counter() - t0) * 1000
+    pico = tracemalloc.get_traced_memory()[1] if com_tracemalloc else None
+
+    etapas = {e["etapa"]: e for e in _ultima_linha(log)["etapas"] if e.get("nivel") == 0}
+    abas, bytes_abas = {}, 0
+    for i, tab in enumerate(at.tabs):
+        por_tipo = bytes_por_tipo(tab)
+        total_bytes = sum(t["bytes"] for t in por_tipo.values())
+        bytes_abas += total_bytes
+        abas[tab.label] = {"ms": etapas.get(RENDERS[i], {}).get("ms"), "bytes": total_bytes, "por_tipo": por_tipo}
+    bytes_total = sum(t["bytes"] for t in bytes_por_tipo(at._tree).values())
+    return {
+        "total_ms": round(total_ms, 1),
+        "pico_memoria_bytes": pico,
+        "bytes_emitidos": bytes_total,
+        "bytes_fora_das_abas": bytes_total - bytes_abas,
+        "excecoes": [e.value for e in at.exception],
+        "abas": abas,
+    }
+
+
+def _novo_app():
+    return AppTest.from_file(APP, default_timeout=TIMEOUT)
+
+
+def executar(escala=1, com_tracemalloc=True, cenarios=None):
+    instalar_planilhas_locais(escala)
+    fd, log = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    instrumentacao.PERFIL_LOG = log  # cada execução grava suas etapas aqui
+    if com_tracemalloc:
+        tracemalloc.start()
+    resultados = {}
+    try:
+        at = _novo_app()
+        print("primeira execução...", file=sys.stderr)
+        resultados["primeira execução (caches frios)"] = medir_execucao(at, log, com_tracemalloc)
+        resultados["rerun sem mudanças"] = medir_execucao(at, log, com_tracemalloc)
+
+        for nome, interagir in CENARIOS.items():
+            if cenarios and nome not in cenarios:
+                continue
+            print(f"{nome}...", file=sys.stderr)
+            at = _novo_app()
+            at.run(timeout=TIMEOUT)
+            try:
+                interagir(at)
+            except (LookupError, IndexError, AttributeError) as e:
+                resultados[nome] = {"pulado": f"{type(e).__name__}: {e}"}
+                continue
+            resultados[nome] = medir_execucao(at, log, com_tracemalloc)
+    finally:
+        if com_tracemalloc:
+            tracemalloc.stop()
+        os.remove(log)
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Custo de rerun do app completo (AppTest, offline).")
+    parser.add_argument("--escala", type=int, default=1)
+    parser.add_argument("--sem-tracemalloc", action="store_true", help="mede só o tempo (tracemalloc deixa o script mais lento)")
+    parser.add_argument("--cenarios", nargs="*", help="subconjunto das interações (nomes de CENARIOS)")
+    parser.add_argument("--saida", help="arquivo JSON (padrão: benchmarks/resultados/render_<commit>.json)")
+    args = parser.parse_args(argv)
+
+    commit = commit_atual()
+    saida = {
+        "commit": commit,
+        "escala": args.escala,
+        "tracemalloc": not args.sem_tracemalloc,
+        "cenarios": executar(args.escala, not args.sem_tracemalloc, args.cenarios),
+    }
+    destino = args.saida or os.path.join(PASTA_RESULTADOS, f"render_{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump(saida, f, ensure_ascii=False, indent=2)
+
+    for nome, r in saida["cenarios"].items():
+        if "pulado" in r:
+            print(f"{nome:<40} pulado ({r['pulado']})")
+            continue
+        pico = f"{r['pico_memoria_bytes'] / 2**20:8.1f} MiB" if r["pico_memoria_bytes"] is not None else ""
+        print(f"{nome:<40} {r['total_ms']:>9.0f} ms {r['bytes_emitidos'] / 1024:>9.0f} KiB {pico}")
+    print(destino)
+
+
+if __name__ == "__main__":
+    main()
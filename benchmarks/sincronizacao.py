@@ -0,0 +1,92 @@
+"""
+Sincronização incremental da planilha de vazões contra uma API do Sheets falsa (local).
+
+    python -m benchmarks.sincronizacao
+    python -m benchmarks.sincronizacao --escala 100
+
+A API falsa (`PlanilhaFalsa`, em tests/planilha_falsa.py) responde a
+`valores("A2:E")` e `valores_lote([...])` como o gspread e exporta o CSV
+completo, servindo os dados sintéticos da escala pedida. Para cada
+cenário (sem mudanças, linhas novas, correção recente, remoção no meio,
+correção antiga + leitura completa) compara o sincronizador de
+utils/sincronizacao.py com a exportação CSV: bytes transferidos, pedidos, tempo
+e se o DataFrame resultante é igual ao do CSV.
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+
+from benchmarks.executar import PASTA_RESULTADOS, commit_atual
+from benchmarks import dados_sinteticos as sint
+
+import utils.conexoes as conexoes
+from utils.sincronizacao import SincronizadorPlanilha
+from tests.planilha_falsa import PlanilhaFalsa
+
+# ====================== Cenários (alteram a planilha) ======================
+def _nova_linha(planilha, i):
+    ultima = planilha.linhas[-1]
+    return [ultima[0], f"{(i % 28) + 1:02d}/12/2099", "123.0", "100.0", ultima[4] if len(ultima) > 4 else ""]
+
+
+CENARIOS = [
+    ("sem mudanças", lambda p: None, False),
+    ("5 linhas novas no fim", lambda p: p.linhas.extend(_nova_linha(p, i) for i in range(5)), False),
+    ("correção numa linha recente", lambda p: p.linhas[-10].__setitem__(2, "999.5"), False),
+    ("linha removida no meio", lambda p: p.linhas.pop(len(p.linhas) // 2), False),
+    # Fora das chaves e da janela: só a leitura completa periódica pega
+    ("correção numa linha antiga", lambda p: p.linhas[3].__setitem__(2, "0.5"), False),
+    ("leitura completa periódica", lambda p: None, True),
+]
+
+
+def executar(escala):
+    planilha = PlanilhaFalsa(sint.vazoes_csv(escala))
+    conexoes.baixar = lambda url, timeout=None: planilha.exportar_csv()
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        delta = SincronizadorPlanilha("vazoes", url_csv="csv", fonte=planilha, pasta=pasta)
+        so_csv = SincronizadorPlanilha("vazoes_csv", url_csv="csv", pasta=pasta, intervalo_completo=0)
+        for nome, alterar, completo in [("carga inicial", lambda p: None, False)] + CENARIOS:
+            alterar(planilha)
+            medidas = {}
+            for caminho, sincronizador, forcar in [("csv", so_csv, False), ("delta", delta, completo)]:
+                planilha.zerar_contadores()
+                t0 = time.perf_counter()
+                r = sincronizador.sincronizar(completo=forcar)
+                medidas[caminho] = {"ms": round((time.perf_counter() - t0) * 1000, 2), "modo": r.modo,
+                                    "bytes": planilha.bytes_servidos, "chamadas": planilha.chamadas,
+                                    "alteradas": r.alteradas, "df": r.df}
+            referencia = medidas["csv"].pop("df")
+            medidas["delta"]["igual_ao_csv"] = bool(medidas["delta"].pop("df").equals(referencia))
+            medidas["linhas"] = len(referencia)
+            resultados[nome] = medidas
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sincronização incremental x CSV completo (API do Sheets falsa).")
+    parser.add_argument("--escala", type=int, default=10)
+    parser.add_argument("--saida", help="arquivo JSON (padrão: benchmarks/resultados/sincronizacao_<commit>.json)")
+    args = parser.parse_args(argv)
+
+    commit = commit_atual()
+    resultados = executar(args.escala)
+    for nome, r in resultados.items():
+        c, d = r["csv"], r["delta"]
+        print(f"{nome:<30} csv {c['bytes'] / 1024:>8.1f} KiB {c['ms']:>8.1f} ms | "
+              f"{d['modo']:<8} {d['bytes'] / 1024:>8.1f} KiB {d['ms']:>8.1f} ms "
+              f"{d['alteradas']:>5} alteradas  igual={d['igual_ao_csv']}")
+
+    destino = args.saida or os.path.join(PASTA_RESULTADOS, f"sincronizacao_{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump({"commit": commit, "escala": args.escala, "cenarios": resultados}, f, ensure_ascii=False, indent=2)
+    print(destino)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,230 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import folium
 import json
 import base64
-from datetime import datetime
-from streamlit_folium import folium_static
 from folium.plugins import Fullscreen, MousePosition
-from utils.common import load_reservatorios_data, load_geojson_data
+from utils.common import load_reservatorios_data, load_geojson_data, load_rios_perenizados_data, camada_simplificada
+from utils.exportacao import botoes_exportacao
+from utils.instrumentacao import instrumentar, medir
+from utils.registro import dataset
+from utils.derivados import derivado, mapa_folium
+from utils.spatial_index import indice_da_camada
 
+# Faixas de status pelo percentual do volume: (mínimo, máximo, cor, status)
+faixas_percentual = [(0, 10, "#808080", "Muito Crítica"), (10.1, 30, "#FF0000", "Crítica"), (30.1, 50, "#FFFF00", "Alerta"), (50.1, 70, "#008000", "Confortável"), (70.1, 100, "#0000FF", "Muito Confortável"), (100.1, float("inf"), "#800080", "Vertendo")]
+_FAIXA_MIN = np.array([f[0] for f in faixas_percentual], dtype=float)
+_FAIXA_MAX = np.array([f[1] for f in faixas_percentual], dtype=float)
+_FAIXA_COR = np.array([f[2] for f in faixas_percentual] + ["#FFFFFF", "#FFFFFF"], dtype=object)
+_FAIXA_STATUS = np.array([f[3] for f in faixas_percentual] + ["Não classificado", "N/A"], dtype=object)
+_FAIXA_TEXTO = np.where(np.isin(_FAIXA_COR, ["#808080", "#FF0000", "#0000FF", "#800080"]), "#FFFFFF", "#000000")
+
+
+def status_por_percentual(percentual):
+    """
+    Cor, status e cor do texto para cada percentual, por busca binária nas faixas
+    (sem chamada Python por linha). Fora de qualquer faixa → "Não classificado"; NaN → "N/A".
+    """
+    p = pd.to_numeric(pd.Series(percentual), errors="coerce").to_numpy(dtype=float)
+    pos = np.searchsorted(_FAIXA_MIN, p, side="right") - 1
+    dentro = (pos >= 0) & (p <= _FAIXA_MAX[pos.clip(0)])
+    codigo = np.where(dentro, pos, len(faixas_percentual))
+    codigo[np.isnan(p)] = len(faixas_percentual) + 1
+    return pd.DataFrame(
+        {"Cor": _FAIXA_COR[codigo], "Status": _FAIXA_STATUS[codigo], "TextColor": _FAIXA_TEXTO[codigo]},
+        index=getattr(percentual, "index", None),
+    )
+
+
+class EstadoPorData:
+    """
+    Última leitura de cada reservatório até uma data, montada uma vez por versão
+    do dataset: as linhas ordenadas por (reservatório, data) com uma chave inteira
+    crescente (código do reservatório × posto da data). Uma consulta é uma busca
+    binária por reservatório, todas num só `np.searchsorted`
+    (O(reservatórios · log n)), sem ordenar nem filtrar o DataFrame.
+    """
+
+    def __init__(self, df):
+        codigos, self.nomes = pd.factorize(df["Reservatório"], sort=True)  # -1 = sem nome
+        datas = df["Data de Coleta"].to_numpy(dtype="datetime64[ns]")
+        validos = np.flatnonzero(codigos >= 0)
+        # Na mesma data, a linha que vem antes em df fica por último: é ela que a busca escolhe
+        ordem = validos[np.lexsort((-validos, datas[validos], codigos[validos]))]
+        self.datas_unicas = np.unique(datas[ordem])
+        self.largura = len(self.datas_unicas) + 1
+        self.chave = codigos[ordem].astype(np.int64) * self.largura + np.searchsorted(self.datas_unicas, datas[ordem])
+        self.posicoes = ordem  # posições (iloc) em df
+        self.datas = datas[ordem]
+        self.percentual = pd.to_numeric(df["Percentual"], errors="coerce").to_numpy(dtype=float)[ordem]
+        self.municipio = df["Município"].to_numpy(dtype=object)[ordem]
+        # Reservatórios com alguma leitura em cada município (o filtro de município descarta o resto sem busca)
+        pares = pd.DataFrame({"m": self.municipio, "c": codigos[ordem]}).dropna().drop_duplicates()
+        self.codigos_por_municipio = {m: g.to_numpy() for m, g in pares.groupby("m")["c"]}
+
+    def _atende(self, i, municipio, faixa):
+        m = np.ones(len(i), dtype=bool)
+        if municipio is not None:
+            m &= self.municipio[i] == municipio
+        if faixa is not None:
+            p = self.percentual[i]
+            m &= (p >= faixa[0]) & (p <= faixa[1])  # NaN não passa, como no filtro da tabela
+        return m
+
+    def ultimas(self, reservatorios, inicio, fim, municipio=None, faixa=None):
+        """
+        Posições (iloc) da última leitura de cada reservatório em [inicio, fim] que
+        atende ao município e à faixa de percentual, da mais recente para a mais antiga
+        (datas iguais: a linha que vem antes em df, como em `sort_values` + `drop_duplicates`).
+        """
+        codigos = self.nomes.get_indexer(list(reservatorios))
+        codigos = codigos[codigos >= 0]
+        if municipio is not None:
+            codigos = codigos[np.isin(codigos, self.codigos_por_municipio.get(municipio, []))]
+        base = codigos.astype(np.int64) * self.largura
+        posto_ini = np.searchsorted(self.datas_unicas, np.datetime64(inicio, "ns"), side="left")
+        posto_fim = np.searchsorted(self.datas_unicas, np.datetime64(fim, "ns"), side="right")
+        lo = np.searchsorted(self.chave, base + posto_ini, side="left")
+        hi = np.searchsorted(self.chave, base + posto_fim, side="left")
+        lo, hi = lo[hi > lo], hi[hi > lo]
+
+        # Quase sempre a leitura mais recente atende; senão, a última do trecho que atende
+        escolhidas = hi - 1
+        falhas = np.flatnonzero(~self._atende(escolhidas, municipio, faixa))
+        if falhas.size:
+            tamanhos = hi[falhas] - lo[falhas]
+            inicios = np.cumsum(tamanhos) - tamanhos
+            linhas = np.repeat(lo[falhas] - inicios, tamanhos) + np.arange(tamanhos.sum())
+            candidatas = np.where(self._atende(linhas, municipio, faixa), linhas, -1)
+            escolhidas[falhas] = np.maximum.reduceat(candidatas, inicios)
+            escolhidas = escolhidas[escolhidas >= 0]
+        # Data decrescente e, no empate, a ordem de df (como sort_values + drop_duplicates)
+        escolhidas = escolhidas[np.lexsort((-self.posicoes[escolhidas], self.datas[escolhidas]))[::-1]]
+        return self.posicoes[escolhidas]
+
+
+def estilos_por_linha(df, cores, cores_texto):
+    """Matriz de CSS (linhas × colunas de `df`) para `Styler.apply(axis=None)`, montada de uma vez."""
+    css = "background-color: " + np.asarray(cores, dtype=object) + "; color: " + np.asarray(cores_texto, dtype=object) + "; font-weight: bold;"
+    return pd.DataFrame(np.repeat(css[:, None], df.shape[1], axis=1), index=df.index, columns=df.columns)
+
+
+# ===================== Mapa =====================
+TILE_CONFIG = {
+    "OpenStreetMap": {"tiles": "OpenStreetMap", "attr": '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a>'},
+    "Stamen Terrain": {"tiles": "https://stamen-tiles.a.ssl.fastly.net/terrain/{z}/{x}/{y}.png", "attr": 'Map tiles by <a href="http://stamen.com">Stamen Design</a>'},
+    "CartoDB positron": {"tiles": "https://cartodb-basemaps-a.global.ssl.fastly.net/light_all/{z}/{x}/{y}.png", "attr": '&copy; <a href="https://carto.com/attributions">CARTO</a>'},
+    "CartoDB dark_matter": {"tiles": "https://cartodb-basemaps-a.global.ssl.fastly.net/dark_all/{z}/{x}/{y}.png", "attr": '&copy; <a href="https://carto.com/attributions">CARTO</a>'},
+    "Esri Satellite": {"tiles": "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}", "attr": "Tiles &copy; Esri — Source: Esri"},
+    "Stamen Toner": {"tiles": "https://stamen-tiles-a.a.ssl.fastly.net/toner/{z}/{x}/{y}.png", "attr": 'Map tiles by <a href="http://stamen.com">Stamen Design</a>'},
+}
+
+
+def get_marker_color(percentual):
+    if pd.isna(percentual) or 0 <= percentual <= 10: return "#808080"
+    if 10.1 <= percentual <= 30: return "#FF0000"
+    if 30.1 <= percentual <= 50: return "#FFFF00"
+    if 50.1 <= percentual <= 70: return "#008000"
+    if 70.1 <= percentual <= 100: return "#0000FF"
+    return "#800080"
+
+def create_svg_icon(color, size=15):
+    svg = (
+        f'<svg width="{size}" height="{size}" viewBox="0 0 100 100" '
+        f'xmlns="http://www.w3.org/2000/svg">'
+        f'<polygon points="50,0 100,100 0,100" fill="{color}" '
+        f'stroke="#000000" stroke-width="5"/></svg>'
+    )
+    svg_b64 = base64.b64encode(svg.encode("utf-8")).decode("utf-8")
+    return f"data:image/svg+xml;base64,{svg_b64}"
+
+
+def construir_mapa_acudes(df_mapa, tile_option):
+    """Mapa folium dos açudes: bacia, comissões gestoras, municípios, rios perenizados e um marcador por reservatório (com o ponto de controle mais próximo)."""
+    geojson_data = load_geojson_data()
+    geojson_bacia = geojson_data.get('geojson_bacia', {})
+    geojson_c_gestoras = geojson_data.get('geojson_c_gestoras', {})
+    geojson_poligno = camada_simplificada('geojson_poligno') if 'geojson_poligno' in geojson_data else {}
+
+    mapa_center = [df_mapa["Latitude"].mean(), df_mapa["Longitude"].mean()]
+    m = folium.Map(location=mapa_center, zoom_start=9, tiles=None)
+    folium.TileLayer(tiles=TILE_CONFIG[tile_option]["tiles"], attr=TILE_CONFIG[tile_option]["attr"], name=tile_option).add_to(m)
+    if geojson_bacia:
+        folium.GeoJson(geojson_bacia, name="Bacia do Banabuiú", style_function=lambda x: {"color": "blue", "weight": 2, "fillOpacity": 0.1}, tooltip=folium.GeoJsonTooltip(fields=["DESCRICA1"], aliases=["Bacia:"])).add_to(m)
+    
+    gestoras_layer = folium.FeatureGroup(name="Comissões Gestoras", show=False)
+    if geojson_c_gestoras:
+        for feature in geojson_c_gestoras["features"]:
+            props = feature["properties"]
+            lon, lat = feature["geometry"]["coordinates"]
+            nome_g = props.get("SISTEMAH3", "Sem nome")
+            popup_info = (f"<div style='font-family: \"Segoe UI\", Arial, sans-serif; padding: 12px; "f"background: white; border-radius: 8px; box-shadow: 0 2px 8px rgba(0,0,0,0.1); "f"border-top: 4px solid #228B22; min-width: 200px;'>"f"<div style='font-size: 16px; font-weight: 600; color: #2c3e50; margin-bottom: 8px;'>{nome_g}</div>"f"<div style='margin: 6px 0;'><div style='font-weight: 500; color: #7f8c8d;'>Ano de Formação</div>"f"<div style='color: #2c3e50;'>{props.get('ANOFORMA1','N/A')}</div></div>"f"<div style='margin: 6px 0;'><div style='font-weight: 500; color: #7f8c8d;'>Sistema</div>"f"<div style='color: #2c3e50;'>{props.get('SISTEMAH3','N/A')}</div></div>"f"<div style='margin: 6px 0;'><div style='font-weight: 500; color: #7f8c8d;'>Município</div>"f"<div style='color: #228B22; font-weight: 500;'>{props.get('MUNICIPI6','N/A')}</div></div>"f"</div>")
+            folium.Marker([lat, lon], icon=folium.CustomIcon("https://cdn-icons-png.flaticon.com/512/4144/4144517.png", icon_size=(30, 30)), tooltip=nome_g, popup=folium.Popup(popup_info, max_width=300)).add_to(gestoras_layer)
+        gestoras_layer.add_to(m)
+
+    municipios_layer = folium.FeatureGroup(name="Polígonos Municipais", show=False)
+    if geojson_poligno:
+        folium.GeoJson(geojson_poligno, tooltip=folium.GeoJsonTooltip(fields=["DESCRICA1"], aliases=["Município:"]), style_function=lambda x: {"fillOpacity": 0, "color": "blue", "weight": 1}).add_to(municipios_layer)
+        municipios_layer.add_to(m)
+
+    rios_layer = folium.FeatureGroup(name="Rios Perenizados", show=False)
+    for gj_rio in load_rios_perenizados_data().values():
+        if gj_rio.get("features"):
+            folium.GeoJson(gj_rio, style_function=lambda x: {"color": "#1E90FF", "weight": 2.5, "opacity": 0.9}, tooltip=folium.GeoJsonTooltip(fields=["Name"], aliases=["Trecho:"])).add_to(rios_layer)
+    rios_layer.add_to(m)
+
+    # Ponto de controle mais próximo de cada açude (haversine, uma consulta em lote)
+    pontos_controle = []
+    if 'geojson_pontos' in geojson_data:
+        idx_pontos = indice_da_camada('geojson_pontos')
+        mais_prox, dist_km = idx_pontos.mais_proximos(df_mapa["Longitude"].to_numpy(), df_mapa["Latitude"].to_numpy())
+        if mais_prox.shape[1]:
+            pontos_controle = [
+                f"{idx_pontos.propriedade(int(i), 'Name', 'Sem nome')} ({f'{d:.1f}'.replace('.', ',')} km)" if np.isfinite(d) else "N/A"
+                for i, d in zip(mais_prox[:, 0], dist_km[:, 0])
+            ]
+
+    for pos, (_, row) in enumerate(df_mapa.iterrows()):
+        percentual_val = float(row.get("Percentual", "nan"))
+        percentual_str = f"{percentual_val:.2f}%" if not pd.isna(percentual_val) else "N/A"
+        volume_str = f"{float(row.get('Volume', 'nan')):,.2f} hm³".replace(",", "X").replace(".", ",").replace("X", ".") if not pd.isna(row.get('Volume', None)) else "N/A"
+        cota_sangria_str = f"{float(row.get('Cota Sangria', 'nan')):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") if not pd.isna(row.get('Cota Sangria', None)) else "N/A"
+        ultima_data = row["Data de Coleta"]  # df_mapa já traz a última leitura de cada reservatório
+        data_formatada = ultima_data.strftime("%d/%m/%Y") if pd.notnull(ultima_data) else "N/A"
+        icon_color = get_marker_color(percentual_val)
+        popup_content = (
+            '<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.3/css/all.min.css">'
+            f"<div style='font-family: \"Segoe UI\", sans-serif; width: 280px; background: linear-gradient(to bottom, #f9f9f9, #ffffff); border-radius: 8px; border-left: 5px solid {icon_color}; padding: 12px; box-shadow: 0 3px 10px rgba(0,0,0,0.2);'>"
+            f"<div style='color: #006400; font-size: 18px; font-weight: 700; margin-bottom: 10px; border-bottom: 1px solid #e0e0e0; padding-bottom: 8px;'>"
+            f"<i class='fas fa-water' style='margin-right: 8px;'></i>{row['Reservatório']}</div>"
+            f"<div style='margin-bottom: 8px;'><span style='display: inline-block; width: 100px; font-weight: 600; color: #555;'><i class='fas fa-calendar-alt' style='margin-right: 5px;'></i>Data:</span>"
+            f"<span style='color: #333;'>{data_formatada}</span></div>"
+            f"<div style='margin-bottom: 8px;'><span style='display: inline-block; width: 100px; font-weight: 600; color: #555;'><i class='fas fa-city' style='margin-right: 5px;'></i>Município:</span>"
+            f"<span style='color: #333;'>{row.get('Município', 'N/A')}</span></div>"
+            f"<div style='margin-bottom: 8px;'><span style='display: inline-block; width: 100px; font-weight: 600; color: #555;'><i class='fas fa-chart-bar' style='margin-right: 5px;'></i>Volume:</span>"
+            f"<span style='color: #1a5276; font-weight: 500;'>{volume_str}</span></div>"
+            f"<div style='margin-bottom: 8px;'><span style='display: inline-block; width: 100px; font-weight: 600; color: #555;'><i class='fas fa-percentage' style='margin-right: 5px;'></i>Percentual:</span>"
+            f"<span style='color: #27ae60; font-weight: 600;'>{percentual_str}</span></div>"
+            f"<div style='margin-bottom: 8px;'><span style='display: inline-block; width: 100px; font-weight: 600; color: #555;'><i class='fas fa-ruler' style='margin-right: 5px;'></i>Cota Sangria:</span>"
+            f"<span style='color: #7d3c98; font-weight: 500;'>{cota_sangria_str} m</span></div>"
+            + (f"<div style='margin-bottom: 8px;'><span style='display: inline-block; width: 100px; font-weight: 600; color: #555;'><i class='fas fa-map-pin' style='margin-right: 5px;'></i>Ponto de controle:</span>"
+               f"<span style='color: #333;'>{pontos_controle[pos]}</span></div>" if pontos_controle else "")
+            + "</div>"
+        )
+        folium.Marker(
+            location=[row["Latitude"], row["Longitude"]],
+            popup=folium.Popup(popup_content, max_width=300),
+            icon=folium.CustomIcon(create_svg_icon(icon_color), icon_size=(15, 15), icon_anchor=(7, 7)),
+            tooltip=f"{row['Reservatório']} - {data_formatada}",
+        ).add_to(m)
+    folium.LayerControl().add_to(m)
+    Fullscreen(position="topleft").add_to(m)
+    MousePosition(position="bottomleft").add_to(m)
+    return m
+
+
+@instrumentar()
 def render_acudes():
     st.title("🗺️ Açudes Monitorados")
     st.markdown(
@@ -24,7 +241,8 @@ def render_acudes():
         unsafe_allow_html=True,
     )
 
-    df_full = load_reservatorios_data()
+    ds = dataset(load_reservatorios_data)
+    df_full = ds.df
     if df_full.empty:
         st.warning("Não foi possível carregar os dados dos reservatórios.")
         return
@@ -40,13 +258,13 @@ def render_acudes():
                 min_value=min_date, max_value=max_date
             )
         with col2:
-            reservatorios = sorted(df_full["Reservatório"].dropna().astype(str).unique())
+            reservatorios = ds.opcoes("Reservatório")
             reservatorio_filtro = st.multiselect(
                 "Reservatório(s):", options=reservatorios,
                 default=reservatorios, placeholder="Selecione..."
             )
         with col3:
-            municipios = ["Todos"] + sorted(df_full["Município"].dropna().astype(str).unique().tolist())
+            municipios = ["Todos"] + ds.opcoes("Município")
             municipio_filtro = st.selectbox("Município:", options=municipios, index=0)
 
         perc_series = df_full["Percentual"].dropna()
@@ -67,18 +285,27 @@ def render_acudes():
 
     # --- Aplicar filtros ---
     if not reservatorio_filtro: reservatorio_filtro = reservatorios
-    mask = (
-        (df_full["Data de Coleta"].dt.date >= start_date) &
-        (df_full["Data de Coleta"].dt.date <= end_date) &
-        (df_full["Reservatório"].astype(str).isin(reservatorio_filtro)) &
-        (df_full["Percentual"].between(perc_range[0], perc_range[1], inclusive="both"))
-    )
-    df_filtrado = df_full.loc[mask].copy()
-
-    if municipio_filtro != "Todos":
-        df_filtrado = df_filtrado[df_filtrado["Município"].astype(str) == municipio_filtro].copy()
+    # Período inclusivo até o fim do último dia, comparando os datetime64 direto (sem .dt.date)
+    fim_periodo = pd.Timestamp(end_date) + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+    def preparar_filtrado():
+        dff = ds.filtrar(
+            isin={"Reservatório": reservatorio_filtro, "Município": [] if municipio_filtro == "Todos" else [municipio_filtro]},
+            entre={"Data de Coleta": (pd.Timestamp(start_date), fim_periodo), "Percentual": perc_range},
+        )
+        if not dff.empty:
+            dff[["Cor", "Status", "TextColor"]] = status_por_percentual(dff["Percentual"])
+            dff["Sangria"] = dff["Cota Sangria"] - dff["Nivel"]
+        return dff
 
-    df_mapa = df_filtrado.sort_values("Data de Coleta", ascending=False).drop_duplicates(subset=["Reservatório"]).copy()
+    # Derivados reaproveitados entre reruns enquanto o conteúdo dos dados e os filtros não mudam (compartilhados: não alterar)
+    chave_filtros = (date_range, reservatorio_filtro, municipio_filtro, perc_range)
+    df_filtrado = derivado("acudes_filtrado", chave_filtros, preparar_filtrado, depende_de=(ds,))
+    # Estado de cada açude na data final: busca binária na estrutura da versão, sem ordenar o histórico
+    estado = ds.derivado("estado_por_data", EstadoPorData)
+    df_mapa = ds.df.iloc[estado.ultimas(
+        reservatorio_filtro, pd.Timestamp(start_date), fim_periodo,
+        municipio=None if municipio_filtro == "Todos" else municipio_filtro, faixa=perc_range,
+    )]
 
     # ===================== Mapa Interativo =====================
     st.subheader("🌍 Mapa dos Açudes")
@@ -88,95 +315,11 @@ def render_acudes():
             ["OpenStreetMap", "Stamen Terrain", "Stamen Toner", "CartoDB positron", "CartoDB dark_matter", "Esri Satellite"],
             index=0
         )
-    geojson_data = load_geojson_data()
-    geojson_bacia = geojson_data.get('geojson_bacia', {})
-    geojson_c_gestoras = geojson_data.get('geojson_c_gestoras', {})
-    geojson_poligno = geojson_data.get('geojson_poligno', {})
-
-    tile_config = {
-        "OpenStreetMap": {"tiles": "OpenStreetMap", "attr": '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a>'},
-        "Stamen Terrain": {"tiles": "https://stamen-tiles.a.ssl.fastly.net/terrain/{z}/{x}/{y}.png", "attr": 'Map tiles by <a href="http://stamen.com">Stamen Design</a>'},
-        "CartoDB positron": {"tiles": "https://cartodb-basemaps-a.global.ssl.fastly.net/light_all/{z}/{x}/{y}.png", "attr": '&copy; <a href="https://carto.com/attributions">CARTO</a>'},
-        "CartoDB dark_matter": {"tiles": "https://cartodb-basemaps-a.global.ssl.fastly.net/dark_all/{z}/{x}/{y}.png", "attr": '&copy; <a href="https://carto.com/attributions">CARTO</a>'},
-        "Esri Satellite": {"tiles": "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}", "attr": "Tiles &copy; Esri — Source: Esri"},
-        "Stamen Toner": {"tiles": "https://stamen-tiles-a.a.ssl.fastly.net/toner/{z}/{x}/{y}.png", "attr": 'Map tiles by <a href="http://stamen.com">Stamen Design</a>'},
-    }
-
-    def get_marker_color(percentual):
-        if pd.isna(percentual) or 0 <= percentual <= 10: return "#808080"
-        if 10.1 <= percentual <= 30: return "#FF0000"
-        if 30.1 <= percentual <= 50: return "#FFFF00"
-        if 50.1 <= percentual <= 70: return "#008000"
-        if 70.1 <= percentual <= 100: return "#0000FF"
-        return "#800080"
-
-    def create_svg_icon(color, size=15):
-        svg = (
-            f'<svg width="{size}" height="{size}" viewBox="0 0 100 100" '
-            f'xmlns="http://www.w3.org/2000/svg">'
-            f'<polygon points="50,0 100,100 0,100" fill="{color}" '
-            f'stroke="#000000" stroke-width="5"/></svg>'
-        )
-        svg_b64 = base64.b64encode(svg.encode("utf-8")).decode("utf-8")
-        return f"data:image/svg+xml;base64,{svg_b64}"
-
     if not df_filtrado.empty:
-        mapa_center = [df_mapa["Latitude"].mean(), df_mapa["Longitude"].mean()]
-        m = folium.Map(location=mapa_center, zoom_start=9, tiles=None)
-        folium.TileLayer(tiles=tile_config[tile_option]["tiles"], attr=tile_config[tile_option]["attr"], name=tile_option).add_to(m)
-        if geojson_bacia:
-            folium.GeoJson(geojson_bacia, name="Bacia do Banabuiú", style_function=lambda x: {"color": "blue", "weight": 2, "fillOpacity": 0.1}, tooltip=folium.GeoJsonTooltip(fields=["DESCRICA1"], aliases=["Bacia:"])).add_to(m)
-        
-        gestoras_layer = folium.FeatureGroup(name="Comissões Gestoras", show=False)
-        if geojson_c_gestoras:
-            for feature in geojson_c_gestoras["features"]:
-                props = feature["properties"]
-                lon, lat = feature["geometry"]["coordinates"]
-                nome_g = props.get("SISTEMAH3", "Sem nome")
-                popup_info = (f"<div style='font-family: \"Segoe UI\", Arial, sans-serif; padding: 12px; "f"background: white; border-radius: 8px; box-shadow: 0 2px 8px rgba(0,0,0,0.1); "f"border-top: 4px solid #228B22; min-width: 200px;'>"f"<div style='font-size: 16px; font-weight: 600; color: #2c3e50; margin-bottom: 8px;'>{nome_g}</div>"f"<div style='margin: 6px 0;'><div style='font-weight: 500; color: #7f8c8d;'>Ano de Formação</div>"f"<div style='color: #2c3e50;'>{props.get('ANOFORMA1','N/A')}</div></div>"f"<div style='margin: 6px 0;'><div style='font-weight: 500; color: #7f8c8d;'>Sistema</div>"f"<div style='color: #2c3e50;'>{props.get('SISTEMAH3','N/A')}</div></div>"f"<div style='margin: 6px 0;'><div style='font-weight: 500; color: #7f8c8d;'>Município</div>"f"<div style='color: #228B22; font-weight: 500;'>{props.get('MUNICIPI6','N/A')}</div></div>"f"</div>")
-                folium.Marker([lat, lon], icon=folium.CustomIcon("https://cdn-icons-png.flaticon.com/512/4144/4144517.png", icon_size=(30, 30)), tooltip=nome_g, popup=folium.Popup(popup_info, max_width=300)).add_to(gestoras_layer)
-            gestoras_layer.add_to(m)
-
-        municipios_layer = folium.FeatureGroup(name="Polígonos Municipais", show=False)
-        if geojson_poligno:
-            folium.GeoJson(geojson_poligno, tooltip=folium.GeoJsonTooltip(fields=["DESCRICA1"], aliases=["Município:"]), style_function=lambda x: {"fillOpacity": 0, "color": "blue", "weight": 1}).add_to(municipios_layer)
-            municipios_layer.add_to(m)
-
-        for _, row in df_mapa.iterrows():
-            percentual_val = float(row.get("Percentual", "nan"))
-            percentual_str = f"{percentual_val:.2f}%" if not pd.isna(percentual_val) else "N/A"
-            volume_str = f"{float(row.get('Volume', 'nan')):,.2f} hm³".replace(",", "X").replace(".", ",").replace("X", ".") if not pd.isna(row.get('Volume', None)) else "N/A"
-            cota_sangria_str = f"{float(row.get('Cota Sangria', 'nan')):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") if not pd.isna(row.get('Cota Sangria', None)) else "N/A"
-            ultima_data = df_filtrado[df_filtrado["Reservatório"] == row["Reservatório"]]["Data de Coleta"].max()
-            data_formatada = ultima_data.strftime("%d/%m/%Y") if pd.notnull(ultima_data) else "N/A"
-            icon_color = get_marker_color(percentual_val)
-            popup_content = (
-                '<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.3/css/all.min.css">'
-                f"<div style='font-family: \"Segoe UI\", sans-serif; width: 280px; background: linear-gradient(to bottom, #f9f9f9, #ffffff); border-radius: 8px; border-left: 5px solid {icon_color}; padding: 12px; box-shadow: 0 3px 10px rgba(0,0,0,0.2);'>"
-                f"<div style='color: #006400; font-size: 18px; font-weight: 700; margin-bottom: 10px; border-bottom: 1px solid #e0e0e0; padding-bottom: 8px;'>"
-                f"<i class='fas fa-water' style='margin-right: 8px;'></i>{row['Reservatório']}</div>"
-                f"<div style='margin-bottom: 8px;'><span style='display: inline-block; width: 100px; font-weight: 600; color: #555;'><i class='fas fa-calendar-alt' style='margin-right: 5px;'></i>Data:</span>"
-                f"<span style='color: #333;'>{data_formatada}</span></div>"
-                f"<div style='margin-bottom: 8px;'><span style='display: inline-block; width: 100px; font-weight: 600; color: #555;'><i class='fas fa-city' style='margin-right: 5px;'></i>Município:</span>"
-                f"<span style='color: #333;'>{row.get('Município', 'N/A')}</span></div>"
-                f"<div style='margin-bottom: 8px;'><span style='display: inline-block; width: 100px; font-weight: 600; color: #555;'><i class='fas fa-chart-bar' style='margin-right: 5px;'></i>Volume:</span>"
-                f"<span style='color: #1a5276; font-weight: 500;'>{volume_str}</span></div>"
-                f"<div style='margin-bottom: 8px;'><span style='display: inline-block; width: 100px; font-weight: 600; color: #555;'><i class='fas fa-percentage' style='margin-right: 5px;'></i>Percentual:</span>"
-                f"<span style='color: #27ae60; font-weight: 600;'>{percentual_str}</span></div>"
-                f"<div style='margin-bottom: 8px;'><span style='display: inline-block; width: 100px; font-weight: 600; color: #555;'><i class='fas fa-ruler' style='margin-right: 5px;'></i>Cota Sangria:</span>"
-                f"<span style='color: #7d3c98; font-weight: 500;'>{cota_sangria_str} m</span></div>"
-                "</div>"
-            )
-            folium.Marker(
-                location=[row["Latitude"], row["Longitude"]],
-                popup=folium.Popup(popup_content, max_width=300),
-                icon=folium.CustomIcon(create_svg_icon(icon_color), icon_size=(15, 15), icon_anchor=(7, 7)),
-                tooltip=f"{row['Reservatório']} - {data_formatada}",
-            ).add_to(m)
-        folium.LayerControl().add_to(m)
-        Fullscreen(position="topleft").add_to(m)
-        MousePosition(position="bottomleft").add_to(m)
-        folium_static(m, width=1200)
+        with medir("mapa folium"):
+            mapa_folium("acudes_mapa_html", (chave_filtros, tile_option),
+                        lambda: construir_mapa_acudes(df_mapa, tile_option),
+                        depende_de=(ds,), width=1200)
     else:
         st.warning("Não há reservatórios com os filtros aplicados.")
 
@@ -185,25 +328,9 @@ def render_acudes():
     st.markdown("---")    
     st.subheader("📊 Dados Detalhados Interativos")
     if not df_filtrado.empty:
-        faixas_percentual = [(0, 10, "#808080", "Muito Crítica"), (10.1, 30, "#FF0000", "Crítica"), (30.1, 50, "#FFFF00", "Alerta"), (50.1, 70, "#008000", "Confortável"), (70.1, 100, "#0000FF", "Muito Confortável"), (100.1, float("inf"), "#800080", "Vertendo")]
-        def get_status_color(percentual):
-            if pd.isna(percentual): return "#FFFFFF", "N/A", "#000000"
-            for min_val, max_val, color, status in faixas_percentual:
-                if min_val <= percentual <= max_val:
-                    text_color = "#FFFFFF" if color in ["#808080", "#FF0000", "#0000FF", "#800080"] else "#000000"
-                    return color, status, text_color
-            return "#FFFFFF", "Não classificado", "#000000"
-
-        df_filtrado[["Cor", "Status", "TextColor"]] = df_filtrado["Percentual"].apply(lambda x: pd.Series(get_status_color(x)))
-        df_filtrado["Sangria"] = df_filtrado["Cota Sangria"] - df_filtrado["Nivel"]
         colunas_exibir = ["Data de Coleta", "Reservatório", "Município", "Volume", "Percentual", "Status", "Cota Sangria", "Nivel", "Sangria"]
-        def colorize_row(row):
-            idx = row.name
-            bg_color = df_filtrado.loc[idx, "Cor"]
-            text_color = df_filtrado.loc[idx, "TextColor"]
-            return [f"background-color: {bg_color}; color: {text_color}; font-weight: bold;" for _ in row]
-
-        styled_df = df_filtrado[colunas_exibir].copy().style.apply(colorize_row, axis=1)
+        tabela = df_filtrado[colunas_exibir]
+        styled_df = tabela.style.apply(estilos_por_linha, axis=None, cores=df_filtrado["Cor"], cores_texto=df_filtrado["TextColor"])
 
         column_config = {"Percentual": st.column_config.ProgressColumn("Percentual", format="%.1f%%", min_value=0, max_value=100), "Volume": st.column_config.NumberColumn("Volume", format="%.2f hm³"), "Cota Sangria": st.column_config.NumberColumn("Cota Sangria", format="%.2f m"), "Nivel": st.column_config.NumberColumn("Nível", format="%.2f m"), "Sangria": st.column_config.NumberColumn("Margem de Sangria", format="%.2f m"), "Status": st.column_config.TextColumn("Status"), "Data de Coleta": st.column_config.DateColumn("Data de Coleta", format="DD/MM/YYYY")}
         st.dataframe(styled_df, column_config=column_config, use_container_width=True, hide_index=True, height=600, column_order=colunas_exibir)
@@ -233,7 +360,11 @@ def render_acudes():
             st.warning("Não há dados de volume para o(s) reservatório(s) selecionado(s) no período.")
         st.markdown("---")
         with st.expander("📥 Opções de Download", expanded=False):
-            st.download_button(label="Baixar dados completos (CSV)", data=df_filtrado.drop(columns=["Cor", "Status", "TextColor"]).to_csv(index=False, encoding="utf-8-sig", sep=";"), file_name=f"reservatorios_{datetime.now().strftime('%Y%m%d')}.csv", mime="text/csv")
+            botoes_exportacao(
+                df_filtrado.drop(columns=["Cor", "Status", "TextColor"]), "reservatorios",
+                formatos=("csv", "parquet", "geojson"),
+                filtros={"periodo": date_range, "reservatorios": reservatorio_filtro, "municipio": municipio_filtro},
+            )
     else:
         st.warning("⚠️ Nenhum dado encontrado com os filtros aplicados.", icon="⚠️")
 
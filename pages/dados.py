@@ -2,15 +2,148 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 import folium
 import json
-from streamlit_folium import folium_static
 from folium.plugins import Fullscreen, MousePosition
-from utils.common import load_geojson_data
+from utils.common import load_geojson_data, load_situacao_sedes_data
+from utils.spatial_index import indice_da_camada
+from utils.exportacao import botoes_exportacao
+from utils.classificacao import situa_por_classificacao, situa_filtrada, codigos_selecionados, cor_da_classificacao, CATEGORIAS, CORES_POR_CODIGO
+from utils.instrumentacao import instrumentar, medir
+from utils.registro import dataset
+from utils.derivados import derivado, mapa_folium
 
 st.set_page_config(layout="wide")
 
+# Configurações dos tiles
+TILE_CONFIG = {
+    "OpenStreetMap": {"tiles": "OpenStreetMap", "attr": '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a>'},
+    "Stamen Terrain": {"tiles": "https://stamen-tiles.a.ssl.fastly.net/terrain/{z}/{x}/{y}.png", "attr": 'Map tiles by <a href="http://stamen.com">Stamen Design</a>'},
+    "CartoDB positron": {"tiles": "https://cartodb-basemaps-a.global.ssl.fastly.net/light_all/{z}/{x}/{y}.png", "attr": '&copy; <a href="https://carto.com/attributions">CARTO</a>'},
+    "CartoDB dark_matter": {"tiles": "https://cartodb-basemaps-a.global.ssl.fastly.net/dark_all/{z}/{x}/{y}.png", "attr": '&copy; <a href="https://carto.com/attributions">CARTO</a>'},
+    "Esri Satellite": {"tiles": "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}", "attr": "Tiles &copy; Esri — Source: Esri"},
+    "Stamen Toner": {"tiles": "https://stamen-tiles-a.a.ssl.fastly.net/toner/{z}/{x}/{y}.png", "attr": 'Map tiles by <a href="http://stamen.com">Stamen Design</a>'},
+}
+
+
+def construir_mapa_sedes(dff, geojson_data, classificacao_sel, tile_option):
+    """Mapa folium da situação: bacia (enquadramento), sedes, situação filtrada por classificação e açudes."""
+    # GeoJSONs adicionais
+    geojson_bacia = geojson_data.get('geojson_bacia', {})
+    geojson_sedes = geojson_data.get('geojson_sedes', {})
+
+    # Configuração inicial do mapa (será sobrescrita pelo fit_bounds da bacia)
+    if not dff.empty and {'Latitude', 'Longitude'}.issubset(dff.columns):
+        start_center = [float(dff['Latitude'].mean()), float(dff['Longitude'].mean())]
+    else:
+        start_center = [-5.2, -39.5]  # Coordenadas padrão
+
+    m = folium.Map(location=start_center, zoom_start=9, tiles=None)
+    folium.TileLayer(
+        tiles=TILE_CONFIG[tile_option]["tiles"],
+        attr=TILE_CONFIG[tile_option]["attr"],
+        name=tile_option
+    ).add_to(m)
+
+    # --- Camada da Bacia + centralização (fit_bounds) ---
+    if geojson_bacia:
+        folium.GeoJson(
+            geojson_bacia,
+            name="Bacia do Banabuiú",
+            style_function=lambda x: {"color": "blue", "weight": 2, "fillOpacity": 0.1},
+            tooltip=folium.GeoJsonTooltip(fields=["DESCRICA1"], aliases=["Bacia:"])
+        ).add_to(m)
+
+        # Centraliza o mapa nos limites da bacia (bbox cacheado no índice espacial)
+        bounds = indice_da_camada("geojson_bacia").bounds()
+        if bounds:
+            m.fit_bounds(bounds)
+
+    # --- Sedes Municipais ---
+    if geojson_sedes and isinstance(geojson_sedes, dict) and "features" in geojson_sedes:
+        sedes_layer = folium.FeatureGroup(name="Sedes Municipais", show=True)
+        for feature in geojson_sedes["features"]:
+            props = feature.get("properties", {})
+            geom  = feature.get("geometry", {})
+            coords = geom.get("coordinates", [])
+            if geom.get("type") == "Point" and isinstance(coords, (list, tuple)) and len(coords) >= 2:
+                nome = props.get("NOME_MUNIC", "Sem nome")
+                try:
+                    lat, lon = float(coords[1]), float(coords[0])
+                    folium.Marker(
+                        [lat, lon],
+                        icon=folium.CustomIcon(
+                            "https://cdn-icons-png.flaticon.com/512/854/854878.png",
+                            icon_size=(25, 25)
+                        ),
+                        tooltip=nome
+                    ).add_to(sedes_layer)
+                except Exception:
+                    continue
+        sedes_layer.add_to(m)
+
+    # --- Situação da Bacia (filtrada): união das partições selecionadas ---
+    geojson_situa_filtrado = situa_filtrada(classificacao_sel)
+    if geojson_situa_filtrado:
+        situa_group = folium.FeatureGroup(name="Situação da Bacia", show=True)
+        folium.GeoJson(
+            geojson_situa_filtrado,
+            style_function=lambda feature: {
+                'fillColor': cor_da_classificacao(feature.get('properties', {}).get('Classificação')),
+                'color': '#555555',
+                'weight': 1.5,
+                'fillOpacity': 0.7,
+                'opacity': 0.9
+            },
+            tooltip=folium.GeoJsonTooltip(
+                fields=['Classificação'],
+                aliases=['Classificação:'],
+                sticky=True
+            )
+        ).add_to(situa_group)
+        situa_group.add_to(m)
+
+    # --- Marcadores dos Açudes ---
+    if not dff.empty and {'Latitude', 'Longitude'}.issubset(dff.columns):
+        # Cor de cada linha direto pelo código da categoria
+        cores_marcadores = CORES_POR_CODIGO[dff["Classificação Padronizada"].cat.codes.to_numpy()]
+        for (_, row), color_marker in zip(dff.iterrows(), cores_marcadores):
+            try:
+                lat = float(row['Latitude']); lon = float(row['Longitude'])
+            except Exception:
+                continue
+            classificacao = row.get('Classificação', 'Sem classificação')
+            popup_html = f"""
+            <div style="font-family: Arial, sans-serif; font-size: 14px;">
+                <h4 style="margin:0; padding:0; color: #2c3e50;">{row.get('Açude', 'N/A')}</h4>
+                <p><b>Município:</b> {row.get('Município', 'N/A')}</p>
+                <p><b>Cota Simulada:</b> {row.get('Cota Simulada (m)', 'N/A')} m</p>
+                <p><b>Cota Realizada:</b> {row.get('Cota Realizada (m)', 'N/A')} m</p>
+                <p><b>Volume:</b> {row.get('Volume(m³)', 'N/A')} m³</p>
+                <p><b>Classificação:</b> <span style="color: {color_marker}; font-weight: bold;">{classificacao}</span></p>
+            </div>
+            """
+            folium.CircleMarker(
+                location=[lat, lon],
+                radius=6,
+                color=color_marker,
+                fill=True,
+                fill_color=color_marker,
+                fill_opacity=0.9,
+                tooltip=row.get('Açude', 'N/A'),
+                popup=folium.Popup(popup_html, max_width=300)
+            ).add_to(m)
+
+    # --- Controles e render ---
+    Fullscreen().add_to(m)
+    MousePosition(position="bottomleft", separator=" | ", num_digits=4).add_to(m)
+    folium.LayerControl(collapsed=False).add_to(m)
+    return m
+
+
+@instrumentar()
 def render_dados():
     
     st.title("📈 Situação das Sedes Municipais")
@@ -27,12 +160,9 @@ def render_dados():
 </div>
 """, unsafe_allow_html=True)
 
-    google_sheet_url = "https://docs.google.com/spreadsheets/d/1C40uaNmLUeu-k_FGEPZOgF8FwpSU00C9PtQu8Co4AUI/gviz/tq?tqx=out:csv&sheet=simulacoes_data"
     try:
-        df = pd.read_csv(google_sheet_url)
-        df['Data'] = pd.to_datetime(df['Data'], format='%d/%m/%Y', errors='coerce')
-        if 'Coordendas' in df.columns:
-            df.rename(columns={'Coordendas': 'Coordenadas'}, inplace=True)
+        ds = dataset(load_situacao_sedes_data)
+        df = ds.df
     except Exception as e:
         st.error(f"Erro ao carregar os dados da planilha. Verifique se o link está correto e se a planilha está pública. Detalhes do erro: {e}")
         return
@@ -43,29 +173,11 @@ def render_dados():
 
 # ---------- Integração das opções de Classificação com o GeoJSON ----------
     geojson_data = load_geojson_data()
-    geojson_situa = geojson_data.get('geojson_situa', {})
-
-    def _get_geo_classes(gj: dict) -> set:
-        classes = set()
-        if isinstance(gj, dict) and gj.get('type') == 'FeatureCollection':
-            for f in gj.get('features', []):
-                props = (f.get('properties') or {})
-                for k in ['Classificação', 'classificacao', 'CLASSIFICACAO', 'classificação', 'situacao', 'SITUACAO']:
-                    if k in props and pd.notna(props[k]):
-                        classes.add(str(props[k]).strip())
-                        break
-        return classes
-
-    def _get_classificacao_from_props(props: dict):
-        """Obtém a classificação de um feature do GeoJSON a partir de suas propriedades"""
-        for k in ['Classificação', 'classificacao', 'CLASSIFICACAO', 'classificação', 'situacao', 'SITUACAO']:
-            if k in props and pd.notna(props[k]):
-                return str(props[k]).strip()
-        return None
-
-    geo_classes = _get_geo_classes(geojson_situa)
-    opcoes_classificacao_df = set(df["Classificação"].dropna().astype(str).str.strip().tolist())
-    opcoes_classificacao = sorted(opcoes_classificacao_df.union(geo_classes))
+
+    # Camada de situação já particionada por classificação (montada uma vez por processo)
+    geo_classes = set(situa_por_classificacao().keys())
+    presentes = geo_classes.union(df["Classificação Padronizada"].dropna().unique())
+    opcoes_classificacao = [c for c in CATEGORIAS if c in presentes]
 
     # ---------- Estilos dos filtros ----------
     st.markdown("""
@@ -89,10 +201,10 @@ def render_dados():
 
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                opcoes_acudes = sorted(df["Açude"].dropna().unique().tolist())
+                opcoes_acudes = ds.opcoes("Açude")
                 acudes_sel = st.multiselect("Açude", options=opcoes_acudes, default=[])
             with col2:
-                opcoes_municipios = sorted(df["Município"].dropna().unique().tolist())
+                opcoes_municipios = ds.opcoes("Município")
                 municipios_sel = st.multiselect("Município", options=opcoes_municipios, default=[])
             with col3:
                 classificacao_sel = st.multiselect("Classificação", options=opcoes_classificacao, default=opcoes_classificacao)
@@ -114,60 +226,53 @@ def render_dados():
         st.markdown("</div>", unsafe_allow_html=True)
 
     # ---------- Aplicação dos filtros ----------
-    def padronizar_classificacao(valor):
-        """Padroniza os valores de classificação para comparação"""
-        if pd.isna(valor):
-            return "sem classificação"
-        valor = str(valor).strip().lower()
-        if "fora" in valor and "criticidade" in valor:
-            return "fora de criticidade"
-        return valor
-
-    # Aplica os filtros de forma consistente
-    dff = df.copy()
-
-    # Filtro de Açudes
-    if acudes_sel:
-        dff = dff[dff["Açude"].isin(acudes_sel)]
-
-    # Filtro de Municípios
-    if municipios_sel:
-        dff = dff[dff["Município"].isin(municipios_sel)]
-
-    # Filtro de Classificação (com tratamento especial para "Fora de Criticidade")
-    if classificacao_sel:
-        # Padroniza os valores selecionados
-        classificacoes_filtradas = [padronizar_classificacao(c) for c in classificacao_sel]
-        
-        # Aplica o filtro com valores padronizados
-        dff = dff[dff["Classificação"].apply(padronizar_classificacao).isin(classificacoes_filtradas)]
-
-    # Filtro de Período
+    filtro_periodo = {}
     if periodo:
         if len(periodo) == 1:
             ini = fim = pd.to_datetime(periodo[0])
         else:
             ini, fim = [pd.to_datetime(d) for d in periodo]
-        dff = dff[(dff["Data"] >= ini) & (dff["Data"] <= fim)]
+        filtro_periodo["Data"] = (ini, fim)
+
+    def preparar_dff():
+        # Classificação: comparação direta dos códigos da categoria padronizada
+        mascara_classificacao = None
+        if classificacao_sel:
+            mascara_classificacao = np.isin(df["Classificação Padronizada"].cat.codes.to_numpy(), codigos_selecionados(classificacao_sel))
+
+        # Uma única máscara sobre a base compartilhada (sem copiar o DataFrame inteiro)
+        dff = ds.filtrar(
+            isin={"Açude": acudes_sel, "Município": municipios_sel},
+            entre=filtro_periodo,
+            mascara_extra=mascara_classificacao,
+        )
+        if dff.empty:
+            return dff
+
+        # Latitude/Longitude a partir de "Coordenadas"
+        if 'Coordenadas' in dff.columns:
+            try:
+                dff[['Latitude', 'Longitude']] = dff['Coordenadas'].astype(str).str.split(',', expand=True).astype(float)
+            except Exception:
+                # fallback mais tolerante
+                latlon = dff['Coordenadas'].astype(str).str.split(',', n=1, expand=True)
+                dff['Latitude'] = pd.to_numeric(latlon[0], errors='coerce')
+                dff['Longitude'] = pd.to_numeric(latlon[1], errors='coerce')
+
+        return dff.sort_values(["Açude", "Data"])
+
+    # Reaproveitado entre reruns enquanto dados e filtros não mudam; a cópia rasa
+    # (copy-on-write) protege a entrada compartilhada das conversões mais abaixo
+    chave_filtros = (acudes_sel, municipios_sel, classificacao_sel, filtro_periodo)
+    dff = derivado("sedes_dff", chave_filtros, preparar_dff, depende_de=(ds,)).copy(deep=False)
 
     if dff.empty:
         st.info("Não há dados para os filtros selecionados.")
         return
 
-    # Latitude/Longitude a partir de "Coordenadas"
-    if 'Coordenadas' in dff.columns:
-        try:
-            dff[['Latitude', 'Longitude']] = dff['Coordenadas'].astype(str).str.split(',', expand=True).astype(float)
-        except Exception:
-            # fallback mais tolerante
-            latlon = dff['Coordenadas'].astype(str).str.split(',', n=1, expand=True)
-            dff['Latitude'] = pd.to_numeric(latlon[0], errors='coerce')
-            dff['Longitude'] = pd.to_numeric(latlon[1], errors='coerce')
-    else:
+    if 'Coordenadas' not in dff.columns:
         st.warning("A coluna 'Coordenadas' não foi encontrada. O mapa não será exibido.")
 
-    dff = dff.sort_values(["Açude", "Data"])
-
 # ===================== Mapa dos Açudes =====================
     st.subheader("🌍 Mapa dos Açudes")
 
@@ -196,223 +301,10 @@ def render_dados():
             key='map_style_select'
         )
 
-    # GeoJSONs adicionais
-    geojson_bacia = geojson_data.get('geojson_bacia', {})
-    geojson_sedes = geojson_data.get('geojson_sedes', {})
-
-    # Configurações dos tiles
-    tile_config = {
-        "OpenStreetMap": {"tiles": "OpenStreetMap", "attr": '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a>'},
-        "Stamen Terrain": {"tiles": "https://stamen-tiles.a.ssl.fastly.net/terrain/{z}/{x}/{y}.png", "attr": 'Map tiles by <a href="http://stamen.com">Stamen Design</a>'},
-        "CartoDB positron": {"tiles": "https://cartodb-basemaps-a.global.ssl.fastly.net/light_all/{z}/{x}/{y}.png", "attr": '&copy; <a href="https://carto.com/attributions">CARTO</a>'},
-        "CartoDB dark_matter": {"tiles": "https://cartodb-basemaps-a.global.ssl.fastly.net/dark_all/{z}/{x}/{y}.png", "attr": '&copy; <a href="https://carto.com/attributions">CARTO</a>'},
-        "Esri Satellite": {"tiles": "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}", "attr": "Tiles &copy; Esri — Source: Esri"},
-        "Stamen Toner": {"tiles": "https://stamen-tiles-a.a.ssl.fastly.net/toner/{z}/{x}/{y}.png", "attr": 'Map tiles by <a href="http://stamen.com">Stamen Design</a>'},
-    }
-
-    # Configuração inicial do mapa (será sobrescrita pelo fit_bounds da bacia)
-    if not dff.empty and {'Latitude', 'Longitude'}.issubset(dff.columns):
-        start_center = [float(dff['Latitude'].mean()), float(dff['Longitude'].mean())]
-    else:
-        start_center = [-5.2, -39.5]  # Coordenadas padrão
-
-    m = folium.Map(location=start_center, zoom_start=9, tiles=None)
-    folium.TileLayer(
-        tiles=tile_config[tile_option]["tiles"],
-        attr=tile_config[tile_option]["attr"],
-        name=tile_option
-    ).add_to(m)
-
-    # --- Helpers ---
-    def padronizar_classificacao(classificacao):
-        c = str(classificacao or "").strip().lower()
-        c = (c
-            .replace("á","a").replace("ã","a").replace("â","a")
-            .replace("é","e").replace("ê","e")
-            .replace("í","i").replace("î","i")
-            .replace("ó","o").replace("ô","o")
-            .replace("ú","u").replace("û","u")
-            .replace("ç","c"))
-        if c == "normal" or ("fora" in c and "criticidade" in c):
-            return "fora de criticidade"
-        if "alta" in c:
-            return "criticidade alta"
-        if "media" in c:
-            return "criticidade média"
-        if "baixa" in c:
-            return "criticidade baixa"
-        if "sem" in c and "class" in c:
-            return "sem classificação"
-        return c or "sem classificação"
-
-    def get_classification_color(classificacao):
-        c = padronizar_classificacao(classificacao)
-        color_map = {
-            "fora de criticidade": "#8DCC90",
-            "criticidade alta":    "#E24F42",
-            "criticidade média":   "#ECC116",
-            "criticidade baixa":   "#F4FA4A",
-            "sem classificação":   "#999999"
-        }
-        return color_map.get(c, "#999999")
-
-    # --- Camada da Bacia + centralização (fit_bounds) ---
-    def _compute_bounds_from_geojson(gj: dict):
-        """Fallback para calcular bounds caso get_bounds não esteja disponível."""
-        try:
-            if not isinstance(gj, dict) or gj.get("type") != "FeatureCollection":
-                return None
-            lats, lons = [], []
-            for feat in gj.get("features", []):
-                geom = (feat or {}).get("geometry", {}) or {}
-                gtype = geom.get("type")
-                coords = geom.get("coordinates", [])
-                if gtype == "Polygon":
-                    for ring in coords:
-                        for lon, lat in ring:
-                            lats.append(lat); lons.append(lon)
-                elif gtype == "MultiPolygon":
-                    for poly in coords:
-                        for ring in poly:
-                            for lon, lat in ring:
-                                lats.append(lat); lons.append(lon)
-                elif gtype == "LineString":
-                    for lon, lat in coords:
-                        lats.append(lat); lons.append(lon)
-                elif gtype == "MultiLineString":
-                    for line in coords:
-                        for lon, lat in line:
-                            lats.append(lat); lons.append(lon)
-                elif gtype == "Point" and len(coords) >= 2:
-                    lons.append(coords[0]); lats.append(coords[1])
-                elif gtype == "MultiPoint":
-                    for lon, lat in coords:
-                        lats.append(lat); lons.append(lon)
-            if lats and lons:
-                return [[min(lats), min(lons)], [max(lats), max(lons)]]
-        except Exception:
-            return None
-        return None
-
-    if geojson_bacia:
-        gj_bacia = folium.GeoJson(
-            geojson_bacia,
-            name="Bacia do Banabuiú",
-            style_function=lambda x: {"color": "blue", "weight": 2, "fillOpacity": 0.1},
-            tooltip=folium.GeoJsonTooltip(fields=["DESCRICA1"], aliases=["Bacia:"])
-        ).add_to(m)
-
-        # Centraliza o mapa nos limites da bacia
-        try:
-            bounds = gj_bacia.get_bounds()  # disponível no Folium >= 0.14
-        except Exception:
-            bounds = _compute_bounds_from_geojson(geojson_bacia)
-        if bounds:
-            m.fit_bounds(bounds)
-
-    # --- Sedes Municipais ---
-    if geojson_sedes and isinstance(geojson_sedes, dict) and "features" in geojson_sedes:
-        sedes_layer = folium.FeatureGroup(name="Sedes Municipais", show=True)
-        for feature in geojson_sedes["features"]:
-            props = feature.get("properties", {})
-            geom  = feature.get("geometry", {})
-            coords = geom.get("coordinates", [])
-            if geom.get("type") == "Point" and isinstance(coords, (list, tuple)) and len(coords) >= 2:
-                nome = props.get("NOME_MUNIC", "Sem nome")
-                try:
-                    lat, lon = float(coords[1]), float(coords[0])
-                    folium.Marker(
-                        [lat, lon],
-                        icon=folium.CustomIcon(
-                            "https://cdn-icons-png.flaticon.com/512/854/854878.png",
-                            icon_size=(25, 25)
-                        ),
-                        tooltip=nome
-                    ).add_to(sedes_layer)
-                except Exception:
-                    continue
-        sedes_layer.add_to(m)
-
-    # --- Situação da Bacia (filtrada) ---
-    def _get_classificacao_from_props(props: dict):
-        if not isinstance(props, dict):
-            return None
-        for k in ['Classificação', 'classificacao', 'CLASSIFICACAO', 'classificação', 'situacao', 'SITUACAO']:
-            if k in props and pd.notna(props[k]):
-                return padronizar_classificacao(props[k])
-        return None
-
-    def filtrar_geojson_por_classificacao(geojson_fc, classes_sel):
-        if not geojson_fc or geojson_fc.get('type') != 'FeatureCollection':
-            return {}
-        sel_lower = {str(c).lower() for c in (classes_sel or [])}
-        feats = []
-        for f in geojson_fc.get('features', []):
-            cls = _get_classificacao_from_props(f.get('properties', {}))
-            if cls is None:
-                if {'sem classificação', 'sem classificacao'} & sel_lower:
-                    feats.append(f)
-            else:
-                if cls.lower() in sel_lower:
-                    feats.append(f)
-        return {'type': 'FeatureCollection', 'features': feats} if feats else {}
-
-    geojson_situa_filtrado = filtrar_geojson_por_classificacao(geojson_situa, classificacao_sel)
-    if geojson_situa_filtrado:
-        situa_group = folium.FeatureGroup(name="Situação da Bacia", show=True)
-        folium.GeoJson(
-            geojson_situa_filtrado,
-            style_function=lambda feature: {
-                'fillColor': get_classification_color(feature.get('properties', {}).get('Classificação')),
-                'color': '#555555',
-                'weight': 1.5,
-                'fillOpacity': 0.7,
-                'opacity': 0.9
-            },
-            tooltip=folium.GeoJsonTooltip(
-                fields=['Classificação'],
-                aliases=['Classificação:'],
-                sticky=True
-            )
-        ).add_to(situa_group)
-        situa_group.add_to(m)
-
-    # --- Marcadores dos Açudes ---
-    if not dff.empty and {'Latitude', 'Longitude'}.issubset(dff.columns):
-        for _, row in dff.iterrows():
-            try:
-                lat = float(row['Latitude']); lon = float(row['Longitude'])
-            except Exception:
-                continue
-            classificacao = row.get('Classificação', 'Sem classificação')
-            color_marker = get_classification_color(classificacao)
-            popup_html = f"""
-            <div style="font-family: Arial, sans-serif; font-size: 14px;">
-                <h4 style="margin:0; padding:0; color: #2c3e50;">{row.get('Açude', 'N/A')}</h4>
-                <p><b>Município:</b> {row.get('Município', 'N/A')}</p>
-                <p><b>Cota Simulada:</b> {row.get('Cota Simulada (m)', 'N/A')} m</p>
-                <p><b>Cota Realizada:</b> {row.get('Cota Realizada (m)', 'N/A')} m</p>
-                <p><b>Volume:</b> {row.get('Volume(m³)', 'N/A')} m³</p>
-                <p><b>Classificação:</b> <span style="color: {color_marker}; font-weight: bold;">{classificacao}</span></p>
-            </div>
-            """
-            folium.CircleMarker(
-                location=[lat, lon],
-                radius=6,
-                color=color_marker,
-                fill=True,
-                fill_color=color_marker,
-                fill_opacity=0.9,
-                tooltip=row.get('Açude', 'N/A'),
-                popup=folium.Popup(popup_html, max_width=300)
-            ).add_to(m)
-
-    # --- Controles e render ---
-    Fullscreen().add_to(m)
-    MousePosition(position="bottomleft", separator=" | ", num_digits=4).add_to(m)
-    folium.LayerControl(collapsed=False).add_to(m)
-
-    folium_static(m, width=1400, height=650)
+    with medir("mapa folium"):
+        mapa_folium("sedes_mapa_html", (chave_filtros, tile_option),
+                    lambda: construir_mapa_sedes(dff, geojson_data, classificacao_sel, tile_option),
+                    depende_de=(ds,), width=1400, height=650)
 
     # Legenda (igual ao seu código)
     st.markdown("""
@@ -700,3 +592,9 @@ def render_dados():
                 "Liberação (m³)": st.column_config.NumberColumn(format="%.2f")
             }
         )
+        colunas_export = colunas_existentes + [c for c in ("Latitude", "Longitude") if c in dff.columns]
+        botoes_exportacao(
+            dff[colunas_export], "situacao_sedes",
+            formatos=("csv", "parquet", "geojson"),
+            filtros={"acudes": acudes_sel, "municipios": municipios_sel, "classificacao": classificacao_sel, "periodo": periodo},
+        )
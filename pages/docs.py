@@ -5,7 +5,18 @@ import plotly.graph_objects as go
 import plotly.express as px
 from html import escape
 from utils.common import load_docs_data
+from utils.exportacao import botoes_exportacao
+from utils.instrumentacao import instrumentar
+from utils.registro import dataset
 
+
+def _texto_de_busca(df):
+    """Texto de cada linha em minúsculas, com os valores separados por um caractere nulo (a busca não cruza colunas)."""
+    linhas = ("\x00".join(str(v).lower() for v in linha) for linha in df.itertuples(index=False, name=None))
+    return pd.Series(list(linhas), index=df.index, dtype=object)
+
+
+@instrumentar()
 def render_docs():
     st.title("📜 Documentos para Download")
     st.markdown(
@@ -22,7 +33,8 @@ def render_docs():
         unsafe_allow_html=True,
     )
 
-    df = load_docs_data()
+    ds = dataset(load_docs_data)
+    df = ds.df
     if df is None or df.empty:
         st.info("Não há documentos disponíveis no momento.")
         return
@@ -49,15 +61,15 @@ def render_docs():
         col1, col2, col3 = st.columns(3)
 
         # Opções únicas (como string) e ordenadas
-        ops_opts = sorted(df["Operação"].dropna().astype(str).unique()) if "Operação" in df.columns else []
-        datas_opts = sorted(df["Data da Reunião"].dropna().astype(str).unique()) if "Data da Reunião" in df.columns else []
-        reserv_opts = sorted(df["Reservatório/Sistema"].dropna().astype(str).unique()) if "Reservatório/Sistema" in df.columns else []
+        ops_opts = ds.opcoes("Operação")
+        datas_opts = ds.opcoes("Data da Reunião")
+        reserv_opts = ds.opcoes("Reservatório/Sistema")
 
         with col1:
             filtro_operacao = st.multiselect("Operação", ops_opts, default=ops_opts)
 
         with col2:
-            filtro_data = st.selectbox("Data da Reunião", ["Todos"] + (sorted(df["Data da Reunião"].dropna().astype(str).unique()) if "Data da Reunião" in df.columns else []), index=None, placeholder="Selecione...")
+            filtro_data = st.selectbox("Data da Reunião", ["Todos"] + datas_opts, index=None, placeholder="Selecione...")
 
         with col3:
             filtro_reservatorio = st.multiselect("Reservatório/Sistema", reserv_opts, default=reserv_opts)
@@ -67,26 +79,22 @@ def render_docs():
         st.markdown('</div>', unsafe_allow_html=True)
 
     # ---------- Aplicação dos filtros ----------
-    df_filtrado = df.copy()
-
-    # Filtra por Operação
-    if filtro_operacao and "Operação" in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado["Operação"].astype(str).isin([str(x) for x in filtro_operacao])]
-
-    # Filtra por Data
-    if filtro_data and "Data da Reunião" in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado["Data da Reunião"].astype(str).isin([str(x) for x in filtro_data])]
-
-    # Filtra por Reservatório/Sistema
-    if filtro_reservatorio and "Reservatório/Sistema" in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado["Reservatório/Sistema"].astype(str).isin([str(x) for x in filtro_reservatorio])]
-
-    # Busca textual em todas as colunas
+    # Uma única máscara sobre a base compartilhada; colunas ausentes não filtram
+    criterios = {
+        "Operação": filtro_operacao,
+        "Data da Reunião": [filtro_data] if filtro_data and filtro_data != "Todos" else None,
+        "Reservatório/Sistema": filtro_reservatorio,
+    }
+    mascara_busca = None
     if busca:
+        # Busca textual em todas as colunas (texto montado uma vez por versão dos dados)
         busca_lower = busca.lower().strip()
-        df_filtrado = df_filtrado[
-            df_filtrado.apply(lambda row: any(busca_lower in str(val).lower() for val in row.values), axis=1)
-        ]
+        mascara_busca = ds.derivado("texto_de_busca", _texto_de_busca).str.contains(busca_lower, regex=False).to_numpy(dtype=bool)
+
+    df_filtrado = ds.filtrar(
+        isin={col: valores for col, valores in criterios.items() if col in df.columns},
+        mascara_extra=mascara_busca,
+    )
 
     st.markdown(f"**{len(df_filtrado)} registros encontrados**")
 
@@ -160,6 +168,12 @@ def render_docs():
     # Renderiza como HTML (sem virar bloco de código)
     st.markdown(table_html, unsafe_allow_html=True)
 
+    with st.expander("📥 Opções de Download", expanded=False):
+        botoes_exportacao(
+            df_filtrado, "documentos",
+            filtros={"operacao": filtro_operacao, "data": filtro_data, "reservatorio": filtro_reservatorio, "busca": busca},
+        )
+
 # --- GRÁFICO DE BARRAS VERTICAIS OTIMIZADO ---
     st.markdown("---")
     st.subheader("📊 Comparativo: Operação x Vazão média (Barras Verticais)")
@@ -1,7 +1,10 @@
 import streamlit as st
 import re
 from utils.common import salvar_em_planilha
+from utils.anexos import salvar_anexos
+from utils.instrumentacao import instrumentar
 
+@instrumentar()
 def render_fale_conosco():
     """
     Renderiza a página de formulário de contato "Fale Conosco".
@@ -119,8 +122,15 @@ def render_fale_conosco():
                 "lgpd_consentimento": lgpd_consentimento,
                 "receber_informativos": receber_informativos
             }
+
+            # Anexos: gravados em blocos no armazenamento local; a planilha recebe só as referências
+            try:
+                dados_formulario["anexos"] = salvar_anexos(anexos)
+            except OSError as e:
+                st.warning(f"Não foi possível armazenar os anexos: {e}")
+                dados_formulario["anexos"] = []
             
             if salvar_em_planilha(dados_formulario):
-                st.success("Sua mensagem foi enviada com sucesso e salva na planilha! Agradecemos o seu contato.")
+                st.success("Sua mensagem foi recebida com sucesso e será registrada na planilha em instantes! Agradecemos o seu contato.")
             else:
-                st.error("Houve um problema ao salvar sua mensagem. Por favor, verifique as configurações da planilha e tente novamente.")
+                st.error("Houve um problema ao registrar sua mensagem. Por favor, tente novamente.")
@@ -1,5 +1,7 @@
 import streamlit as st
+from utils.instrumentacao import instrumentar
 
+@instrumentar()
 def render_home():
     """
     Renderiza a página inicial de boas-vindas da aplicação.
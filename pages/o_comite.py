@@ -1,12 +1,342 @@
 import streamlit as st
 import pandas as pd
 import folium
-from streamlit_folium import folium_static
 import unicodedata
 import plotly.express as px
 from branca.element import CssLink
+import json
+import math
+from typing import NamedTuple
+from folium.plugins import FastMarkerCluster
+from utils.spatial_index import indice_da_camada
+from utils.conexoes import ler_csv_remoto
+from utils.cache import cache_swr, versao_dataframe
+from utils.segmento import do_segmento
+from utils.exportacao import botoes_exportacao
+from utils.instrumentacao import instrumentar, medir, registrar_miss
+from utils.registro import filtrar
+from utils.derivados import mapa_folium
 # REMOVER: from folium.plugins import BeautifyIcon
 
+# ===== Fonte: Planilha =====
+SHEET_ID = "14Hb7N5yq4u-B3JN8Stpvpbdlt3sL0JxWUYpJK4fzLV8"
+GID = "1572572584"
+CSV_URL = f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/export?format=csv&gid={GID}"
+TTL_REPRESENTANTES = 600  # segundos; vencido, a tela usa o roster atual e atualiza em segundo plano
+
+COLUNAS_FILTRO = ["Segmento", "Município", "Mandato", "Função"]
+# Colunas calculadas em _preparar_representantes (não vão para as exportações)
+COLUNAS_DERIVADAS = ["Nome (busca)", "Segmento (mapa)", "Cor (hex)", "Cor do marcador", "Ícone"]
+LIMIAR_AGRUPAR = 150  # acima disso o mapa abre no modo agrupado
+
+# Ícones (font-awesome) por segmento
+ICON_CONFIG = {
+    "agric": "tractor", "indús": "industry", "comér": "shopping-cart", "serv":  "cogs",
+    "gover": "landmark", "educ":  "graduation-cap", "saúd":  "heart", "ambient": "leaf", "comun": "users",
+}
+
+# Paleta do gráfico (Plotly) e cores de marcador suportadas pelo Folium (nome -> hex aproximado)
+PX_PALETTE = px.colors.qualitative.Plotly  # ['#636EFA','#EF553B',...]
+COR_SEM_SEGMENTO = "#9e9e9e"
+FOLIUM_CORES = {
+    "blue":"#3388ff","red":"#d63e2a","green":"#2eb82e","purple":"#6f42c1","orange":"#fd7e14",
+    "darkred":"#8b0000","darkblue":"#00008b","darkgreen":"#006400","cadetblue":"#5f9ea0",
+    "pink":"#ff69b4","lightblue":"#87cefa","lightgreen":"#90ee90","gray":"#808080",
+    "black":"#000000","lightgray":"#d3d3d3","beige":"#f5f5dc","white":"#ffffff","darkpurple":"#4b0082",
+    "lightred":"#f08080"
+}
+
+
+class Representantes(NamedTuple):
+    """Roster do comitê pronto para filtros e mapa. Compartilhado entre sessões: somente leitura."""
+    df: pd.DataFrame
+    opcoes: dict                 # coluna -> valores distintos ordenados (listas dos filtros)
+    carregado_em: pd.Timestamp
+    versao: str                  # hash do conteúdo: chave do mapa em cache
+
+
+def normalize(s: str) -> str:
+    """Minúsculas e sem acentos (busca por nome)."""
+    return "".join(ch for ch in unicodedata.normalize("NFKD", (s or "").lower()) if not unicodedata.combining(ch))
+
+
+def pick_icon(seg: str) -> str:
+    s = (seg or "").lower()
+    for k, v in ICON_CONFIG.items():
+        if k in s: return v
+    return "user"
+
+
+def hex_to_rgb(h):
+    h = h.lstrip('#')
+    return tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
+
+
+def nearest_folium_color(hex_color: str) -> str:
+    r1,g1,b1 = hex_to_rgb(hex_color)
+    best, best_dist = None, 1e9
+    for name, hx in FOLIUM_CORES.items():
+        r2,g2,b2 = hex_to_rgb(hx)
+        d = math.sqrt((r1-r2)**2 + (g1-g2)**2 + (b1-b2)**2)
+        if d < best_dist:
+            best, best_dist = name, d
+    return best or "gray"
+
+
+def _preparar_representantes(df: pd.DataFrame) -> Representantes:
+    """Colunas derivadas calculadas uma vez por carga: nome para busca, segmento, ícone e cores."""
+    nomes = df["Nome do(a) representante"] if "Nome do(a) representante" in df.columns else pd.Series("", index=df.index)
+    df["Nome (busca)"] = nomes.map({n: normalize(n) for n in nomes.unique()})
+
+    seg = df["Segmento"] if "Segmento" in df.columns else pd.Series("", index=df.index)
+    seg = seg.fillna("").replace({"nan": "", "None": ""}).str.strip().replace("", "(vazio)")
+    df["Segmento (mapa)"] = seg
+
+    # Cor por segmento na ordem em que aparecem no roster (estável entre filtros)
+    unicos = [s for s in seg.unique() if s != "(vazio)"]
+    cor_hex = {s: PX_PALETTE[i % len(PX_PALETTE)] for i, s in enumerate(unicos)}
+    cor_hex["(vazio)"] = COR_SEM_SEGMENTO
+    df["Cor (hex)"] = seg.map(cor_hex)
+    df["Cor do marcador"] = seg.map({s: nearest_folium_color(h) for s, h in cor_hex.items()})
+    df["Ícone"] = seg.map({s: pick_icon(s) for s in cor_hex})
+    return _representantes(df)
+
+
+def _representantes(df: pd.DataFrame) -> Representantes:
+    """Opções dos filtros a partir do roster já preparado (não altera `df`)."""
+    opcoes = {}
+    for c in COLUNAS_FILTRO:
+        if c in df.columns:
+            col = df[c].dropna().astype(str).str.strip()
+            opcoes[c] = sorted(x for x in col.unique() if x != "")
+    return Representantes(df, opcoes, pd.Timestamp.now(), versao_dataframe(df))
+
+
+@instrumentar()
+@do_segmento("representantes", montar=_representantes)
+@cache_swr(ttl=TTL_REPRESENTANTES)
+@registrar_miss
+def load_representantes_data(url: str = CSV_URL) -> Representantes:
+    df = ler_csv_remoto(url, dtype=str)
+    df.columns = [c.strip() for c in df.columns]
+    for c in df.columns:
+        df[c] = df[c].astype(str).str.strip()
+
+    # Datas (opcional)
+    for c in ["Inicio do mandato", "Fim do mandato"]:
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c], errors="coerce", dayfirst=True)
+
+    # Coordenadas → Latitude/Longitude
+    if "Coordenadas" in df.columns:
+        coords = (
+            df["Coordenadas"]
+            .astype(str).str.strip()
+            .str.replace(";", ",", regex=False)
+            .str.replace("[()\\[\\]]", "", regex=True)
+        )
+        parts = coords.str.split(",", n=1, expand=True)
+        if parts.shape[1] == 2:
+            df["Latitude"]  = pd.to_numeric(parts[0].str.replace(" ", ""), errors="coerce")
+            df["Longitude"] = pd.to_numeric(parts[1].str.replace(" ", ""), errors="coerce")
+        else:
+            df["Latitude"] = pd.NA
+            df["Longitude"] = pd.NA
+    else:
+        df["Latitude"] = pd.NA
+        df["Longitude"] = pd.NA
+
+    # Município vazio → obtido pelas coordenadas (ponto no polígono municipal)
+    if "Município" in df.columns:
+        sem_mun = (df["Município"].isna() | df["Município"].isin(["", "nan", "None"])) & df["Latitude"].notna() & df["Longitude"].notna()
+        if sem_mun.any():
+            idx_mun = indice_da_camada("geojson_poligno")
+            achados = idx_mun.localizar_varios(df.loc[sem_mun, "Longitude"], df.loc[sem_mun, "Latitude"])
+            df.loc[sem_mun, "Município"] = [idx_mun.propriedade(i, "DESCRICA1", "") for i in achados]
+
+    # Nome curto (dois primeiros)
+    if "Nome do(a) representante" in df.columns:
+        def dois_primeiros(nm: str) -> str:
+            parts = [p for p in (nm or "").split() if p]
+            return " ".join(parts[:2]) if parts else nm
+        df["Nome (2)"] = df["Nome do(a) representante"].apply(dois_primeiros)
+
+    return _preparar_representantes(df)
+
+
+def adicionar_marcadores_por_segmento(m, pontos: pd.DataFrame):
+    """Um folium.Marker com popup HTML completo por representante, em camadas por segmento."""
+    # Camadas por segmento (cores e ícones já vêm calculados no roster)
+    groups = {seg: folium.FeatureGroup(name=f"Segmento: {seg}", show=True)
+              for seg in pontos["Segmento (mapa)"].unique()}
+
+    for row in pontos.to_dict("records"):
+        try:
+            lat = float(row["Latitude"]); lon = float(row["Longitude"])
+        except Exception:
+            continue
+
+        segm = row["Segmento (mapa)"]
+        nome_full = row.get("Nome do(a) representante", "N/A")
+        nome_2 = row.get("Nome (2)", nome_full)
+        sigla = row.get("Sigla", row.get("Instituição", "N/A"))
+        func  = row.get("Função", "N/A")
+        mun   = row.get("Município", "N/A")
+        mandato = row.get("Mandato", "N/A")
+        diretoria = row.get("Diretoria", "N/A")
+        telefone = row.get("Telefone", "N/A")
+        email = row.get("E-mail", "N/A")
+
+        color_hex = row["Cor (hex)"]              # igual ao gráfico
+        marker_color = row["Cor do marcador"]     # cor suportada pelo Folium
+        icon_name = row["Ícone"]
+
+        popup_html = f"""
+        <div style="font-family: Arial, sans-serif; font-size: 14px; line-height: 1.6;">
+            <div style="background-color: {color_hex}; color: white; padding: 10px; margin: -10px -10px 10px -10px; border-radius: 5px 5px 0 0;">
+                <h3 style="margin:0; padding:0; font-size: 16px;">{nome_full}</h3>
+            </div>
+            <div style="padding: 5px 0;">
+                <p style="margin: 5px 0;"><strong>🏢 Sigla:</strong> {sigla}</p>
+                <p style="margin: 5px 0;"><strong>💼 Função:</strong> {func}</p>
+                <p style="margin: 5px 0;"><strong>📊 Segmento:</strong> <span style="color: {color_hex}; font-weight: bold;">{segm}</span></p>
+                <p style="margin: 5px 0;"><strong>👥 Diretoria:</strong> {diretoria}</p>
+                <p style="margin: 5px 0;"><strong>🏙️ Município:</strong> {mun}</p>
+                <p style="margin: 5px 0;"><strong>📅 Mandato:</strong> {mandato}</p>
+                <p style="margin: 5px 0;"><strong>📞 Telefone:</strong> {telefone}</p>
+                <p style="margin: 5px 0;"><strong>📧 E-mail:</strong> {email}</p>
+            </div>
+        </div>
+        """
+
+        folium.Marker(
+            location=[lat, lon],
+            icon=folium.Icon(prefix='fa', icon=icon_name, color=marker_color, icon_color='white'),
+            tooltip=f"{nome_2} • {sigla} • {segm}",
+            popup=folium.Popup(popup_html, max_width=360)
+        ).add_to(groups[segm])
+
+    for g in groups.values():
+        g.add_to(m)
+
+
+_CALLBACK_AGRUPADO = """
+(function () {
+    var SEGMENTOS = %s;
+    function esc(v) {
+        return String(v == null ? "N/A" : v).replace(/[&<>"']/g, function (c) {
+            return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+        });
+    }
+    function popup(row, seg) {
+        var linhas = [
+            ["🏢 Sigla", row[5]], ["💼 Função", row[6]], ["👥 Diretoria", row[7]],
+            ["🏙️ Município", row[8]], ["📅 Mandato", row[9]], ["📞 Telefone", row[10]], ["📧 E-mail", row[11]]
+        ];
+        var html = '<div style="font-family: Arial, sans-serif; font-size: 14px; line-height: 1.6;">'
+            + '<div style="background-color: ' + seg[1] + '; color: white; padding: 10px; margin: -10px -10px 10px -10px; border-radius: 5px 5px 0 0;">'
+            + '<h3 style="margin:0; padding:0; font-size: 16px;">' + esc(row[3]) + '</h3></div><div style="padding: 5px 0;">';
+        for (var i = 0; i < linhas.length; i++) {
+            html += '<p style="margin: 5px 0;"><strong>' + linhas[i][0] + ':</strong> ' + esc(linhas[i][1]) + '</p>';
+            if (i === 1) {
+                html += '<p style="margin: 5px 0;"><strong>📊 Segmento:</strong> <span style="color: ' + seg[1]
+                    + '; font-weight: bold;">' + esc(seg[0]) + '</span></p>';
+            }
+        }
+        return html + '</div></div>';
+    }
+    return function (row) {
+        var seg = SEGMENTOS[row[2]];
+        var marker = L.marker(new L.LatLng(row[0], row[1]), {
+            icon: L.AwesomeMarkers.icon({prefix: "fa", icon: seg[3], markerColor: seg[2], iconColor: "white"})
+        });
+        marker.bindTooltip(esc(row[4]) + " • " + esc(row[5]) + " • " + esc(seg[0]));
+        marker.bindPopup(function () { return popup(row, seg); }, {maxWidth: 360});
+        return marker;
+    };
+})()
+"""
+
+# Colunas enviadas ao navegador no modo agrupado (posições 3.. da linha de dados)
+COLUNAS_AGRUPADO = ["Nome do(a) representante", "Nome (2)", "Sigla", "Função", "Diretoria",
+                    "Município", "Mandato", "Telefone", "E-mail"]
+
+
+def dados_agrupados(pontos: pd.DataFrame):
+    """
+    Linhas compactas [lat, lon, segmento, nome, nome curto, sigla, ...] e a tabela de
+    segmentos [nome, cor hex, cor do marcador, ícone] referenciada pelo índice.
+    """
+    segmentos, codigos = [], {}
+    for seg, cor, marcador, icone in pontos[["Segmento (mapa)", "Cor (hex)", "Cor do marcador", "Ícone"]].drop_duplicates(
+            "Segmento (mapa)").itertuples(index=False):
+        codigos[seg] = len(segmentos)
+        segmentos.append([seg, cor, marcador, icone])
+
+    colunas = [pontos["Latitude"].astype(float), pontos["Longitude"].astype(float),
+               pontos["Segmento (mapa)"].map(codigos)]
+    for c in COLUNAS_AGRUPADO:
+        colunas.append(pontos[c].fillna("N/A").astype(str) if c in pontos.columns else pd.Series("N/A", index=pontos.index))
+    if "Sigla" not in pontos.columns and "Instituição" in pontos.columns:
+        colunas[5] = pontos["Instituição"].fillna("N/A").astype(str)
+    linhas = [list(r) for r in zip(*[c.tolist() for c in colunas])]
+    return linhas, segmentos
+
+
+def adicionar_marcadores_agrupados(m, pontos: pd.DataFrame):
+    """Todos os representantes em um FastMarkerCluster; ícone e popup são montados no navegador."""
+    linhas, segmentos = dados_agrupados(pontos)
+    FastMarkerCluster(
+        linhas,
+        callback=_CALLBACK_AGRUPADO % json.dumps(segmentos, ensure_ascii=False),
+        name="Representantes",
+        options={"maxClusterRadius": 40, "disableClusteringAtZoom": 12},
+    ).add_to(m)
+
+
+def construir_mapa_representantes(pontos: pd.DataFrame, tile_option: str, agrupar: bool):
+    """Mapa folium dos representantes: fundo escolhido e marcadores por segmento ou agrupados no navegador."""
+    # CSS do Font Awesome (para ícones)
+    font_awesome_css = CssLink('https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css')
+
+    # Centro no Ceará
+    center = [-5.5, -39.5]
+    zoom_start = 7
+
+    m = folium.Map(location=center, zoom_start=zoom_start, tiles=None)
+    m.get_root().header.add_child(font_awesome_css)
+
+    tile_config = {
+        "CartoDB positron": (
+            "https://cartodb-basemaps-a.global.ssl.fastly.net/light_all/{z}/{x}/{y}.png",
+            '&copy; <a href="https://carto.com/attributions">CARTO</a>'
+        ),
+        "OpenStreetMap": ("OpenStreetMap", '&copy; <a href="https://openstreetmap.org">OSM</a>'),
+        "Stamen Terrain": (
+            "https://stamen-tiles.a.ssl.fastly.net/terrain/{z}/{x}/{y}.png",
+            'Map tiles by <a href="http://stamen.com">Stamen</a>'
+        ),
+        "CartoDB dark_matter": (
+            "https://cartodb-basemaps-a.global.ssl.fastly.net/dark_all/{z}/{x}/{y}.png",
+            '&copy; <a href="https://carto.com/attributions">CARTO</a>'
+        ),
+        "Esri Satellite": (
+            "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}",
+            "Tiles &copy; Esri"
+        ),
+    }
+    tiles, attr = tile_config[tile_option]
+    folium.TileLayer(tiles=tiles, attr=attr, name=tile_option, control=True).add_to(m)
+
+    if agrupar:
+        adicionar_marcadores_agrupados(m, pontos)
+    else:
+        adicionar_marcadores_por_segmento(m, pontos)
+    folium.LayerControl(collapsed=True).add_to(m)
+    return m
+
+
+@instrumentar()
 def render_o_comite():
     st.title("🙋🏽 O Comitê")
     st.markdown(
@@ -23,52 +353,12 @@ def render_o_comite():
         unsafe_allow_html=True,
     )
 
-    # ===== Fonte: Planilha =====
-    SHEET_ID = "14Hb7N5yq4u-B3JN8Stpvpbdlt3sL0JxWUYpJK4fzLV8"
-    GID = "1572572584"
-    CSV_URL = f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/export?format=csv&gid={GID}"
-
-    @st.cache_data(show_spinner=False)
-    def load_data(url: str) -> pd.DataFrame:
-        df = pd.read_csv(url, dtype=str)
-        df.columns = [c.strip() for c in df.columns]
-        for c in df.columns:
-            df[c] = df[c].astype(str).str.strip()
-
-        # Datas (opcional)
-        for c in ["Inicio do mandato", "Fim do mandato"]:
-            if c in df.columns:
-                df[c] = pd.to_datetime(df[c], errors="coerce", dayfirst=True)
-
-        # Coordenadas → Latitude/Longitude
-        if "Coordenadas" in df.columns:
-            coords = (
-                df["Coordenadas"]
-                .astype(str).str.strip()
-                .str.replace(";", ",", regex=False)
-                .str.replace("[()\\[\\]]", "", regex=True)
-            )
-            parts = coords.str.split(",", n=1, expand=True)
-            if parts.shape[1] == 2:
-                df["Latitude"]  = pd.to_numeric(parts[0].str.replace(" ", ""), errors="coerce")
-                df["Longitude"] = pd.to_numeric(parts[1].str.replace(" ", ""), errors="coerce")
-            else:
-                df["Latitude"] = pd.NA
-                df["Longitude"] = pd.NA
-        else:
-            df["Latitude"] = pd.NA
-            df["Longitude"] = pd.NA
-
-        # Nome curto (dois primeiros)
-        if "Nome do(a) representante" in df.columns:
-            def dois_primeiros(nm: str) -> str:
-                parts = [p for p in (nm or "").split() if p]
-                return " ".join(parts[:2]) if parts else nm
-            df["Nome (2)"] = df["Nome do(a) representante"].apply(dois_primeiros)
-
-        return df
-
-    df = load_data(CSV_URL)
+    try:
+        roster = load_representantes_data()
+    except Exception as e:
+        st.info(f"Planilha vazia ou inacessível. ({e})")
+        return
+    df = roster.df
     if df is None or df.empty:
         st.info("Planilha vazia ou inacessível.")
         return
@@ -78,9 +368,7 @@ def render_o_comite():
     fc1, fc2, fc3, fc4 = st.columns(4)
 
     def options(colname: str):
-        if colname not in df.columns: return []
-        col = df[colname].dropna().astype(str).str.strip()
-        return sorted([x for x in col.unique() if x != ""])
+        return roster.opcoes.get(colname, [])
 
     with fc1:
         seg_sel = st.multiselect("Segmento", options("Segmento"), default=options("Segmento"))
@@ -92,18 +380,15 @@ def render_o_comite():
         fun_sel = st.multiselect("Função", options("Função"), default=options("Função"))
 
     # Busca por nome (ignora acentos)
-    def normalize(s: str) -> str:
-        return "".join(ch for ch in unicodedata.normalize("NFKD", (s or "").lower()) if not unicodedata.combining(ch))
     nome_query = st.text_input("Pesquisar por nome", placeholder="Digite parte do nome…").strip()
 
-    dff = df.copy()
-    if seg_sel and "Segmento" in dff:   dff = dff[dff["Segmento"].isin(seg_sel)]
-    if mun_sel and "Município" in dff:  dff = dff[dff["Município"].isin(mun_sel)]
-    if man_sel and "Mandato" in dff:    dff = dff[dff["Mandato"].isin(man_sel)]
-    if fun_sel and "Função" in dff:     dff = dff[dff["Função"].isin(fun_sel)]
-    if nome_query and "Nome do(a) representante" in dff.columns:
+    # Uma única máscara sobre o roster compartilhado (sem copiar o DataFrame inteiro)
+    selecoes = {"Segmento": seg_sel, "Município": mun_sel, "Mandato": man_sel, "Função": fun_sel}
+    mascara_nome = None
+    if nome_query and "Nome (busca)" in df.columns:
         nq = normalize(nome_query)
-        dff = dff[dff["Nome do(a) representante"].apply(lambda x: nq in normalize(str(x)))]
+        mascara_nome = df["Nome (busca)"].str.contains(nq, regex=False).to_numpy(dtype=bool, na_value=False)
+    dff = filtrar(df, isin={col: sel for col, sel in selecoes.items() if col in df.columns}, mascara_extra=mascara_nome)
 
     if dff.empty:
         st.warning("Sem registros para os filtros selecionados.")
@@ -132,13 +417,18 @@ def render_o_comite():
             tab = dff[cols_exist].rename(columns={"Nome (2)": "Nome"}).sort_values(by="Nome")
             st.dataframe(tab, use_container_width=True, hide_index=True, height=560)
 
+        with st.expander("📥 Opções de Download", expanded=False):
+            botoes_exportacao(
+                dff.drop(columns=COLUNAS_DERIVADAS, errors="ignore"), "representantes",
+                formatos=("csv", "parquet", "geojson"),
+                versao=roster.carregado_em.isoformat(),
+                filtros={"segmento": seg_sel, "municipio": mun_sel, "mandato": man_sel, "funcao": fun_sel, "nome": nome_query},
+            )
+
     #====================== MAPA (cores ~ iguais ao gráfico) =============
     with col_map:
         st.subheader("🗺️ Mapa dos Representantes")
 
-        # CSS do Font Awesome (para ícones)
-        font_awesome_css = CssLink('https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css')
-
         tile_option = st.selectbox(
             "Mapa de fundo",
             ["OpenStreetMap", "CartoDB positron", "Stamen Terrain", "CartoDB dark_matter", "Esri Satellite"],
@@ -151,141 +441,20 @@ def render_o_comite():
         if pontos.empty:
             st.info("Sem coordenadas válidas para exibir no mapa.")
         else:
-            # Centro no Ceará
-            center = [-5.5, -39.5]
-            zoom_start = 7
-
-            m = folium.Map(location=center, zoom_start=zoom_start, tiles=None)
-            m.get_root().header.add_child(font_awesome_css)
-
-            tile_config = {
-                "CartoDB positron": (
-                    "https://cartodb-basemaps-a.global.ssl.fastly.net/light_all/{z}/{x}/{y}.png",
-                    '&copy; <a href="https://carto.com/attributions">CARTO</a>'
-                ),
-                "OpenStreetMap": ("OpenStreetMap", '&copy; <a href="https://openstreetmap.org">OSM</a>'),
-                "Stamen Terrain": (
-                    "https://stamen-tiles.a.ssl.fastly.net/terrain/{z}/{x}/{y}.png",
-                    'Map tiles by <a href="http://stamen.com">Stamen</a>'
-                ),
-                "CartoDB dark_matter": (
-                    "https://cartodb-basemaps-a.global.ssl.fastly.net/dark_all/{z}/{x}/{y}.png",
-                    '&copy; <a href="https://carto.com/attributions">CARTO</a>'
-                ),
-                "Esri Satellite": (
-                    "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}",
-                    "Tiles &copy; Esri"
-                ),
-            }
-            tiles, attr = tile_config[tile_option]
-            folium.TileLayer(tiles=tiles, attr=attr, name=tile_option, control=True).add_to(m)
-
-            # 1) Paleta do gráfico (Plotly) -> hex por Segmento
-            px_palette = px.colors.qualitative.Plotly  # ['#636EFA','#EF553B',...]
-            seg_unicos = [s for s in pontos["Segmento"].dropna().unique()]
-            seg_hex_map = {seg: px_palette[i % len(px_palette)] for i, seg in enumerate(seg_unicos)}
-            seg_hex_map["(vazio)"] = "#9e9e9e"
-
-            # 2) Cores de marcador suportadas pelo Folium (nome -> hex aproximado)
-            allowed_name_to_hex = {
-                "blue":"#3388ff","red":"#d63e2a","green":"#2eb82e","purple":"#6f42c1","orange":"#fd7e14",
-                "darkred":"#8b0000","darkblue":"#00008b","darkgreen":"#006400","cadetblue":"#5f9ea0",
-                "pink":"#ff69b4","lightblue":"#87cefa","lightgreen":"#90ee90","gray":"#808080",
-                "black":"#000000","lightgray":"#d3d3d3","beige":"#f5f5dc","white":"#ffffff","darkpurple":"#4b0082",
-                "lightred":"#f08080"
-            }
-            allowed_colors = list(allowed_name_to_hex.keys())
-
-            def hex_to_rgb(h):
-                h = h.lstrip('#')
-                return tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
-
-            def nearest_folium_color(hex_color: str) -> str:
-                import math
-                r1,g1,b1 = hex_to_rgb(hex_color)
-                best, best_dist = None, 1e9
-                for name, hx in allowed_name_to_hex.items():
-                    r2,g2,b2 = hex_to_rgb(hx)
-                    d = math.sqrt((r1-r2)**2 + (g1-g2)**2 + (b1-b2)**2)
-                    if d < best_dist:
-                        best, best_dist = name, d
-                return best or "gray"
-
-            # 3) Mapa Segmento -> cor do marcador (nome) e cor do popup (hex igual ao gráfico)
-            marker_color_map = {seg: nearest_folium_color(seg_hex_map.get(seg, "#9e9e9e"))
-                                for seg in (seg_unicos + ["(vazio)"])}
-
-            # Camadas por segmento
-            groups = {seg: folium.FeatureGroup(name=f"Segmento: {seg}", show=True) for seg in seg_unicos}
-            groups["_sem_segmento"] = folium.FeatureGroup(name="Segmento: (vazio)", show=True)
-
-            # Ícones (font-awesome) por segmento
-            icon_config = {
-                "agric": "tractor", "indús": "industry", "comér": "shopping-cart", "serv":  "cogs",
-                "gover": "landmark", "educ":  "graduation-cap", "saúd":  "heart", "ambient": "leaf", "comun": "users",
-            }
-            def pick_icon(seg: str) -> str:
-                s = (seg or "").lower()
-                for k, v in icon_config.items():
-                    if k in s: return v
-                return "user"
-
-            for _, row in pontos.iterrows():
-                try:
-                    lat = float(row["Latitude"]); lon = float(row["Longitude"])
-                except Exception:
-                    continue
-
-                segm = (row.get("Segmento", "") or "").strip() or "(vazio)"
-                grp_key = segm if segm in groups else ("_sem_segmento" if segm == "(vazio)" else segm)
-                if grp_key not in groups:
-                    groups[grp_key] = folium.FeatureGroup(name=f"Segmento: {segm}", show=True)
-
-                nome_full = row.get("Nome do(a) representante", "N/A")
-                nome_2 = row.get("Nome (2)", nome_full)
-                sigla = row.get("Sigla", row.get("Instituição", "N/A"))
-                func  = row.get("Função", "N/A")
-                mun   = row.get("Município", "N/A")
-                mandato = row.get("Mandato", "N/A")
-                diretoria = row.get("Diretoria", "N/A")
-                telefone = row.get("Telefone", "N/A")
-                email = row.get("E-mail", "N/A")
-
-                color_hex = seg_hex_map.get(segm, "#9e9e9e")                     # igual ao gráfico
-                marker_color = marker_color_map.get(segm, "gray")                 # cor suportada pelo Folium
-                icon_name = pick_icon(segm)
-
-                popup_html = f"""
-                <div style="font-family: Arial, sans-serif; font-size: 14px; line-height: 1.6;">
-                    <div style="background-color: {color_hex}; color: white; padding: 10px; margin: -10px -10px 10px -10px; border-radius: 5px 5px 0 0;">
-                        <h3 style="margin:0; padding:0; font-size: 16px;">{nome_full}</h3>
-                    </div>
-                    <div style="padding: 5px 0;">
-                        <p style="margin: 5px 0;"><strong>🏢 Sigla:</strong> {sigla}</p>
-                        <p style="margin: 5px 0;"><strong>💼 Função:</strong> {func}</p>
-                        <p style="margin: 5px 0;"><strong>📊 Segmento:</strong> <span style="color: {color_hex}; font-weight: bold;">{segm}</span></p>
-                        <p style="margin: 5px 0;"><strong>👥 Diretoria:</strong> {diretoria}</p>
-                        <p style="margin: 5px 0;"><strong>🏙️ Município:</strong> {mun}</p>
-                        <p style="margin: 5px 0;"><strong>📅 Mandato:</strong> {mandato}</p>
-                        <p style="margin: 5px 0;"><strong>📞 Telefone:</strong> {telefone}</p>
-                        <p style="margin: 5px 0;"><strong>📧 E-mail:</strong> {email}</p>
-                    </div>
-                </div>
-                """
-
-                folium.Marker(
-                    location=[lat, lon],
-                    icon=folium.Icon(prefix='fa', icon=icon_name, color=marker_color, icon_color='white'),
-                    tooltip=f"{nome_2} • {sigla} • {segm}",
-                    popup=folium.Popup(popup_html, max_width=360)
-                ).add_to(groups[grp_key])
-
-            for g in groups.values():
-                g.add_to(m)
-            folium.LayerControl(collapsed=True).add_to(m)
+            # Modo agrupado: um único bloco de dados + cluster no navegador (popups sob demanda)
+            agrupar = st.toggle(
+                "Agrupar marcadores (modo rápido)",
+                value=len(pontos) > LIMIAR_AGRUPAR,
+                help="Envia os representantes como dados compactos e agrupa os marcadores no navegador.",
+            )
 
+            # HTML do mapa reaproveitado enquanto roster, filtros, fundo e modo não mudam
             map_height = 720
-            folium_static(m, width=920, height=map_height)
+            chave_mapa = (roster.versao, selecoes, nome_query, tile_option, agrupar)
+            with medir("mapa folium"):
+                mapa_folium("representantes_mapa_html", chave_mapa,
+                            lambda: construir_mapa_representantes(pontos, tile_option, agrupar),
+                            width=920, height=map_height)
 
     # ===== Gráficos =====
     st.markdown("---")
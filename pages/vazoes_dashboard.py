@@ -7,15 +7,120 @@ from streamlit_folium import folium_static
 from folium.plugins import Fullscreen, MiniMap, MousePosition, MeasureControl, MarkerCluster
 import altair as alt
 from utils.common import carregar_dados_vazoes, convert_vazao, load_geojson_data
+from utils.exportacao import botoes_exportacao
+from utils.tabela import tabela_paginada
+from utils.instrumentacao import instrumentar
+from utils.registro import dataset
+from utils.derivados import derivado
 
 st.set_page_config(layout="wide")
 
+# Meses abreviados (rótulo Mês/Ano da média mensal)
+MESES_MAP = {1:"Jan", 2:"Fev", 3:"Mar", 4:"Abr", 5:"Mai", 6:"Jun",
+             7:"Jul", 8:"Ago", 9:"Set", 10:"Out", 11:"Nov", 12:"Dez"}
+
+
+def volume_acumulado_por_reservatorio(df):
+    """Volume operado (m³) por reservatório: vazão (L/s) × dias até a próxima medição (a última vai até o fim do período)."""
+    df_box = df.copy()
+    df_box["Data"] = pd.to_datetime(df_box["Data"], errors="coerce")
+    df_box["Vazão Operada"] = pd.to_numeric(df_box["Vazão Operada"], errors="coerce").fillna(0)
+
+    volumes = []
+    fim_periodo_global = df_box["Data"].max()
+
+    for reservatorio in df_box["Reservatório Monitorado"].dropna().unique():
+        df_res = (
+            df_box[df_box["Reservatório Monitorado"] == reservatorio]
+            .dropna(subset=["Data"])
+            .sort_values("Data")
+            .copy()
+        )
+        if df_res.empty:
+            continue
+
+        # Dias entre medições (fecha último intervalo até o fim do período global)
+        df_res["dias_entre_medicoes"] = df_res["Data"].diff().dt.days.fillna(0)
+        ultima_data_res = df_res["Data"].iloc[-1]
+        fim_periodo = fim_periodo_global if pd.notna(fim_periodo_global) else ultima_data_res
+        df_res.loc[df_res.index[-1], "dias_entre_medicoes"] = max((fim_periodo - ultima_data_res).days + 1, 0)
+
+        # Se Vazão Operada está em l/s, converter para m³/s dividindo por 1000
+        segundos_por_dia = 86400
+        vazao_m3s = df_res["Vazão Operada"] / 1000.0
+        df_res["volume_periodo_m3"] = vazao_m3s * segundos_por_dia * df_res["dias_entre_medicoes"]
+
+        volume_total_m3 = float(df_res["volume_periodo_m3"].sum())
+        volumes.append({"Reservatório Monitorado": reservatorio, "Volume Acumulado (m³)": volume_total_m3})
+
+    return pd.DataFrame(volumes, columns=["Reservatório Monitorado", "Volume Acumulado (m³)"])
+
+
+def media_ponderada_mensal(df):
+    """Média da Vazão Operada por reservatório e Mês/Ano, ponderada pelos dias ativos de cada leitura diária."""
+    dfm = df.copy()
+    dfm["Data"] = pd.to_datetime(dfm["Data"], errors="coerce")
+    dfm = dfm.dropna(subset=["Data", "Reservatório Monitorado"])
+    
+    # Data máxima do dataset (mesma referência do gráfico de Evolução)
+    data_maxima_dataset = dfm["Data"].max()
+
+    # 1 leitura por dia por reservatório (última do dia), igual ao gráfico de Evolução
+    df_diario = (
+        dfm.sort_values("Data")
+          .groupby(["Reservatório Monitorado", "Data"], as_index=False)
+          .last()
+    )
+
+    # Mês e ano para não misturar períodos
+    df_diario["Ano"] = df_diario["Data"].dt.year
+    df_diario["Mês"] = df_diario["Data"].dt.month.map(MESES_MAP)
+    df_diario["MêsRef"] = df_diario["Mês"] + "/" + df_diario["Ano"].astype(str)
+
+    # Função para calcular média ponderada mensal (MESMA metodologia do gráfico de Evolução)
+    def calcular_media_ponderada_mensal(grupo):
+        grupo = grupo.sort_values('Data')
+        grupo = grupo.copy()
+        grupo['dias_ativos'] = grupo['Data'].diff().dt.days.fillna(0)
+        
+        # CORREÇÃO: Usar a mesma lógica do gráfico de Evolução
+        # Para o último registro, calcular dias até a data máxima do dataset
+        if not grupo.empty:
+            ultima_data = grupo['Data'].iloc[-1]
+            
+            # Se for o último mês do dataset, vai até data_maxima_dataset
+            # Se for mês anterior, vai até o final do mês
+            if ultima_data.month == data_maxima_dataset.month and ultima_data.year == data_maxima_dataset.year:
+                # Último mês: usa data máxima do dataset (igual gráfico Evolução)
+                dias_restantes = (data_maxima_dataset - ultima_data).days + 1
+            else:
+                # Mês completo: vai até o final do mês
+                fim_mes = ultima_data + pd.offsets.MonthEnd(0)
+                dias_restantes = (fim_mes - ultima_data).days + 1
+            
+            grupo.loc[grupo.index[-1], 'dias_ativos'] = dias_restantes
+        
+        # Calcular média ponderada (mesma metodologia do gráfico de Evolução)
+        vazao_total_ponderada = (grupo['Vazão Operada'] * grupo['dias_ativos']).sum()
+        dias_totais = grupo['dias_ativos'].sum()
+        
+        return vazao_total_ponderada / dias_totais if dias_totais > 0 else 0
+
+    return (
+        df_diario.groupby(["Reservatório Monitorado", "MêsRef"], dropna=True)
+                 .apply(calcular_media_ponderada_mensal)
+                 .reset_index(name='Vazão Operada')
+    )
+
+
+@instrumentar()
 def render_vazoes_dashboard():
     """Renderiza a página completa do painel de vazões."""
     
     # === Carregamento de Dados e GeoJSON (Cachê) ===
     geojson_data = load_geojson_data()
-    df = carregar_dados_vazoes()
+    ds = dataset(carregar_dados_vazoes)
+    df = ds.df
     
     st.markdown(
         """
@@ -55,7 +160,8 @@ def render_vazoes_dashboard():
     with cA1:
         if st.button("🔄 Atualizar agora", key="btn_vazoes_atualizar"):
             carregar_dados_vazoes.clear()
-            df = carregar_dados_vazoes()
+            ds = dataset(carregar_dados_vazoes)
+            df = ds.df
             st.success("Atualizado.")
 
     # === Filtros da Página ===
@@ -63,31 +169,31 @@ def render_vazoes_dashboard():
         st.markdown('<div class="filter-card"><div class="filter-title">Opções de Filtro</div>', unsafe_allow_html=True)
         col1, col2 = st.columns(2)
         with col1:
-            estacoes = st.multiselect("🏞️ Reservatório", df["Reservatório Monitorado"].dropna().unique(), key="estacoes_vazao")
-            operacao = st.multiselect("🔧 Operação", df["Operação"].dropna().unique(), key="operacao_vazao")
+            estacoes = st.multiselect("🏞️ Reservatório", ds.opcoes("Reservatório Monitorado", ordenar=False), key="estacoes_vazao")
+            operacao = st.multiselect("🔧 Operação", ds.opcoes("Operação", ordenar=False), key="operacao_vazao")
         with col2:
-            meses = st.multiselect("📆 Mês", df["Mês"].dropna().unique(), key="meses_vazao")
+            meses = st.multiselect("📆 Mês", ds.opcoes("Mês", ordenar=False), key="meses_vazao")
         col3, col4 = st.columns(2)
         with col3:
-            datas_disponiveis = df["Data"].dropna().sort_values()
-            data_min = datas_disponiveis.min()
-            data_max = datas_disponiveis.max()
+            data_min = df["Data"].min()
+            data_max = df["Data"].max()
             intervalo_data = st.date_input("📅 Intervalo", (data_min, data_max), format="DD/MM/YYYY", key="intervalo_vazao")
         with col4:
             unidade_sel = st.selectbox("🧪 Unidade", ["L/s", "m³/s"], index=0, key="unidade_vazao")
         st.markdown("</div>", unsafe_allow_html=True)
 
     # === Aplica os Filtros ===
-    df_filtrado = df.copy()
-    if estacoes:
-        df_filtrado = df_filtrado[df_filtrado["Reservatório Monitorado"].isin(estacoes)]
-    if operacao:
-        df_filtrado = df_filtrado[df_filtrado["Operação"].isin(operacao)]
-    if meses:
-        df_filtrado = df_filtrado[df_filtrado["Mês"].isin(meses)]
+    # Uma única máscara sobre a base compartilhada; só o resultado é alocado
+    periodo = {}
     if isinstance(intervalo_data, tuple) and len(intervalo_data) == 2:
         inicio, fim = intervalo_data
-        df_filtrado = df_filtrado[(df_filtrado["Data"] >= pd.to_datetime(inicio)) & (df_filtrado["Data"] <= pd.to_datetime(fim))]
+        periodo["Data"] = (pd.to_datetime(inicio), pd.to_datetime(fim))
+    # Derivados reaproveitados entre reruns enquanto o conteúdo dos dados e os filtros não mudam
+    chave_filtros = (estacoes, operacao, meses, periodo)
+    df_filtrado = derivado("vazoes_filtrado", chave_filtros, lambda: ds.filtrar(
+        isin={"Reservatório Monitorado": estacoes, "Operação": operacao, "Mês": meses},
+        entre=periodo,
+    ), depende_de=(ds,))
 
     # === Exibe KPIs ===
     st.markdown(
@@ -127,11 +233,11 @@ def render_vazoes_dashboard():
 
     # Verificar se há dados para mostrar
     if not df_filtrado.empty and "Reservatório Monitorado" in df_filtrado.columns:
-        fig = go.Figure()
-        cores = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#17becf", "#e377c2"]
         reservatorios = df_filtrado["Reservatório Monitorado"].dropna().unique()
 
-        if len(reservatorios) > 0:
+        def figura_evolucao():
+            fig = go.Figure()
+            cores = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#17becf", "#e377c2"]
             for i, r in enumerate(reservatorios):
                 dfr = (
                     df_filtrado[df_filtrado["Reservatório Monitorado"] == r]
@@ -185,7 +291,11 @@ def render_vazoes_dashboard():
                 height=500,
                 title="Evolução da Vazão Operada por Reservatório"
             )
+            return fig
 
+        if len(reservatorios) > 0:
+            # Figura reaproveitada enquanto dados, filtros e unidade não mudam (o st.plotly_chart não a altera)
+            fig = derivado("vazoes_fig_evolucao", (chave_filtros, unidade_sel), figura_evolucao, depende_de=(ds,))
             st.plotly_chart(fig, use_container_width=True, config={"displaylogo": False}, key="plotly_vazao_evolucao")
         else:
             st.info("Nenhum reservatório encontrado para exibir o gráfico.")
@@ -202,38 +312,8 @@ def render_vazoes_dashboard():
     tem_res = not df_filtrado.empty and df_filtrado["Reservatório Monitorado"].nunique() > 0
 
     if tem_cols and tem_res:
-        df_box = df_filtrado.copy()
-        df_box["Data"] = pd.to_datetime(df_box["Data"], errors="coerce")
-        df_box["Vazão Operada"] = pd.to_numeric(df_box["Vazão Operada"], errors="coerce").fillna(0)
-
-        volumes = []
-        fim_periodo_global = df_box["Data"].max()
-
-        for reservatorio in df_box["Reservatório Monitorado"].dropna().unique():
-            df_res = (
-                df_box[df_box["Reservatório Monitorado"] == reservatorio]
-                .dropna(subset=["Data"])
-                .sort_values("Data")
-                .copy()
-            )
-            if df_res.empty:
-                continue
-
-            # Dias entre medições (fecha último intervalo até o fim do período global)
-            df_res["dias_entre_medicoes"] = df_res["Data"].diff().dt.days.fillna(0)
-            ultima_data_res = df_res["Data"].iloc[-1]
-            fim_periodo = fim_periodo_global if pd.notna(fim_periodo_global) else ultima_data_res
-            df_res.loc[df_res.index[-1], "dias_entre_medicoes"] = max((fim_periodo - ultima_data_res).days + 1, 0)
-
-            # Se Vazão Operada está em l/s, converter para m³/s dividindo por 1000
-            segundos_por_dia = 86400
-            vazao_m3s = df_res["Vazão Operada"] / 1000.0
-            df_res["volume_periodo_m3"] = vazao_m3s * segundos_por_dia * df_res["dias_entre_medicoes"]
-
-            volume_total_m3 = float(df_res["volume_periodo_m3"].sum())
-            volumes.append({"Reservatório Monitorado": reservatorio, "Volume Acumulado (m³)": volume_total_m3})
-
-        df_volumes = pd.DataFrame(volumes)
+        df_volumes = derivado("vazoes_volumes", chave_filtros,
+                              lambda: volume_acumulado_por_reservatorio(df_filtrado), depende_de=(ds,)).copy(deep=False)
 
         def fmt_m3(x):
             if pd.isna(x):
@@ -293,63 +373,10 @@ def render_vazoes_dashboard():
     st.subheader("🏞️ Média da Vazão Operada por Reservatório")
 
     if not df_filtrado.empty and "Reservatório Monitorado" in df_filtrado.columns:
-        dfm = df_filtrado.copy()
-        dfm["Data"] = pd.to_datetime(dfm["Data"], errors="coerce")
-        dfm = dfm.dropna(subset=["Data", "Reservatório Monitorado"])
-        
-        # Data máxima do dataset (mesma referência do gráfico de Evolução)
-        data_maxima_dataset = dfm["Data"].max()
-
-        # 1 leitura por dia por reservatório (última do dia), igual ao gráfico de Evolução
-        df_diario = (
-            dfm.sort_values("Data")
-              .groupby(["Reservatório Monitorado", "Data"], as_index=False)
-              .last()
-        )
-
-        # Mês e ano para não misturar períodos
-        meses_map = {1:"Jan", 2:"Fev", 3:"Mar", 4:"Abr", 5:"Mai", 6:"Jun",
-                    7:"Jul", 8:"Ago", 9:"Set", 10:"Out", 11:"Nov", 12:"Dez"}
-        df_diario["Ano"] = df_diario["Data"].dt.year
-        df_diario["Mês"] = df_diario["Data"].dt.month.map(meses_map)
-        df_diario["MêsRef"] = df_diario["Mês"] + "/" + df_diario["Ano"].astype(str)
-
-        # Função para calcular média ponderada mensal (MESMA metodologia do gráfico de Evolução)
-        def calcular_media_ponderada_mensal(grupo):
-            grupo = grupo.sort_values('Data')
-            grupo = grupo.copy()
-            grupo['dias_ativos'] = grupo['Data'].diff().dt.days.fillna(0)
-            
-            # CORREÇÃO: Usar a mesma lógica do gráfico de Evolução
-            # Para o último registro, calcular dias até a data máxima do dataset
-            if not grupo.empty:
-                ultima_data = grupo['Data'].iloc[-1]
-                
-                # Se for o último mês do dataset, vai até data_maxima_dataset
-                # Se for mês anterior, vai até o final do mês
-                if ultima_data.month == data_maxima_dataset.month and ultima_data.year == data_maxima_dataset.year:
-                    # Último mês: usa data máxima do dataset (igual gráfico Evolução)
-                    dias_restantes = (data_maxima_dataset - ultima_data).days + 1
-                else:
-                    # Mês completo: vai até o final do mês
-                    fim_mes = ultima_data + pd.offsets.MonthEnd(0)
-                    dias_restantes = (fim_mes - ultima_data).days + 1
-                
-                grupo.loc[grupo.index[-1], 'dias_ativos'] = dias_restantes
-            
-            # Calcular média ponderada (mesma metodologia do gráfico de Evolução)
-            vazao_total_ponderada = (grupo['Vazão Operada'] * grupo['dias_ativos']).sum()
-            dias_totais = grupo['dias_ativos'].sum()
-            
-            return vazao_total_ponderada / dias_totais if dias_totais > 0 else 0
-
         # Calcular média mensal ponderada (igual à metodologia do gráfico de Evolução)
         try:
-            media_mensal = (
-                df_diario.groupby(["Reservatório Monitorado", "MêsRef"], dropna=True)
-                        .apply(calcular_media_ponderada_mensal)
-                        .reset_index(name='Vazão Operada')
-            )
+            media_mensal = derivado("vazoes_media_mensal", chave_filtros,
+                                    lambda: media_ponderada_mensal(df_filtrado), depende_de=(ds,)).copy(deep=False)
 
             if not media_mensal.empty:
                 # Mesma unidade do gráfico de evolução
@@ -363,7 +390,7 @@ def render_vazoes_dashboard():
                 )
 
                 # Ordena MêsRef cronologicamente
-                inv_meses = {v: k for k, v in meses_map.items()}
+                inv_meses = {v: k for k, v in MESES_MAP.items()}
                 media_mensal["ord"] = media_mensal["MêsRef"].apply(
                     lambda s: int(s.split("/")[1]) * 100 + inv_meses[s.split("/")[0]]
                 )
@@ -422,7 +449,17 @@ def render_vazoes_dashboard():
     
     # ------------- Tabela -------------
     st.subheader("📋 Tabela Detalhada")
-    st.dataframe(df_filtrado.sort_values(by="Data", ascending=False), use_container_width=True, key="dataframe_vazao")
+    tabela_paginada(
+        df_filtrado, key="tabela_vazao", base=df,
+        ordenar_por="Data", ascendente=False,
+        use_container_width=True,
+    )
+    with st.expander("📥 Opções de Download", expanded=False):
+        botoes_exportacao(
+            df_filtrado, "vazoes",
+            filtros={"estacoes": estacoes, "operacao": operacao, "meses": meses, "intervalo": intervalo_data},
+            key="export_vazao",
+        )
 
 
 
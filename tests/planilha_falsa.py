@@ -0,0 +1,88 @@
+"""
+API do Sheets falsa, em memória, para os testes da sincronização incremental
+(e para benchmarks/sincronizacao.py).
+
+`PlanilhaFalsa` responde a `valores("A2:E")` e `valores_lote([...])` como o
+gspread (células vazias do fim cortadas), exporta o CSV completo e conta os
+pedidos e os bytes servidos.
+"""
+import io
+import re
+import csv
+import json
+
+_A1 = re.compile(r"^([A-Z]*)(\d*):([A-Z]*)(\d*)$")
+
+
+def _indice_coluna(letras):
+    n = 0
+    for c in letras:
+        n = n * 26 + ord(c) - 64
+    return n
+
+
+class PlanilhaFalsa:
+    """API do Sheets em memória: `valores(intervalo A1)` e exportação CSV, contando o que foi servido."""
+
+    def __init__(self, texto_csv):
+        linhas = list(csv.reader(io.StringIO(texto_csv)))
+        self.cabecalho, self.linhas = linhas[0], linhas[1:]
+        self.zerar_contadores()
+
+    def zerar_contadores(self):
+        self.chamadas = 0
+        self.bytes_servidos = 0
+
+    def valores(self, intervalo):
+        c1, l1, c2, l2 = _A1.match(intervalo).groups()
+        todas = [self.cabecalho] + self.linhas
+        ini = int(l1) - 1 if l1 else 0
+        fim = int(l2) if l2 else len(todas)
+        col_ini = _indice_coluna(c1) - 1 if c1 else 0
+        col_fim = _indice_coluna(c2) if c2 else len(self.cabecalho)
+        saida = []
+        for linha in todas[ini:fim]:
+            celulas = linha[col_ini:col_fim]
+            while celulas and celulas[-1] == "":
+                celulas = celulas[:-1]
+            saida.append(celulas)
+        while saida and not saida[-1]:
+            saida.pop()
+        self.chamadas += 1
+        self.bytes_servidos += len(json.dumps(saida, ensure_ascii=False).encode("utf-8"))
+        return saida
+
+    def valores_lote(self, intervalos):
+        chamadas = self.chamadas
+        saida = [self.valores(intervalo) for intervalo in intervalos]
+        self.chamadas = chamadas + 1  # um único pedido (batchGet)
+        return saida
+
+    def exportar_csv(self):
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, lineterminator="\n")
+        escritor.writerow(self.cabecalho)
+        escritor.writerows(self.linhas)
+        conteudo = buffer.getvalue().encode("utf-8")
+        self.chamadas += 1
+        self.bytes_servidos += len(conteudo)
+        return conteudo
+
+
+def csv_vazoes(linhas=372, reservatorios=6):
+    """CSV determinístico no formato da planilha de vazões (com células vazias, como a original)."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    escritor.writerow(["Reservatório Monitorado", "Data", "Vazão Operada", "Vazao_Aloc", "Operação"])
+    por_reservatorio = -(-linhas // reservatorios)
+    for i in range(linhas):
+        r, k = divmod(i, por_reservatorio)
+        dia, mes = k % 28 + 1, k // 28 % 12 + 1
+        escritor.writerow([
+            f"Reservatório {r + 1:02d}",
+            f"{dia:02d}/{mes:02d}/2024",
+            f"{(i * 37) % 1500:.1f}",
+            "800.0" if i % 3 else "",
+            f"2024.{i % 2 + 1}",
+        ])
+    return buffer.getvalue()
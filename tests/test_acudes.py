@@ -0,0 +1,117 @@
+"""Página dos açudes (pages/acudes.py) comparada com as versões linha a linha que ela substituiu."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from pages.acudes import EstadoPorData, faixas_percentual, status_por_percentual
+
+
+def get_status_color(percentual):
+    """Versão anterior (por linha, via `Series.apply`) da classificação do status."""
+    if pd.isna(percentual): return "#FFFFFF", "N/A", "#000000"
+    for min_val, max_val, color, status in faixas_percentual:
+        if min_val <= percentual <= max_val:
+            text_color = "#FFFFFF" if color in ["#808080", "#FF0000", "#0000FF", "#800080"] else "#000000"
+            return color, status, text_color
+    return "#FFFFFF", "Não classificado", "#000000"
+
+
+LIMITES = [0, 10, 10.05, 10.1, 30, 30.05, 30.1, 50, 50.1, 70, 70.05, 70.1, 100, 100.05, 100.1, 250]
+VALORES = LIMITES + [np.nextafter(v, -np.inf) for v in LIMITES] + [np.nextafter(v, np.inf) for v in LIMITES] + [
+    -0.0, -1, -0.01, 1e9, np.inf, -np.inf, np.nan, None, pd.NA, "42,5", "abc",
+]
+
+
+@pytest.mark.parametrize("valor", VALORES, ids=repr)
+def test_status_igual_ao_por_linha(valor):
+    esperado = get_status_color(pd.to_numeric(valor, errors="coerce"))
+    assert tuple(status_por_percentual(pd.Series([valor], dtype=object)).iloc[0]) == esperado
+
+
+def test_status_em_lote_preserva_indice_e_ordem():
+    serie = pd.Series([55.0, np.nan, 10, 30.1, -5, 120], index=[7, 3, 9, 1, 4, 2], name="Percentual")
+    saida = status_por_percentual(serie)
+    assert list(saida.columns) == ["Cor", "Status", "TextColor"]
+    assert saida.index.equals(serie.index)
+    esperado = serie.apply(lambda x: pd.Series(get_status_color(x), index=["Cor", "Status", "TextColor"]))
+    pd.testing.assert_frame_equal(saida, esperado, check_dtype=False)
+
+
+def test_status_serie_vazia():
+    saida = status_por_percentual(pd.Series([], dtype=float))
+    assert saida.empty and list(saida.columns) == ["Cor", "Status", "TextColor"]
+
+
+def ultimas_pandas(df, reservatorios, inicio, fim, municipio=None, faixa=None):
+    """Versão anterior: filtra o histórico, ordena por data e fica com a primeira linha de cada reservatório."""
+    mask = df["Data de Coleta"].between(inicio, fim) & df["Reservatório"].isin(list(reservatorios))
+    if faixa is not None:
+        mask &= df["Percentual"].between(faixa[0], faixa[1], inclusive="both")
+    dff = df.loc[mask]
+    if municipio is not None:
+        dff = dff[dff["Município"].astype(str) == municipio]
+    return dff.sort_values("Data de Coleta", ascending=False, kind="stable").drop_duplicates(subset=["Reservatório"])
+
+
+def _historico(n=400, semente=5):
+    """Leituras com datas repetidas (no mesmo e entre reservatórios), NaN, NaT e nomes ausentes."""
+    rng = np.random.default_rng(semente)
+    nomes = np.array(["Banabuiú", "Pirabibu", "Fogareiro", "Cipoada", "Patu", None], dtype=object)
+    municipios = np.array(["Quixeramobim", "Senador Pompeu", "Banabuiú", None], dtype=object)
+    datas = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 20, n), unit="D")
+    df = pd.DataFrame({
+        "Reservatório": nomes[rng.integers(0, len(nomes), n)],
+        "Data de Coleta": datas,
+        "Percentual": rng.uniform(-5, 110, n).round(1),
+        "Município": municipios[rng.integers(0, len(municipios), n)],
+    })
+    df.loc[rng.choice(n, 30, replace=False), "Percentual"] = np.nan
+    df.loc[rng.choice(n, 10, replace=False), "Data de Coleta"] = pd.NaT
+    return df
+
+
+CONSULTAS = [
+    dict(inicio="2024-01-01", fim="2024-01-31"),
+    dict(inicio="2024-01-05", fim="2024-01-05"),
+    dict(inicio="2024-01-03", fim="2024-01-12", faixa=(20.0, 60.0)),
+    dict(inicio="2024-01-01", fim="2024-01-31", faixa=(-5.0, 110.0)),
+    dict(inicio="2024-01-01", fim="2024-01-31", municipio="Quixeramobim"),
+    dict(inicio="2024-01-10", fim="2024-01-20", municipio="Banabuiú", faixa=(0.0, 50.0)),
+    dict(inicio="2024-01-01", fim="2024-01-31", municipio="Inexistente"),
+    dict(inicio="2024-02-01", fim="2024-02-28"),
+]
+
+
+@pytest.mark.parametrize("semente", [5, 17, 29])
+@pytest.mark.parametrize("consulta", CONSULTAS, ids=lambda c: ",".join(f"{k}={v}" for k, v in c.items()))
+def test_ultimas_igual_ao_pandas(semente, consulta):
+    df = _historico(semente=semente)
+    reservatorios = ["Banabuiú", "Pirabibu", "Fogareiro", "Patu", "Orós"]
+    inicio, fim = pd.Timestamp(consulta["inicio"]), pd.Timestamp(consulta["fim"])
+    extra = {k: v for k, v in consulta.items() if k in ("municipio", "faixa")}
+
+    esperado = ultimas_pandas(df, reservatorios, inicio, fim, **extra)
+    obtido = df.iloc[EstadoPorData(df).ultimas(reservatorios, inicio, fim, **extra)]
+    pd.testing.assert_frame_equal(obtido, esperado)
+
+
+def test_ultimas_datas_empatadas():
+    df = pd.DataFrame({
+        "Reservatório": ["A", "A", "B", "A", "B", "C", "B"],
+        "Data de Coleta": pd.to_datetime(["2024-01-02", "2024-01-02", "2024-01-02", "2024-01-01", "2024-01-02", "2024-01-02", None]),
+        "Percentual": [np.nan, 20.0, 40.0, 30.0, 50.0, 60.0, 70.0],
+        "Município": ["m", "m", "m", "m", None, "m", "m"],
+    })
+    estado = EstadoPorData(df)
+    inicio, fim = pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-31")
+
+    # Empate na data: fica a primeira linha do reservatório; entre reservatórios, a ordem de df
+    assert estado.ultimas(["C", "B", "A"], inicio, fim).tolist() == [0, 2, 5]
+    # NaN não passa na faixa: a outra linha da mesma data é a escolhida
+    assert estado.ultimas(["A", "B", "C"], inicio, fim, faixa=(0, 100)).tolist() == [1, 2, 5]
+    # Município ausente não atende ao filtro; NaT nunca entra no período
+    assert estado.ultimas(["B"], inicio, fim, municipio="m").tolist() == [2]
+    assert estado.ultimas(["B"], inicio, fim, faixa=(45, 100)).tolist() == [4]
+    for consulta in [{}, {"faixa": (0, 100)}, {"municipio": "m"}, {"faixa": (45, 100)}]:
+        esperado = ultimas_pandas(df, ["A", "B", "C"], inicio, fim, **consulta)
+        assert estado.ultimas(["A", "B", "C"], inicio, fim, **consulta).tolist() == esperado.index.tolist()
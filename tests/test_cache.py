@@ -0,0 +1,132 @@
+"""Recarga single-flight do `cache_arrow` (utils/cache.py): o loader roda fora do lock."""
+import threading
+
+import pandas as pd
+import pytest
+
+from utils import cache as modulo_cache
+from utils.cache import cache_arrow
+
+ESPERA = 5  # segundos: limite de segurança para os joins/waits
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    agora = {"t": 1000.0}
+    monkeypatch.setattr(modulo_cache.time, "monotonic", lambda: agora["t"])
+    return agora
+
+
+class Loader:
+    """Loader controlável: cada chamada pode ficar presa até `liberar()`."""
+
+    def __init__(self):
+        self.chamadas = 0
+        self.dentro = threading.Event()
+        self.solto = threading.Event()
+        self.solto.set()
+        self.falhar = False
+
+    def prender(self):
+        self.dentro.clear()
+        self.solto.clear()
+
+    def __call__(self):
+        self.chamadas += 1
+        self.dentro.set()
+        assert self.solto.wait(ESPERA)
+        if self.falhar:
+            raise RuntimeError("planilha fora do ar")
+        return pd.DataFrame({"valor": [self.chamadas] * 3})
+
+
+def _em_thread(funcao):
+    saida = {}
+
+    def alvo():
+        try:
+            saida["df"] = funcao()
+        except Exception as e:
+            saida["erro"] = e
+
+    t = threading.Thread(target=alvo, daemon=True)
+    t.start()
+    return t, saida
+
+
+def test_durante_a_recarga_os_outros_recebem_o_anterior(tmp_path, relogio):
+    loader = Loader()
+    carregar = cache_arrow("teste", ttl=60, pasta=str(tmp_path))(loader)
+    anterior = carregar()
+    assert anterior["valor"].tolist() == [1, 1, 1]
+
+    relogio["t"] += 61
+    loader.prender()
+    t, saida = _em_thread(carregar)
+    assert loader.dentro.wait(ESPERA)
+
+    # O loader está preso, mas o lock não: quem chega recebe o DataFrame anterior na hora
+    for _ in range(3):
+        assert carregar() is anterior
+    assert loader.chamadas == 2
+
+    loader.solto.set()
+    t.join(ESPERA)
+    assert saida["df"]["valor"].tolist() == [2, 2, 2]
+    assert carregar() is saida["df"]
+    assert loader.chamadas == 2
+
+
+def test_primeira_carga_concorrente_roda_o_loader_uma_vez(tmp_path, relogio):
+    loader = Loader()
+    loader.prender()
+    carregar = cache_arrow("teste", ttl=60, pasta=str(tmp_path))(loader)
+
+    threads = [_em_thread(carregar) for _ in range(5)]
+    assert loader.dentro.wait(ESPERA)
+    loader.solto.set()
+    for t, _ in threads:
+        t.join(ESPERA)
+
+    assert loader.chamadas == 1
+    resultados = [saida["df"] for _, saida in threads]
+    assert all(df is resultados[0] for df in resultados)
+
+
+def test_falha_na_recarga_libera_a_proxima(tmp_path, relogio):
+    loader = Loader()
+    carregar = cache_arrow("teste", ttl=60, pasta=str(tmp_path))(loader)
+    anterior = carregar()
+
+    relogio["t"] += 61
+    loader.prender()
+    loader.falhar = True
+    t, saida = _em_thread(carregar)
+    assert loader.dentro.wait(ESPERA)
+    assert carregar() is anterior
+    loader.solto.set()
+    t.join(ESPERA)
+    assert isinstance(saida["erro"], RuntimeError)
+
+    # A falha não deixa a recarga "presa": a próxima chamada tenta de novo
+    loader.falhar = False
+    assert carregar()["valor"].tolist() == [3, 3, 3]
+
+
+def test_clear_durante_a_recarga_descarta_o_resultado(tmp_path, relogio):
+    loader = Loader()
+    carregar = cache_arrow("teste", ttl=60, pasta=str(tmp_path))(loader)
+    carregar()
+
+    relogio["t"] += 61
+    loader.prender()
+    t, saida = _em_thread(carregar)
+    assert loader.dentro.wait(ESPERA)
+    carregar.clear()
+    loader.solto.set()
+    t.join(ESPERA)
+    assert saida["df"]["valor"].tolist() == [2, 2, 2]
+
+    # O snapshot gravado depois do clear() ainda vale em disco, mas a memória foi descartada
+    assert carregar()["valor"].tolist() == [2, 2, 2]
+    assert loader.chamadas == 2
@@ -0,0 +1,47 @@
+"""Cache global de derivados (utils/derivados.py): tamanho contabilizado e descarte só por LRU."""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from utils import derivados
+
+
+@pytest.fixture(autouse=True)
+def cache_limpo():
+    derivados.limpar()
+    yield
+    derivados.limpar()
+
+
+def test_figura_contabilizada_pelo_json():
+    fig = go.Figure(go.Scatter(x=np.arange(50_000), y=np.random.default_rng(0).random(50_000)))
+    assert derivados._tamanho(fig) >= len(fig.to_json()) > 500_000
+
+
+def test_tupla_com_dicts_soma_os_itens():
+    grande = {"linhas": ["x" * 1000] * 100}
+    assert derivados._tamanho((pd.DataFrame({"a": range(10)}), grande)) > 100_000
+
+
+def test_trocar_filtro_mantem_a_entrada_anterior():
+    calculos = []
+
+    def calcular(filtro):
+        calculos.append(filtro)
+        return pd.DataFrame({"filtro": [filtro]})
+
+    for filtro in ["a", "b", "a", "b"]:
+        derivados.derivado("teste", (filtro,), lambda: calcular(filtro))
+    assert calculos == ["a", "b"]
+    assert derivados.estatisticas()["entradas"] == 2
+
+
+def test_limite_descarta_a_menos_usada(monkeypatch):
+    monkeypatch.setattr(derivados, "LIMITE_BYTES", 2_500)
+    for i in range(3):
+        derivados.derivado("teste", (i,), lambda: np.zeros(100))  # 800 bytes cada
+    derivados.derivado("teste", (0,), lambda: pytest.fail("a entrada 0 ainda deveria estar em cache"))
+    derivados.derivado("teste", (3,), lambda: np.zeros(100))
+    chaves = [c[2] for c in derivados._entradas]
+    assert chaves == [(2,), (0,), (3,)]
@@ -0,0 +1,152 @@
+"""Fila durável do Fale Conosco (utils/fila_envios.py) contra uma aba falsa."""
+import sqlite3
+import time
+
+import pytest
+
+from utils import fila_envios
+from utils.fila_envios import FilaEnvios, RESERVA, ESPERA_BASE
+
+
+class AbaFalsa:
+    """Substituta do worksheet: guarda cada `append_rows` e falha `falhas` vezes antes de aceitar."""
+
+    def __init__(self, falhas=0, ao_enviar=None):
+        self.lotes = []
+        self.falhas = falhas
+        self.ao_enviar = ao_enviar
+
+    def append_rows(self, linhas):
+        if self.ao_enviar is not None:
+            self.ao_enviar()
+        if self.falhas:
+            self.falhas -= 1
+            raise ConnectionError("planilha indisponível")
+        self.lotes.append(linhas)
+
+    @property
+    def linhas(self):
+        return [linha for lote in self.lotes for linha in lote]
+
+
+@pytest.fixture
+def caminho_db(tmp_path):
+    return str(tmp_path / "fila.sqlite3")
+
+
+def _estado(caminho_db):
+    con = sqlite3.connect(caminho_db)
+    try:
+        return con.execute("SELECT tentativas, proxima_tentativa, reservado_ate, erro FROM envios ORDER BY id").fetchall()
+    finally:
+        con.close()
+
+
+def _esvaziar(fila, agora=None):
+    enviadas = 0
+    while n := fila.processar_lote(agora):
+        enviadas += n
+    return enviadas
+
+
+def test_envia_em_lotes_na_ordem(caminho_db):
+    aba = AbaFalsa()
+    fila = FilaEnvios(lambda: aba, caminho_db, tamanho_lote=3)
+    for i in range(7):
+        fila.enfileirar([f"nome {i}", i])
+
+    assert _esvaziar(fila) == 7
+    assert [len(lote) for lote in aba.lotes] == [3, 3, 1]
+    assert aba.linhas == [[f"nome {i}", i] for i in range(7)]
+    assert fila.pendentes() == 0
+    assert all(reservado is None for _, _, reservado, _ in _estado(caminho_db))
+
+
+def test_falha_reagenda_com_backoff(caminho_db, monkeypatch):
+    monkeypatch.setattr(fila_envios.random, "uniform", lambda a, b: 1.0)  # sem jitter
+    aba = AbaFalsa(falhas=2)
+    obter_aba = lambda: aba  # noqa: E731
+    limpezas = []
+    obter_aba.cache_clear = lambda: limpezas.append(1)
+    fila = FilaEnvios(obter_aba, caminho_db)
+    fila.enfileirar(["a"])
+    agora = time.time()
+
+    with pytest.raises(ConnectionError):
+        fila.processar_lote(agora)
+    [(tentativas, proxima, reservado, erro)] = _estado(caminho_db)
+    assert (tentativas, reservado) == (1, None)
+    assert proxima == pytest.approx(agora + ESPERA_BASE)
+    assert "indisponível" in erro
+    assert limpezas == [1]  # aba em cache descartada
+
+    # Antes do horário reagendado nada é enviado
+    assert fila.processar_lote(agora + ESPERA_BASE / 2) == 0
+
+    with pytest.raises(ConnectionError):
+        fila.processar_lote(proxima)
+    [(tentativas, proxima2, _, _)] = _estado(caminho_db)
+    assert tentativas == 2
+    assert proxima2 == pytest.approx(proxima + 2 * ESPERA_BASE)  # espera dobra
+
+    assert fila.processar_lote(proxima2) == 1
+    assert aba.linhas == [["a"]]
+    assert fila.pendentes() == 0
+
+
+def test_pendentes_sobrevivem_ao_reinicio(caminho_db):
+    antes = FilaEnvios(lambda: AbaFalsa(falhas=1), caminho_db)
+    antes.enfileirar(["x"])
+    antes.enfileirar(["y"])
+    with pytest.raises(ConnectionError):
+        antes.processar_lote()
+    del antes
+
+    aba = AbaFalsa()
+    depois = FilaEnvios(lambda: aba, caminho_db)  # mesmo arquivo, novo processo
+    assert depois.pendentes() == 2
+    assert _esvaziar(depois, time.time() + 3600) == 2
+    assert aba.linhas == [["x"], ["y"]]
+
+
+def test_lote_reservado_nao_e_enviado_por_outro_processo(caminho_db):
+    outro = FilaEnvios(lambda: AbaFalsa(), caminho_db)
+    enviadas_pelo_outro = []
+    aba = AbaFalsa(ao_enviar=lambda: enviadas_pelo_outro.append(outro.processar_lote()))
+    fila = FilaEnvios(lambda: aba, caminho_db)
+    for i in range(3):
+        fila.enfileirar([i])
+
+    assert fila.processar_lote() == 3
+    assert enviadas_pelo_outro == [0]  # durante o envio, as linhas estavam reservadas
+    assert aba.linhas == [[0], [1], [2]]
+    assert outro.processar_lote() == 0
+
+
+def test_reserva_vencida_volta_para_a_fila(caminho_db):
+    fila = FilaEnvios(lambda: AbaFalsa(), caminho_db)
+    fila.enfileirar(["perdida"])
+    agora = time.time()
+    assert len(fila._reservar(agora)) == 1  # processo morreu depois de reservar
+
+    aba = AbaFalsa()
+    outro = FilaEnvios(lambda: aba, caminho_db)
+    assert outro.processar_lote(agora + 1) == 0
+    assert outro.processar_lote(agora + RESERVA + 1) == 1
+    assert aba.linhas == [["perdida"]]
+
+
+def test_migra_banco_sem_coluna_de_reserva(caminho_db):
+    con = sqlite3.connect(caminho_db)
+    con.execute(
+        "CREATE TABLE envios (id INTEGER PRIMARY KEY AUTOINCREMENT, linha TEXT NOT NULL, criado_em REAL NOT NULL, "
+        "tentativas INTEGER NOT NULL DEFAULT 0, proxima_tentativa REAL NOT NULL DEFAULT 0, enviado_em REAL, erro TEXT)"
+    )
+    con.execute("INSERT INTO envios (linha, criado_em) VALUES ('[\"antiga\"]', 0)")
+    con.commit()
+    con.close()
+
+    aba = AbaFalsa()
+    fila = FilaEnvios(lambda: aba, caminho_db)
+    assert fila.processar_lote() == 1
+    assert aba.linhas == [["antiga"]]
@@ -0,0 +1,62 @@
+"""Leitura em streaming das camadas GeoJSON (utils/geo.py) nos layouts aceitos."""
+import json
+
+import pytest
+
+from utils.geo import iterar_features, carregar_camada, carregar_camada_compacta
+
+FEATURES = [
+    {"type": "Feature", "properties": {"Name": f"trecho {i}"},
+     "geometry": {"type": "LineString", "coordinates": [[-39.0 - i, -5.0], [-39.1 - i, -5.1]]}}
+    for i in range(3)
+]
+CRS_3857 = {"type": "name", "properties": {"name": "urn:ogc:def:crs:EPSG::3857"}}
+
+
+def _fc(**extra):
+    return {"type": "FeatureCollection", **extra, "features": FEATURES}
+
+
+LAYOUTS = {
+    "geojsonl": "\n".join(json.dumps(f) for f in FEATURES) + "\n",
+    "geojsonl compacto": "\n".join(json.dumps(f, separators=(",", ":")) for f in FEATURES) + "\n",
+    "geojsonl com RS": "".join("\x1e" + json.dumps(f) + "\n" for f in FEATURES),
+    "feature collection minificada": json.dumps(_fc()),
+    "feature collection compacta": json.dumps(_fc(), separators=(",", ":")),
+    "feature collection indentada": json.dumps(_fc(), indent=2),
+    "feature collection ogr2ogr": (
+        '{\n"type": "FeatureCollection",\n"features": [\n'
+        + ",\n".join(json.dumps(f) for f in FEATURES) + "\n]\n}\n"
+    ),
+}
+
+
+@pytest.fixture(params=sorted(LAYOUTS))
+def arquivo(request, tmp_path):
+    caminho = tmp_path / "camada.geojson"
+    caminho.write_text(LAYOUTS[request.param], encoding="utf-8")
+    return str(caminho)
+
+
+def test_iterar_features_le_todas_as_features(arquivo):
+    epsg, features = iterar_features(arquivo)
+    assert epsg == 4326
+    assert [f["properties"]["Name"] for f in features] == [f["properties"]["Name"] for f in FEATURES]
+
+
+def test_carregar_camada_mantem_as_features(arquivo):
+    camada = carregar_camada(arquivo, campos=["Name"])
+    assert len(camada["features"]) == len(FEATURES)
+
+
+def test_carregar_camada_compacta_mantem_as_features(arquivo):
+    assert len(carregar_camada_compacta(arquivo)) == len(FEATURES)
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_crs_da_feature_collection(tmp_path, indent):
+    caminho = tmp_path / "rio.geojson"
+    caminho.write_text(json.dumps(_fc(crs=CRS_3857), indent=indent), encoding="utf-8")
+    epsg, features = iterar_features(str(caminho))
+    assert epsg == 3857
+    assert len(list(features)) == len(FEATURES)
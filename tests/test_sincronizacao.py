@@ -0,0 +1,119 @@
+"""Sincronização incremental (utils/sincronizacao.py) contra a API do Sheets falsa de tests/planilha_falsa.py."""
+import io
+import time
+
+import pandas as pd
+import pytest
+
+import utils.conexoes as conexoes
+from tests.planilha_falsa import PlanilhaFalsa, csv_vazoes
+from utils.sincronizacao import SincronizadorPlanilha, INTERVALO_COMPLETO
+
+
+@pytest.fixture
+def planilha(monkeypatch):
+    planilha = PlanilhaFalsa(csv_vazoes())
+    monkeypatch.setattr(conexoes, "baixar", lambda url, timeout=None: planilha.exportar_csv())
+    return planilha
+
+
+@pytest.fixture
+def sincronizador(planilha, tmp_path):
+    # Passo e janela pequenos para as mudanças caírem fora da janela final
+    s = SincronizadorPlanilha("vazoes", url_csv="csv", fonte=planilha, passo=16, janela=20,
+                              intervalo_completo=3600, pasta=str(tmp_path))
+    assert s.sincronizar().modo == "completo"  # carga inicial
+    return s
+
+
+def _csv(planilha):
+    """O que a leitura direta da exportação CSV devolveria."""
+    return pd.read_csv(io.BytesIO(planilha.exportar_csv()))
+
+
+def _nova_linha(planilha, i):
+    ultima = planilha.linhas[-1]
+    return [ultima[0], f"{i + 1:02d}/12/2099", "123.0", "100.0", ultima[4]]
+
+
+@pytest.mark.parametrize("alterar", [
+    pytest.param(lambda p: None, id="sem mudanças"),
+    pytest.param(lambda p: p.linhas.extend(_nova_linha(p, i) for i in range(5)), id="linhas novas no fim"),
+    pytest.param(lambda p: p.linhas[-10].__setitem__(2, "999.5"), id="correção numa linha recente"),
+    pytest.param(lambda p: p.linhas.pop(len(p.linhas) // 2), id="linha removida no meio"),
+    pytest.param(lambda p: p.linhas[48].__setitem__(0, "Reservatório 99"), id="chave de linha amostrada alterada"),
+])
+def test_delta_igual_ao_csv(planilha, sincronizador, alterar):
+    alterar(planilha)
+    r = sincronizador.sincronizar()
+    assert r.modo == "delta"
+    pd.testing.assert_frame_equal(r.df, _csv(planilha))
+
+
+def test_delta_baixa_menos_que_o_csv(planilha, sincronizador):
+    planilha.linhas.append(_nova_linha(planilha, 0))
+    planilha.zerar_contadores()
+    sincronizador.sincronizar()
+    bytes_delta = planilha.bytes_servidos
+    planilha.zerar_contadores()
+    planilha.exportar_csv()
+    assert bytes_delta < planilha.bytes_servidos / 2
+
+
+def test_cabecalho_alterado_forca_leitura_completa(planilha, sincronizador):
+    planilha.cabecalho[-1] = "Operação (código)"
+    r = sincronizador.sincronizar()
+    assert r.modo == "completo"
+    pd.testing.assert_frame_equal(r.df, _csv(planilha))
+
+
+def test_correcao_antiga_chega_na_leitura_completa_periodica(planilha, sincronizador, monkeypatch):
+    # Sem deslocar linhas, fora das amostras e antes da janela: o delta não vê...
+    planilha.linhas[3][2] = "0.5"
+    assert not sincronizador.sincronizar().df.equals(_csv(planilha))
+    # ...mas a leitura completa vem assim que a última tem intervalo_completo segundos
+    agora = time.time()
+    monkeypatch.setattr(time, "time", lambda: agora + sincronizador.intervalo_completo)
+    r = sincronizador.sincronizar()
+    assert r.modo == "completo"
+    pd.testing.assert_frame_equal(r.df, _csv(planilha))
+
+
+def test_leitura_completa_no_intervalo_padrao(planilha, tmp_path, monkeypatch):
+    s = SincronizadorPlanilha("vazoes", url_csv="csv", fonte=planilha, pasta=str(tmp_path))
+    assert s.intervalo_completo == INTERVALO_COMPLETO == 300
+    agora = time.time()
+    for segundos, modo in [(0, "completo"), (60, "delta"), (240, "delta"), (300, "completo"), (360, "delta")]:
+        monkeypatch.setattr(time, "time", lambda: agora + segundos)
+        assert s.sincronizar().modo == modo
+
+
+def test_falha_da_api_usa_o_csv(planilha, sincronizador, monkeypatch):
+    def falhar(intervalo):
+        raise ConnectionError("API fora do ar")
+
+    monkeypatch.setattr(planilha, "valores", falhar)
+    planilha.linhas.append(_nova_linha(planilha, 1))
+    # Leitura completa recente: fica com a cópia local até vencer o intervalo
+    assert sincronizador.sincronizar().modo == "local"
+    r = sincronizador.sincronizar(completo=True)
+    assert r.modo == "csv"
+    pd.testing.assert_frame_equal(r.df, _csv(planilha))
+
+
+def test_sem_fonte_usa_o_csv_no_intervalo(planilha, tmp_path, monkeypatch):
+    s = SincronizadorPlanilha("vazoes_csv", url_csv="csv", pasta=str(tmp_path))
+    r = s.sincronizar()
+    assert r.modo == "csv"
+    pd.testing.assert_frame_equal(r.df, _csv(planilha))
+
+    # Dentro do intervalo, a cópia local (sem baixar de novo); depois dele, o CSV outra vez
+    planilha.linhas.append(_nova_linha(planilha, 2))
+    planilha.zerar_contadores()
+    assert s.sincronizar().modo == "local"
+    assert planilha.chamadas == 0
+    agora = time.time()
+    monkeypatch.setattr(time, "time", lambda: agora + s.intervalo_completo)
+    r = s.sincronizar()
+    assert r.modo == "csv"
+    pd.testing.assert_frame_equal(r.df, _csv(planilha))
@@ -0,0 +1,130 @@
+"""Índice espacial em grade (utils/spatial_index.py): ponto-no-polígono e vizinho mais próximo."""
+import math
+import random
+
+import numpy as np
+import pytest
+
+from utils.spatial_index import IndiceEspacial
+
+
+def _quadrado(x0, y0, x1, y1, nome):
+    anel = [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+    return {"type": "Feature", "properties": {"nome": nome}, "geometry": {"type": "Polygon", "coordinates": [anel]}}
+
+
+def _em_l(nome):
+    """Polígono côncavo em L: o canto (1..2, 1..2) fica dentro do bounding box, mas fora do polígono."""
+    anel = [[0, 1], [1, 1], [1, 3], [3, 3], [3, 1.5], [2, 1.5], [2, 2], [1.5, 2], [1.5, 1], [0, 1]]
+    return {"type": "Feature", "properties": {"nome": nome}, "geometry": {"type": "Polygon", "coordinates": [anel]}}
+
+
+@pytest.fixture
+def indice():
+    # Dois quadrados vizinhos (aresta comum em x=1) e um polígono em L; grade 2x2 sobre (0, 0)-(3, 3)
+    fc = {"type": "FeatureCollection", "features": [
+        _quadrado(0, 0, 1, 1, "oeste"), _quadrado(1, 0, 3, 1, "leste"), _em_l("norte"),
+    ]}
+    return IndiceEspacial.de_geojson(fc, celulas_por_eixo=2)
+
+
+def _forca_bruta(indice, lon, lat):
+    return [i for i in range(len(indice.camada)) if indice.contem(i, lon, lat)]
+
+
+@pytest.mark.parametrize("lon, lat, esperado", [
+    (0.5, 0.5, "oeste"),
+    (2.0, 0.5, "leste"),
+    (2.5, 2.5, "norte"),
+    (1.2, 1.5, "norte"),
+])
+def test_ponto_dentro(indice, lon, lat, esperado):
+    assert indice.propriedade(indice.localizar(lon, lat), "nome") == esperado
+
+
+@pytest.mark.parametrize("lon, lat", [
+    (-1.0, 0.5),    # fora do limite total
+    (0.5, 3.5),
+    (1.75, 1.25),   # dentro do bounding box do L, fora do polígono
+    (0.5, 2.0),
+])
+def test_ponto_fora(indice, lon, lat):
+    assert indice.localizar(lon, lat) is None
+    assert indice.propriedade(indice.localizar(lon, lat), "nome", "fora") == "fora"
+
+
+@pytest.mark.parametrize("lon, lat", [
+    (1.5, 0.5),     # x=1,5 é a divisa entre as colunas da grade
+    (1.5, 1.5),     # canto comum das quatro células
+    (0.5, 1.5),     # y=1,5 é a divisa entre as linhas da grade
+    (3.0, 2.5),     # limite máximo da camada (célula presa à última)
+])
+def test_ponto_na_divisa_das_celulas(indice, lon, lat):
+    achados = _forca_bruta(indice, lon, lat)
+    assert indice.localizar(lon, lat) == (achados[0] if achados else None)
+
+
+def test_aresta_comum_pertence_a_um_so_poligono(indice):
+    assert len(_forca_bruta(indice, 1.0, 0.5)) == 1
+    assert indice.localizar(1.0, 0.5) in _forca_bruta(indice, 1.0, 0.5)
+
+
+def test_grade_igual_a_forca_bruta(indice):
+    rng = random.Random(7)
+    for _ in range(500):
+        lon, lat = rng.uniform(-0.5, 3.5), rng.uniform(-0.5, 3.5)
+        achados = _forca_bruta(indice, lon, lat)
+        assert indice.localizar(lon, lat) == (achados[0] if achados else None)
+
+
+def test_localizar_varios(indice):
+    lons = [0.5, 2.0, 2.5, -1.0, np.nan, 1.75, 1.5]
+    lats = [0.5, 0.5, 2.5, 0.5, 0.5, 1.25, np.nan]
+    saida = indice.localizar_varios(lons, lats)
+    assert saida.dtype == np.int64
+    assert saida.tolist() == [0, 1, 2, -1, -1, -1, -1]
+    assert [indice.propriedade(i, "nome") for i in saida] == ["oeste", "leste", "norte", None, None, None, None]
+
+
+def _haversine(lon1, lat1, lon2, lat2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0088 * math.asin(math.sqrt(a))
+
+
+@pytest.fixture
+def pontos():
+    rng = random.Random(11)
+    lons = [rng.uniform(-40.5, -38.5) for _ in range(60)]
+    lats = [rng.uniform(-6.5, -4.5) for _ in range(60)]
+    return lons, lats
+
+
+def test_mais_proximos_igual_a_forca_bruta(pontos):
+    lons, lats = pontos
+    indice = IndiceEspacial.de_pontos(lons, lats, [{"id": i} for i in range(len(lons))])
+    rng = random.Random(3)
+    consultas = [(rng.uniform(-41, -38), rng.uniform(-7, -4)) for _ in range(40)]
+    idx, dist = indice.mais_proximos([c[0] for c in consultas], [c[1] for c in consultas], k=3)
+    assert idx.shape == dist.shape == (len(consultas), 3)
+    for (lon, lat), linha_idx, linha_dist in zip(consultas, idx, dist):
+        bruto = sorted((_haversine(lon, lat, x, y), i) for i, (x, y) in enumerate(zip(lons, lats)))[:3]
+        assert linha_idx.tolist() == [i for _, i in bruto]
+        assert linha_dist == pytest.approx([d for d, _ in bruto], rel=1e-9)
+
+
+def test_mais_proximo_de_um_ponto_da_camada(pontos):
+    lons, lats = pontos
+    indice = IndiceEspacial.de_pontos(lons, lats)
+    i, d = indice.mais_proximo(lons[5], lats[5])
+    assert (i, d) == (5, pytest.approx(0.0, abs=1e-9))
+
+
+def test_mais_proximos_ignora_poligonos_e_limita_k(indice):
+    # Camada só com polígonos: nenhum ponto candidato
+    idx, dist = indice.mais_proximos([0.5], [0.5], k=2)
+    assert idx.shape == dist.shape == (1, 0)
+    assert indice.mais_proximo(0.5, 0.5) == (None, None)
+
+    idx, _ = IndiceEspacial.de_pontos([-39.0, -39.5], [-5.0, -5.5]).mais_proximos([-39.1], [-5.1], k=5)
+    assert idx.tolist() == [[0, 1]]
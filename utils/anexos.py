@@ -0,0 +1,97 @@
+import os
+import hashlib
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:  # miniaturas são opcionais
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Armazenamento endereçado por conteúdo: objetos/<sha[:2]>/<sha> (o nome original fica na referência)
+ANEXOS_DIR = os.environ.get("PORTAL_ANEXOS_DIR", "anexos")
+TAMANHO_BLOCO = 1 << 20  # 1 MiB por leitura
+TAMANHO_MINIATURA = (320, 320)
+EXTENSOES_IMAGEM = {".jpg", ".jpeg", ".png"}
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="miniaturas")
+
+
+def _caminho_objeto(sha):
+    return os.path.join(ANEXOS_DIR, "objetos", sha[:2], sha)
+
+
+def caminho_miniatura(sha):
+    return os.path.join(ANEXOS_DIR, "miniaturas", sha[:2], f"{sha}.jpg")
+
+
+def salvar_anexo(arquivo, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Grava um arquivo enviado (objeto com `.read(n)`, ex.: UploadedFile do Streamlit)
+    em blocos, calculando o SHA-256 durante a escrita. Conteúdo já existente não é
+    gravado de novo. Retorna a referência {sha256, nome, tamanho, tipo, caminho}.
+    """
+    nome = os.path.basename(getattr(arquivo, "name", "") or "anexo")
+    ext = os.path.splitext(nome)[1].lower()
+    pasta_tmp = os.path.join(ANEXOS_DIR, "tmp")
+    os.makedirs(pasta_tmp, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(suffix=".part", dir=pasta_tmp)
+
+    h = hashlib.sha256()
+    tamanho = 0
+    if hasattr(arquivo, "seek"):
+        arquivo.seek(0)
+    try:
+        with os.fdopen(fd, "wb") as destino:
+            for bloco in iter(lambda: arquivo.read(tamanho_bloco), b""):
+                h.update(bloco)
+                destino.write(bloco)
+                tamanho += len(bloco)
+        sha = h.hexdigest()
+        final = _caminho_objeto(sha)
+        if not os.path.exists(final):  # duplicado: mantém o objeto já armazenado
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.replace(tmp, final)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    if ext in EXTENSOES_IMAGEM and Image is not None and not os.path.exists(caminho_miniatura(sha)):
+        _executor.submit(gerar_miniatura, final, caminho_miniatura(sha))
+
+    return {
+        "sha256": sha,
+        "nome": nome,
+        "tamanho": tamanho,
+        "tipo": getattr(arquivo, "type", "") or "",
+        "caminho": final,
+    }
+
+
+def gerar_miniatura(origem, destino, tamanho=TAMANHO_MINIATURA):
+    """Gera uma miniatura JPEG; o `draft` do Pillow decodifica JPEGs já reduzidos."""
+    try:
+        with Image.open(origem) as img:
+            img.draft("RGB", tamanho)
+            img.thumbnail(tamanho)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            tmp = f"{destino}.{os.getpid()}.tmp"
+            img.convert("RGB").save(tmp, "JPEG", quality=80, optimize=True)
+            os.replace(tmp, destino)
+        return destino
+    except Exception as e:
+        logger.warning("Não foi possível gerar a miniatura de %s: %s", origem, e)
+        return None
+
+
+def salvar_anexos(arquivos):
+    """Salva uma lista de anexos e retorna suas referências (na ordem recebida)."""
+    return [salvar_anexo(a) for a in (arquivos or [])]
+
+
+def referencias_para_planilha(referencias):
+    """Texto da coluna de anexos na planilha: 'nome [sha256:abc123...]' separados por ';'."""
+    return "; ".join(f"{r['nome']} [sha256:{r['sha256'][:16]}]" for r in referencias)
@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import logging
+import functools
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.feather as feather
+except ImportError:  # sem pyarrow os snapshots ficam só em memória
+    pa = ipc = feather = None
+
+logger = logging.getLogger(__name__)
+
+# Diretório dos caches binários gerados a partir dos arquivos locais (xlsx, geojson...)
+CACHE_DIR = os.environ.get("PORTAL_CACHE_DIR", ".cache")
+# Snapshots Arrow IPC dos datasets das planilhas (abertos por mmap)
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "snapshots")
+
+
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    """Calcula o SHA-256 de um arquivo lendo em blocos."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _caminhos_cache(namespace, caminho_origem):
+    base = os.path.splitext(os.path.basename(caminho_origem))[0]
+    pasta = os.path.join(CACHE_DIR, namespace)
+    return pasta, os.path.join(pasta, f"{base}.pkl"), os.path.join(pasta, f"{base}.meta.json")
+
+
+def carregar_ou_gerar(caminho_origem, namespace, gerar, versao=1):
+    """
+    Retorna o objeto derivado de `caminho_origem`, usando um cache binário em disco.
+
+    O cache é válido enquanto mtime/tamanho do arquivo de origem não mudarem; se
+    mudarem, o hash do conteúdo é comparado antes de regerar (ex.: arquivo apenas
+    tocado ou copiado). `gerar(caminho_origem)` só é chamado quando necessário.
+    """
+    pasta, arq_cache, arq_meta = _caminhos_cache(namespace, caminho_origem)
+    st_origem = os.stat(caminho_origem)
+
+    meta = {}
+    try:
+        with open(arq_meta, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        meta = {}
+
+    valido = bool(meta) and meta.get("versao") == versao and os.path.exists(arq_cache)
+    sha = None
+    if valido and (meta.get("mtime_ns") != st_origem.st_mtime_ns or meta.get("tamanho") != st_origem.st_size):
+        sha = hash_arquivo(caminho_origem)
+        valido = meta.get("sha256") == sha
+
+    if valido:
+        try:
+            with open(arq_cache, "rb") as f:
+                obj = pickle.load(f)
+            if sha is not None:
+                # Conteúdo idêntico: só atualiza o carimbo de tempo
+                _gravar_meta(arq_meta, st_origem, sha, versao)
+            return obj
+        except Exception:
+            pass  # cache corrompido → regenera
+
+    obj = gerar(caminho_origem)
+    try:
+        os.makedirs(pasta, exist_ok=True)
+        tmp = f"{arq_cache}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, arq_cache)
+        _gravar_meta(arq_meta, st_origem, sha or hash_arquivo(caminho_origem), versao)
+    except OSError:
+        pass  # sem permissão de escrita: segue só com o resultado em memória
+    return obj
+
+
+def versao_dataframe(df):
+    """Impressão digital do conteúdo de um DataFrame (colunas + valores), para chaves de cache."""
+    h = hashlib.sha1("|".join(map(str, df.columns)).encode("utf-8"))
+    h.update(np.ascontiguousarray(pd.util.hash_pandas_object(df, index=False).to_numpy()).tobytes())
+    return h.hexdigest()[:16]
+
+
+def _gravar_meta(arq_meta, st_origem, sha, versao):
+    tmp = f"{arq_meta}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"mtime_ns": st_origem.st_mtime_ns, "tamanho": st_origem.st_size, "sha256": sha, "versao": versao}, f)
+    os.replace(tmp, arq_meta)
+
+
+# ============== Cache em memória com stale-while-revalidate ================
+def cache_swr(ttl, max_stale=None):
+    """
+    Decorador de cache por processo com TTL e stale-while-revalidate.
+
+    Dentro do TTL devolve o valor em cache. Vencido, devolve o valor antigo na
+    hora e dispara uma única atualização em segundo plano; se a atualização
+    falhar, o valor antigo continua valendo. Sem valor (ou vencido há mais de
+    `max_stale` segundos) a carga é síncrona. O valor é compartilhado entre
+    sessões: quem chama não deve alterá-lo.
+    """
+    def decorador(func):
+        entradas = {}
+        atualizando = set()
+        lock = threading.Lock()
+
+        def _carregar(chave, args, kwargs):
+            try:
+                valor = func(*args, **kwargs)
+                with lock:
+                    entradas[chave] = (valor, time.monotonic())
+                return valor
+            finally:
+                with lock:
+                    atualizando.discard(chave)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            chave = (args, tuple(sorted(kwargs.items())))
+            agora = time.monotonic()
+            with lock:
+                entrada = entradas.get(chave)
+                if entrada is not None:
+                    valor, carimbo = entrada
+                    idade = agora - carimbo
+                    if idade < ttl:
+                        return valor
+                    if max_stale is None or idade < ttl + max_stale:
+                        if chave not in atualizando:
+                            atualizando.add(chave)
+                            threading.Thread(target=_carregar_silencioso, args=(chave, args, kwargs), daemon=True).start()
+                        return valor
+            return _carregar(chave, args, kwargs)
+
+        def _carregar_silencioso(chave, args, kwargs):
+            try:
+                _carregar(chave, args, kwargs)
+            except Exception as e:
+                logger.warning("Falha ao atualizar %s em segundo plano: %s", func.__name__, e)
+
+        def clear():
+            with lock:
+                entradas.clear()
+
+        wrapper.clear = clear
+        return wrapper
+    return decorador
+
+
+# ============== Snapshots Arrow IPC (mmap) ================
+def gravar_arrow(df, caminho):
+    """Grava `df` (com `attrs`) como Arrow IPC sem compressão, pronto para ser aberto por mmap."""
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    feather.write_feather(df, tmp, compression="uncompressed")
+    os.replace(tmp, caminho)
+
+
+def abrir_arrow(caminho):
+    """
+    DataFrame sobre o arquivo mapeado em memória: colunas numéricas sem nulos e
+    textos (ArrowStringArray) apontam para o mmap, sem cópia e somente leitura.
+    """
+    tabela = ipc.open_file(pa.memory_map(caminho, "r")).read_all()
+    return tabela.to_pandas(split_blocks=True)
+
+
+def cache_arrow(nome, ttl, pasta=None):
+    """
+    Decorador para loaders de DataFrame sem argumentos, no lugar de `st.cache_data`.
+
+    O resultado vira um snapshot Arrow IPC em disco e é devolvido aberto por mmap:
+    cada acerto devolve o mesmo DataFrame, sem pickle nem cópia (colunas somente
+    leitura; quem chama não deve alterá-lo). Vencido o TTL o loader roda de novo;
+    se o conteúdo não mudou, o arquivo e o mapeamento atuais são mantidos. Um
+    snapshot em disco ainda dentro do TTL é reaproveitado depois de reiniciar o
+    processo, sem baixar nem parsear. Resultados vazios (erro) não viram snapshot.
+
+    O loader roda fora do lock e uma única vez por vez (single-flight): durante a
+    recarga as outras chamadas recebem o DataFrame anterior na hora; só quem não
+    tem nenhum (primeira carga) espera pelo resultado.
+    """
+    def decorador(func):
+        estado = {}  # df, carimbo (monotonic), caminho
+        lock = threading.Lock()
+        recarga = threading.Condition(lock)
+        controle = {"atualizando": False, "geracao": 0}  # geracao muda a cada clear()
+
+        def _pasta():
+            return pasta or SNAPSHOT_DIR
+
+        def _snapshots():
+            try:
+                return [e for e in os.scandir(_pasta()) if e.name.startswith(f"{nome}-") and e.name.endswith(".arrow")]
+            except FileNotFoundError:
+                return []
+
+        def _do_disco():
+            entradas = _snapshots()
+            if not entradas:
+                return None
+            recente = max(entradas, key=lambda e: e.stat().st_mtime)
+            idade = time.time() - recente.stat().st_mtime
+            if idade >= ttl:
+                return None
+            try:
+                return recente.path, abrir_arrow(recente.path), idade
+            except (OSError, pa.ArrowException) as e:
+                logger.warning("Snapshot %s ilegível, recarregando: %s", recente.path, e)
+                return None
+
+        def _persistir(df):
+            if pa is None or df is None or df.empty:
+                return df, None
+            versao = df.attrs.get("versao") or versao_dataframe(df)
+            caminho = os.path.join(_pasta(), f"{nome}-{versao}.arrow")
+            if estado.get("caminho") == caminho and "df" in estado:
+                os.utime(caminho)  # conteúdo igual: só renova o carimbo
+                return estado["df"], caminho
+            try:
+                os.makedirs(_pasta(), exist_ok=True)
+                if os.path.exists(caminho):
+                    os.utime(caminho)
+                else:
+                    gravar_arrow(df, caminho)
+                mapeado = abrir_arrow(caminho)
+            except (OSError, TypeError, ValueError, pa.ArrowException) as e:
+                logger.warning("Sem snapshot Arrow para %s (segue em memória): %s", nome, e)
+                return df, None
+            mapeado.attrs["versao"] = versao
+            for e in _snapshots():
+                if e.path != caminho:
+                    try:
+                        os.remove(e.path)  # quem ainda mapeia o antigo continua lendo até soltar
+                    except OSError:
+                        pass
+            return mapeado, caminho
+
+        @functools.wraps(func)
+        def wrapper():
+            agora = time.monotonic()
+            with lock:
+                while True:
+                    if "df" in estado and agora - estado["carimbo"] < ttl:
+                        return estado["df"]
+                    if "df" not in estado and not controle["atualizando"] and pa is not None:
+                        achado = _do_disco()  # com carga em andamento o snapshot pode estar sendo gravado
+                        if achado is not None:
+                            caminho, df, idade = achado
+                            estado.update(df=df, carimbo=agora - idade, caminho=caminho)
+                            return df
+                    if not controle["atualizando"]:
+                        break
+                    if "df" in estado:
+                        return estado["df"]  # outra chamada já está recarregando: serve o anterior
+                    recarga.wait()  # primeira carga em andamento: espera o resultado
+                controle["atualizando"] = True
+                geracao = controle["geracao"]
+
+            try:
+                df, caminho = _persistir(func())
+            except BaseException:
+                with lock:
+                    controle["atualizando"] = False
+                    recarga.notify_all()  # quem esperava tenta carregar por conta própria
+                raise
+            with lock:
+                if controle["geracao"] == geracao:  # um clear() no meio descarta o resultado
+                    estado.update(df=df, carimbo=agora, caminho=caminho)
+                controle["atualizando"] = False
+                recarga.notify_all()
+            return df
+
+        def clear():
+            """Descarta o cache em memória e os snapshots em disco (a próxima chamada recarrega)."""
+            with lock:
+                controle["geracao"] += 1
+                estado.clear()
+                for e in _snapshots():
+                    try:
+                        os.remove(e.path)
+                    except OSError:
+                        pass
+
+        wrapper.clear = clear
+        return wrapper
+    return decorador
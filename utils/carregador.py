@@ -0,0 +1,77 @@
+"""
+Processo carregador do modo multi-processo.
+
+    PORTAL_SEGMENTO_DIR=/dev/shm/portal python -m utils.carregador
+
+Baixa as planilhas e lê as camadas GeoJSON uma única vez, publica tudo no
+segmento compartilhado (Arrow IPC + .npy, ver utils/segmento.py) e repete a
+cada `--intervalo` segundos. Os workers do Streamlit com a mesma
+PORTAL_SEGMENTO_DIR só anexam a versão publicada, sem baixar nem parsear.
+"""
+import os
+import time
+import inspect
+import logging
+import argparse
+
+import utils.segmento as segmento
+
+logger = logging.getLogger("utils.carregador")
+
+INTERVALO_PADRAO = 300  # mesmo intervalo da leitura completa das vazões (INTERVALO_COMPLETO)
+
+
+def _loaders():
+    from utils import common
+    from pages import o_comite
+    return {
+        "vazoes": common.carregar_dados_vazoes,
+        "reservatorios": common.load_reservatorios_data,
+        "docs": common.load_docs_data,
+        "situacao_sedes": common.load_situacao_sedes_data,
+        "representantes": lambda: inspect.unwrap(o_comite.load_representantes_data)().df,
+    }
+
+
+def coletar():
+    """Executa o corpo de cada loader (sem os caches) e lê as camadas dos arquivos."""
+    from utils.common import ler_camadas_geojson
+    datasets = {}
+    for nome, loader in _loaders().items():
+        try:
+            df = inspect.unwrap(loader)()
+        except Exception as e:
+            logger.warning("Falha ao carregar %s: %s", nome, e)
+            continue
+        if df is not None and not df.empty:
+            datasets[nome] = df
+    return datasets, ler_camadas_geojson()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publica datasets e camadas no segmento compartilhado.")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_PADRAO, help="segundos entre atualizações")
+    parser.add_argument("--uma-vez", action="store_true", help="publica uma vez e sai")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    if not segmento.ativo():
+        parser.error("defina PORTAL_SEGMENTO_DIR (a mesma pasta usada pelos workers)")
+    os.makedirs(segmento.SEGMENTO_DIR, exist_ok=True)
+
+    while True:
+        inicio = time.monotonic()
+        try:
+            datasets, camadas = coletar()
+            versao = segmento.publicar(datasets, camadas)
+            logger.info("Versão %s: %d datasets, %d camadas (%.1f s)",
+                        versao, len(datasets), len(camadas), time.monotonic() - inicio)
+        except Exception:
+            logger.exception("Falha ao publicar o segmento; os workers seguem na versão anterior")
+        if args.uma_vez:
+            return
+        time.sleep(max(args.intervalo - (time.monotonic() - inicio), 1.0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import unicodedata
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# Categorias canônicas de criticidade (ordem da legenda do mapa)
+CRITICIDADE_ALTA = "Criticidade Alta"
+CRITICIDADE_MEDIA = "Criticidade Média"
+CRITICIDADE_BAIXA = "Criticidade Baixa"
+FORA_DE_CRITICIDADE = "Fora de Criticidade"
+SEM_CLASSIFICACAO = "Sem classificação"
+CATEGORIAS = [CRITICIDADE_ALTA, CRITICIDADE_MEDIA, CRITICIDADE_BAIXA, FORA_DE_CRITICIDADE, SEM_CLASSIFICACAO]
+TIPO_CLASSIFICACAO = pd.CategoricalDtype(CATEGORIAS, ordered=True)
+
+# Cor de cada categoria, na mesma ordem de CATEGORIAS (indexável pelo código da categoria)
+CORES = {
+    CRITICIDADE_ALTA: "#E24F42",
+    CRITICIDADE_MEDIA: "#ECC116",
+    CRITICIDADE_BAIXA: "#F4FA4A",
+    FORA_DE_CRITICIDADE: "#8DCC90",
+    SEM_CLASSIFICACAO: "#999999",
+}
+CORES_POR_CODIGO = np.array([CORES[c] for c in CATEGORIAS], dtype=object)
+
+# Nomes de propriedade aceitos no GeoJSON de situação
+CHAVES_CLASSIFICACAO = ["Classificação", "classificacao", "CLASSIFICACAO", "classificação", "situacao", "SITUACAO"]
+
+
+def _sem_acento(texto):
+    return "".join(ch for ch in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(ch))
+
+
+@lru_cache(maxsize=1024)
+def _padronizar_texto(texto):
+    c = _sem_acento(texto.strip().lower())
+    if not c:
+        return SEM_CLASSIFICACAO
+    if c == "normal" or ("fora" in c and "criticidade" in c):
+        return FORA_DE_CRITICIDADE
+    if "alta" in c:
+        return CRITICIDADE_ALTA
+    if "media" in c:
+        return CRITICIDADE_MEDIA
+    if "baixa" in c:
+        return CRITICIDADE_BAIXA
+    return SEM_CLASSIFICACAO
+
+
+def padronizar_classificacao(valor):
+    """Converte qualquer grafia de classificação para uma das `CATEGORIAS` (desconhecidas → "Sem classificação")."""
+    if valor is None or (isinstance(valor, float) and valor != valor):
+        return SEM_CLASSIFICACAO
+    return _padronizar_texto(str(valor))
+
+
+def cor_da_classificacao(valor):
+    """Cor da legenda para um valor de classificação em qualquer grafia."""
+    return CORES[padronizar_classificacao(valor)]
+
+
+def categorizar_classificacao(serie):
+    """
+    Converte uma Series de classificações em um Categorical ordenado (`CATEGORIAS`).
+    A padronização é feita só sobre os valores distintos e depois espalhada pelos códigos.
+    """
+    codigos, distintos = pd.factorize(serie, use_na_sentinel=True)
+    mapa = np.array([CATEGORIAS.index(padronizar_classificacao(v)) for v in distintos] + [CATEGORIAS.index(SEM_CLASSIFICACAO)], dtype="int8")
+    return pd.Categorical.from_codes(mapa[codigos], dtype=TIPO_CLASSIFICACAO)
+
+
+def codigos_selecionados(classes_sel):
+    """Códigos (posições em CATEGORIAS) das classificações escolhidas no filtro."""
+    return np.array(sorted({CATEGORIAS.index(padronizar_classificacao(c)) for c in (classes_sel or [])}), dtype="int8")
+
+
+def classificacao_das_propriedades(props):
+    """Classificação padronizada de uma feature, procurando as variantes de nome da propriedade."""
+    if isinstance(props, dict):
+        for k in CHAVES_CLASSIFICACAO:
+            v = props.get(k)
+            if v is not None and not (isinstance(v, float) and v != v):
+                return padronizar_classificacao(v)
+    return SEM_CLASSIFICACAO
+
+
+def particionar_por_classificacao(geojson_fc):
+    """Agrupa as features de uma FeatureCollection por classificação padronizada: {categoria: tuple(features)}."""
+    grupos = {}
+    for f in (geojson_fc or {}).get("features", []) or []:
+        grupos.setdefault(classificacao_das_propriedades(f.get("properties")), []).append(f)
+    return {k: tuple(v) for k, v in grupos.items()}
+
+
+@lru_cache(maxsize=None)
+def situa_por_classificacao():
+    """Camada de situação dos municípios (simplificada) já particionada por classificação."""
+    from utils.common import camada_simplificada
+    return particionar_por_classificacao(camada_simplificada("geojson_situa"))
+
+
+@lru_cache(maxsize=64)
+def _unir(chaves):
+    particoes = situa_por_classificacao()
+    feats = [f for k in chaves for f in particoes.get(k, ())]
+    return {"type": "FeatureCollection", "features": feats} if feats else {}
+
+
+def situa_filtrada(classes_sel):
+    """União das partições selecionadas (cacheada por seleção); {} quando nada sobra."""
+    chaves = {padronizar_classificacao(c) for c in (classes_sel or [])}
+    return _unir(tuple(k for k in situa_por_classificacao() if k in chaves))
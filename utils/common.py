@@ -3,58 +3,189 @@ import streamlit as st
 import pandas as pd
 import json
 import os
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime, timedelta, timezone
 from functools import lru_cache
+from utils.cache import carregar_ou_gerar, versao_dataframe, cache_arrow
+from utils.instrumentacao import instrumentar, registrar_miss
+from utils.segmento import do_segmento, segmento_atual
+from utils.geo import carregar_camada, carregar_camada_compacta, CamadasGeoJSON
+from utils.classificacao import categorizar_classificacao
+from utils.fila_envios import FilaEnvios
+from utils.anexos import referencias_para_planilha
+from utils.conexoes import ler_csv_remoto, cliente_gspread
+from utils.sincronizacao import SincronizadorPlanilha, fonte_de_secrets
 
 # ============== Carregamento de GeoJSON e dados (Cacheados) ================
+GEOJSON_ARQUIVOS = {
+    "trechos_perene.geojson": "geojson_trechos",
+    "Açudes_Monitorados.geojson": "geojson_acudes",
+    "Sedes_Municipais.geojson": "geojson_sedes",
+    "c_gestoras.geojson": "geojson_c_gestoras",
+    "poligno_municipios.geojson": "geojson_poligno",
+    "bacia_banabuiu.geojson": "geojson_bacia",
+    "pontos_controle.geojson": "geojson_pontos",
+    "situa_municipio.geojson": "geojson_situa",
+}
+
+@instrumentar()
 @lru_cache(maxsize=None)
+@registrar_miss
 def load_geojson_data():
-    """Carrega os arquivos GeoJSON e retorna um dicionário com os dados."""
-    files = {
-        "trechos_perene.geojson": "geojson_trechos",
-        "Açudes_Monitorados.geojson": "geojson_acudes",
-        "Sedes_Municipais.geojson": "geojson_sedes",
-        "c_gestoras.geojson": "geojson_c_gestoras",
-        "poligno_municipios.geojson": "geojson_poligno",
-        "bacia_banabuiu.geojson": "geojson_bacia",
-        "pontos_controle.geojson": "geojson_pontos",
-        "situa_municipio.geojson": "geojson_situa",
-    }
+    """
+    Carrega os arquivos GeoJSON em forma compacta (arrays NumPy por camada). O
+    resultado se comporta como um dicionário somente leitura: `dados.get("geojson_bacia", {})`
+    monta a FeatureCollection sob demanda. No modo segmento as camadas vêm do
+    segmento publicado pelo carregador (mmap), sem ler os arquivos.
+    """
+    seg = segmento_atual()
+    camadas = seg.camadas() if seg is not None else {}
+    return CamadasGeoJSON(camadas or ler_camadas_geojson())
+
+def ler_camadas_geojson():
+    """Lê os arquivos GeoJSON de `data/` para `CoordenadasCamada` (camadas ausentes ficam de fora)."""
     data = {}
-    for filename, var_name in files.items():
+    for filename, var_name in GEOJSON_ARQUIVOS.items():
         filepath = os.path.join("data", filename)
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                data[var_name] = json.load(f)
+            data[var_name] = carregar_camada_compacta(filepath)
         except FileNotFoundError:
             st.warning(f"Arquivo GeoJSON não encontrado: {filename}. O mapa pode não renderizar corretamente.")
-            data[var_name] = {}
         except json.JSONDecodeError:
             st.error(f"Erro ao decodificar JSON do arquivo: {filename}. Verifique a formatação do arquivo.")
+    return data
+
+@instrumentar()
+@lru_cache(maxsize=None)
+@registrar_miss
+def coordenadas_da_camada(nome):
+    """Coordenadas achatadas (NumPy) de uma camada de `load_geojson_data`, calculadas uma vez por processo."""
+    return load_geojson_data().camada(nome)
+
+@instrumentar()
+@lru_cache(maxsize=None)
+@registrar_miss
+def camada_simplificada(nome, tolerancia=0.0005):
+    """Versão simplificada (Douglas-Peucker, tolerância em graus) de uma camada, para desenho no mapa."""
+    return coordenadas_da_camada(nome).simplificar(tolerancia)
+
+@instrumentar()
+@lru_cache(maxsize=None)
+@registrar_miss
+def load_rios_perenizados_data():
+    """
+    Carrega as camadas dos rios perenizados (rio_quixera.geojson em EPSG:3857 e
+    trecho.geojsonl.json em GeoJSONL), reprojetadas para EPSG:4326 e simplificadas.
+    O resultado fica em cache no disco e só é refeito quando o arquivo muda.
+    """
+    files = {
+        "rio_quixera.geojson": "geojson_rio_quixera",
+        "trecho.geojsonl.json": "geojson_trecho_quixeramobim",
+    }
+    data = {}
+    for filename, var_name in files.items():
+        try:
+            data[var_name] = carregar_ou_gerar(filename, "camadas", lambda caminho: carregar_camada(caminho, campos=["Name"]))
+        except FileNotFoundError:
+            st.warning(f"Arquivo de camada não encontrado: {filename}.")
+            data[var_name] = {}
+        except (json.JSONDecodeError, ValueError) as e:
+            st.error(f"Erro ao ler a camada {filename}: {e}")
             data[var_name] = {}
     return data
 
-@st.cache_data(ttl=300)
+PLANILHA_VAZOES_ID = "1pbNcZ9hS8DhotdkYuPc8kIOy5dgyoYQb384-jgqLDfA"
+
+@lru_cache(maxsize=1)
+def sincronizador_vazoes():
+    """Sincronizador da planilha de vazões: delta pela API com a conta de serviço, ou CSV completo sem ela."""
+    return SincronizadorPlanilha(
+        "vazoes",
+        url_csv=f"https://docs.google.com/spreadsheets/d/{PLANILHA_VAZOES_ID}/export?format=csv",
+        fonte=fonte_de_secrets(PLANILHA_VAZOES_ID),
+    )
+
+@instrumentar()
+@do_segmento("vazoes")
+@cache_arrow("vazoes", ttl=60)  # deltas a cada minuto; leitura completa a cada 5 min (utils/sincronizacao.py)
+@registrar_miss
 def carregar_dados_vazoes():
-    """Carrega os dados de vazão do Google Sheets."""
+    """Carrega os dados de vazão do Google Sheets (com fallback para as planilhas locais)."""
     try:
-        url = "https://docs.google.com/spreadsheets/d/1pbNcZ9hS8DhotdkYuPc8kIOy5dgyoYQb384-jgqLDfA/export?format=csv"
-        df = pd.read_csv(url)
+        df = sincronizador_vazoes().sincronizar().df
         df["Data"] = pd.to_datetime(df["Data"], format="%d/%m/%Y", errors="coerce")
         df["Mês"] = df["Data"].dt.to_period("M").astype(str)
+        df.attrs["versao"] = versao_dataframe(df)  # chave das permutações/exportações desta carga
         return df
     except Exception as e:
-        st.error(f"Erro ao carregar dados de vazões: {e}")
+        df_local = carregar_vazoes_locais()
+        if df_local.empty:
+            st.error(f"Erro ao carregar dados de vazões: {e}")
+            return pd.DataFrame()
+        st.warning(f"Planilha online indisponível ({e}). Exibindo os dados locais das planilhas GRBANABUIU.")
+        df_local.attrs["versao"] = versao_dataframe(df_local)
+        return df_local
+
+# ============== Planilhas locais (xlsx → cache binário tipado) ================
+VAZOES_XLSX = "GRBANABUIU_VAZÕES.xlsx"
+PERENE_XLSX = "GRBANABUIU_PERENE.xlsx"
+
+def _ler_vazoes_xlsx(caminho):
+    """Lê uma planilha GRBANABUIU (aba Vazao_operada) e normaliza os tipos das colunas."""
+    df = pd.read_excel(caminho, sheet_name=0, engine="openpyxl")
+    df.columns = [str(c).strip() for c in df.columns]
+    df["Reservatório Monitorado"] = df["Reservatório Monitorado"].astype(str).str.strip()
+    df["Data"] = pd.to_datetime(df["Data"], dayfirst=True, errors="coerce")
+    for col in ["Vazão Operada", "Vazao_Aloc", "DifData", "MediaVzOp"]:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    df = df.dropna(subset=["Data"])
+    df["Mês"] = df["Data"].dt.to_period("M").astype(str)
+    if "Operação" not in df.columns:
+        df["Operação"] = pd.NA
+    return df.reset_index(drop=True)
+
+def _carregar_xlsx_local(arquivo):
+    if not os.path.exists(arquivo):
+        st.warning(f"Planilha local não encontrada: {arquivo}.")
+        return pd.DataFrame()
+    try:
+        return carregar_ou_gerar(arquivo, "xlsx", _ler_vazoes_xlsx)
+    except Exception as e:
+        st.error(f"Erro ao ler a planilha local {arquivo}: {e}")
         return pd.DataFrame()
 
-@st.cache_data(ttl=3600)
+@instrumentar()
+@st.cache_data(ttl=300)
+@registrar_miss
+def carregar_vazoes_xlsx():
+    """Carrega GRBANABUIU_VAZÕES.xlsx a partir do cache binário (regerado se o arquivo mudar)."""
+    return _carregar_xlsx_local(VAZOES_XLSX)
+
+@instrumentar()
+@st.cache_data(ttl=300)
+@registrar_miss
+def carregar_perene_xlsx():
+    """Carrega GRBANABUIU_PERENE.xlsx a partir do cache binário (regerado se o arquivo mudar)."""
+    return _carregar_xlsx_local(PERENE_XLSX)
+
+def carregar_vazoes_locais():
+    """Une as duas planilhas locais, sem duplicar leituras do mesmo reservatório/data."""
+    frames = [df for df in (carregar_vazoes_xlsx(), carregar_perene_xlsx()) if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    return df.drop_duplicates(subset=["Reservatório Monitorado", "Data"], keep="first").sort_values(
+        ["Reservatório Monitorado", "Data"]).reset_index(drop=True)
+
+@instrumentar()
+@do_segmento("reservatorios")
+@cache_arrow("reservatorios", ttl=3600)
+@registrar_miss
 def load_reservatorios_data():
     """Carrega os dados dos reservatórios do Google Sheets."""
     try:
         url = "https://docs.google.com/spreadsheets/d/1zZ0RCyYj-AzA_dhWzxRziDWjgforbaH7WIoSEd2EKdk/export?format=csv"
-        df = pd.read_csv(url)
+        df = ler_csv_remoto(url)
         # Normalizações de tipo
         if {"Latitude", "Longitude"} <= set(df.columns):
             df["Latitude"] = pd.to_numeric(df["Latitude"].astype(str).str.replace(",", "."), errors="coerce")
@@ -82,14 +213,17 @@ def load_reservatorios_data():
         st.error(f"Erro ao carregar dados de reservatórios: {e}")
         return pd.DataFrame()
 
-@st.cache_data(ttl=3600)
+@instrumentar()
+@do_segmento("docs")
+@cache_arrow("docs", ttl=3600)
+@registrar_miss
 def load_docs_data():
     """Carrega os dados de documentos do Google Sheets."""
     SHEET_ID = "1-Tn_ZDHH-mNgJAY1WtjWd_Pyd2f5kv_ZU8dhL0caGDI"
     GID = "0"
     URL = f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/export?format=csv&gid={GID}"
     try:
-        df = pd.read_csv(URL, encoding="utf-8-sig").dropna(how="all")
+        df = ler_csv_remoto(URL, encoding="utf-8-sig").dropna(how="all")
         for col in ["Operação", "Data da Reunião", "Reservatório/Sistema", "Local da Reunião", "Parâmetros aprovados", "Vazão média"]:
             if col in df.columns:
                 df[col] = df[col].fillna("").astype(str)
@@ -98,12 +232,32 @@ def load_docs_data():
         st.error(f"Erro ao carregar dados: {str(e)}")
         return pd.DataFrame()
 
+@instrumentar()
+@do_segmento("situacao_sedes")
+@cache_arrow("situacao_sedes", ttl=3600)
+@registrar_miss
+def load_situacao_sedes_data():
+    """
+    Carrega a aba simulacoes_data (Situação das Sedes) do Google Sheets, com a
+    classificação já padronizada em um Categorical ordenado.
+    """
+    google_sheet_url = "https://docs.google.com/spreadsheets/d/1C40uaNmLUeu-k_FGEPZOgF8FwpSU00C9PtQu8Co4AUI/gviz/tq?tqx=out:csv&sheet=simulacoes_data"
+    df = ler_csv_remoto(google_sheet_url)
+    df['Data'] = pd.to_datetime(df['Data'], format='%d/%m/%Y', errors='coerce')
+    if 'Coordendas' in df.columns:
+        df.rename(columns={'Coordendas': 'Coordenadas'}, inplace=True)
+    df['Classificação Padronizada'] = categorizar_classificacao(
+        df['Classificação'] if 'Classificação' in df.columns else pd.Series(pd.NA, index=df.index))
+    return df
+
+@instrumentar()
 @st.cache_data(ttl=3600)
+@registrar_miss
 def load_simulacoes_data():
     """Carrega os dados de simulações do Google Sheets."""
     sheet_url = "https://docs.google.com/spreadsheets/d/1C40uaNmLUeu-k_FGEPZOgF8FwpSU00C9PtQu8Co4AUI/export?format=csv"
     try:
-        df = pd.read_csv(sheet_url, sep=',', decimal=',')
+        df = ler_csv_remoto(sheet_url, sep=',', decimal=',')
     except Exception as e:
         st.error(f"Não foi possível ler a planilha de simulações: {e}")
         return pd.DataFrame()
@@ -375,20 +529,27 @@ def render_footer():
         unsafe_allow_html=True,
     )
 
+# ============== Fale Conosco: fila de envios para a planilha ================
+PLANILHA_CONTATO_ID = "1aEzpFdPz2lbG7IM9OMIFqVCUtEVkqV18JaytGTX9ugs"
+
+@st.cache_resource(show_spinner=False)
+def obter_fila_contato():
+    """Fila durável do Fale Conosco com o trabalhador em segundo plano (uma por processo)."""
+    credenciais = dict(st.secrets["gcp_service_account"])
+
+    @lru_cache(maxsize=1)
+    def obter_aba():
+        # Cliente autorizado compartilhado do processo; a aba é descartada em caso de falha
+        return cliente_gspread(credenciais).open_by_key(PLANILHA_CONTATO_ID).worksheet("Página1")
+
+    return FilaEnvios(obter_aba).iniciar()
+
 def salvar_em_planilha(dados_formulario):
     """
-    Salva os dados do formulário em uma planilha do Google Sheets.
+    Registra os dados do formulário na fila local; o envio para o Google Sheets
+    acontece em segundo plano, em lotes, com novas tentativas em caso de falha.
     """
     try:
-        # Credenciais do Google Sheets (lendo do secrets.toml)
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(st.secrets["gcp_service_account"],
-                                                                 ["https://spreadsheets.google.com/feeds",
-                                                                  "https://www.googleapis.com/auth/drive"])
-        client = gspread.authorize(creds)
-
-        planilha = client.open_by_key("1aEzpFdPz2lbG7IM9OMIFqVCUtEVkqV18JaytGTX9ugs")
-        aba = planilha.worksheet("Página1") 
-
         dados_formulario['data_envio'] = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
 
         linha = [
@@ -405,22 +566,11 @@ def salvar_em_planilha(dados_formulario):
             dados_formulario.get('canal_resposta', ''),
             'Sim' if dados_formulario.get('lgpd_consentimento') else 'Não',
             'Sim' if dados_formulario.get('receber_informativos') else 'Não',
+            referencias_para_planilha(dados_formulario.get('anexos') or []),
         ]
-        
-        aba.append_row(linha)
+
+        obter_fila_contato().enfileirar(linha)
         return True
     except Exception as e:
-        st.error(f"Erro ao salvar na planilha: {e}")
+        st.error(f"Erro ao registrar a mensagem: {e}")
         return False
-
-
-
-
-
-
-
-
-
-
-
-
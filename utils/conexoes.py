@@ -0,0 +1,85 @@
+import io
+import threading
+
+import gspread
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from oauth2client.service_account import ServiceAccountCredentials
+
+GOOGLE_SCOPES = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+TIMEOUT_PADRAO = (10, 60)  # (conexão, leitura) em segundos
+
+_lock = threading.Lock()
+_sessao = None
+_clientes_gspread = {}
+
+
+def _adaptador():
+    retry = Retry(
+        total=3, backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+    )
+    return HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=retry)
+
+
+def sessao_http():
+    """
+    Sessão HTTP única do processo (keep-alive + pool de conexões + gzip), usada por
+    todos os downloads de planilhas para evitar um handshake TLS a cada leitura.
+    """
+    global _sessao
+    if _sessao is None:
+        with _lock:
+            if _sessao is None:
+                s = requests.Session()
+                s.mount("https://", _adaptador())
+                s.mount("http://", _adaptador())
+                s.headers.update({"Accept-Encoding": "gzip, deflate", "User-Agent": "portal-comite-banabuiu"})
+                _sessao = s
+    return _sessao
+
+
+def baixar(url, timeout=TIMEOUT_PADRAO):
+    """GET pela sessão compartilhada; retorna o corpo (já descompactado) em bytes."""
+    resp = sessao_http().get(url, timeout=timeout)
+    resp.raise_for_status()
+    return resp.content
+
+
+def ler_csv_remoto(url, **kwargs):
+    """Equivalente a `pd.read_csv(url, ...)`, mas baixando pela sessão com pool de conexões."""
+    return pd.read_csv(io.BytesIO(baixar(url)), **kwargs)
+
+
+def cliente_gspread(credenciais):
+    """
+    Cliente gspread autorizado, um por conta de serviço e por processo. A sessão
+    autorizada do google-auth renova o token quando expira; aqui o token é
+    renovado antes de devolver o cliente, se já estiver vencido.
+    """
+    chave = credenciais.get("client_email", "")
+    with _lock:
+        client = _clientes_gspread.get(chave)
+        if client is None:
+            creds = ServiceAccountCredentials.from_json_keyfile_dict(dict(credenciais), GOOGLE_SCOPES)
+            client = gspread.authorize(creds, http_client=gspread.BackOffHTTPClient)
+            client.http_client.session.mount("https://", _adaptador())
+            _clientes_gspread[chave] = client
+    _renovar_token(client)
+    return client
+
+
+def _renovar_token(client):
+    auth = getattr(client.http_client, "auth", None)
+    if auth is not None and not getattr(auth, "valid", True):
+        from google.auth.transport.requests import Request
+        auth.refresh(Request(session=sessao_http()))
+
+
+def descartar_cliente_gspread(credenciais):
+    """Remove o cliente do cache (ex.: após erro de autenticação); o próximo uso reautoriza."""
+    with _lock:
+        _clientes_gspread.pop(credenciais.get("client_email", ""), None)
@@ -0,0 +1,157 @@
+"""
+Cache dos resultados derivados das páginas (frames filtrados, agregações, df_mapa...).
+
+    df_volumes = derivado("df_volumes", (estacoes, intervalo), lambda: volume_acumulado(df_filtrado),
+                          depende_de=(ds,))
+
+A entrada vale para a chave (seleções dos filtros) e para a versão de conteúdo
+de cada dataset em `depende_de`: reruns e sessões com as mesmas entradas
+reaproveitam o mesmo objeto, e só o que teve alguma entrada alterada é
+recalculado. Quando um dataset muda de conteúdo (evento do registro), as
+entradas que dependiam da versão antiga são descartadas na hora; as dos outros
+datasets, e as de uma recarga com os mesmos dados, continuam valendo. Trocar um
+filtro não descarta nada: a entrada anterior continua disponível para quem voltar
+a ela (esta ou outra sessão). O total em memória, medido com o tamanho real de
+cada valor (figuras Plotly pelo JSON que carregam), fica abaixo de LIMITE_BYTES,
+descartando as entradas usadas há mais tempo (LRU global).
+"""
+import os
+import sys
+import logging
+import threading
+from collections import OrderedDict
+
+import folium
+import streamlit.components.v1 as components
+
+from utils.instrumentacao import medir, tamanho_payload
+from utils.registro import ao_mudar
+
+logger = logging.getLogger(__name__)
+
+# Orçamento global (todas as sessões) dos derivados em memória
+LIMITE_BYTES = int(float(os.environ.get("PORTAL_DERIVADOS_MB", "256")) * 2**20)
+
+_lock = threading.Lock()
+_entradas = OrderedDict()  # (nome, versões, chave) -> _Entrada, da usada há mais tempo para a mais recente
+_total = 0
+
+
+class _Entrada:
+    __slots__ = ("valor", "bytes")
+
+    def __init__(self, valor, tamanho):
+        self.valor = valor
+        self.bytes = tamanho
+
+
+def _congelar(obj):
+    """Chave hashable a partir das entradas (listas, tuplas, conjuntos e dicts dos widgets)."""
+    if isinstance(obj, (list, tuple)):
+        return tuple(_congelar(o) for o in obj)
+    if isinstance(obj, (set, frozenset)):
+        return tuple(sorted((_congelar(o) for o in obj), key=repr))
+    if isinstance(obj, dict):
+        return tuple(sorted(((k, _congelar(v)) for k, v in obj.items()), key=repr))
+    return obj
+
+
+def _tamanho(valor):
+    """Bytes ocupados pelo valor: DataFrames/arrays pelo buffer, figuras Plotly pelo JSON, coleções somando os itens."""
+    tamanho = tamanho_payload(valor)
+    if tamanho is not None and not isinstance(valor, tuple):
+        return tamanho
+    if hasattr(valor, "to_plotly_json"):  # go.Figure: os dados de todos os traces
+        return len(valor.to_json())
+    if isinstance(valor, (tuple, list, set, frozenset)):
+        return sys.getsizeof(valor) + sum(_tamanho(v) for v in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(_tamanho(k) + _tamanho(v) for k, v in valor.items())
+    return sys.getsizeof(valor)
+
+
+def _remover(chave_completa):
+    global _total
+    entrada = _entradas.pop(chave_completa, None)
+    if entrada is not None:
+        _total -= entrada.bytes
+
+
+def _podar(limite):
+    while _total > limite and _entradas:
+        _remover(next(iter(_entradas)))
+
+
+def derivado(nome, chave, calcular, depende_de=()):
+    """
+    Resultado de `calcular()` para as entradas `chave` e as versões dos datasets
+    `depende_de`, reaproveitado entre reruns e sessões. O valor é compartilhado:
+    quem for alterá-lo faz `.copy(deep=False)`.
+    """
+    versoes = tuple((ds.nome, ds.versao) for ds in depende_de)
+    chave_completa = (nome, versoes, _congelar(chave))
+    with medir(f"derivado {nome}") as item:
+        with _lock:
+            entrada = _entradas.get(chave_completa)
+            if entrada is not None:
+                _entradas.move_to_end(chave_completa)
+        if entrada is not None:
+            item["cache"] = "hit"
+            item["bytes"] = entrada.bytes
+            valor = entrada.valor
+        else:
+            item["cache"] = "miss"
+            valor = calcular()
+            item["bytes"] = _guardar(chave_completa, valor)
+    return valor
+
+
+def _guardar(chave_completa, valor):
+    global _total
+    tamanho = _tamanho(valor)
+    if tamanho > LIMITE_BYTES:
+        logger.info("Derivado %s (%d bytes) maior que o limite; não fica em cache", chave_completa[0], tamanho)
+        return tamanho
+    with _lock:
+        if chave_completa not in _entradas:  # outra sessão pode ter calculado ao mesmo tempo
+            _entradas[chave_completa] = _Entrada(valor, tamanho)
+            _total += tamanho
+            _podar(LIMITE_BYTES)
+    return tamanho
+
+
+@ao_mudar
+def _invalidar(nome_dataset, versao_antiga, versao_nova):
+    """Descarta as entradas que dependiam da versão antiga do dataset (as sessões recalculam no próximo rerun)."""
+    with _lock:
+        obsoletas = [c for c in _entradas if (nome_dataset, versao_antiga) in c[1]]
+        for chave_completa in obsoletas:
+            _remover(chave_completa)
+    if obsoletas:
+        logger.info("Dataset %s mudou (%s → %s): %d derivados descartados",
+                    nome_dataset, versao_antiga, versao_nova, len(obsoletas))
+
+
+# ====================== Mapas folium ======================
+def mapa_folium(nome, chave, construir, depende_de=(), width=700, height=500):
+    """
+    Exibe o mapa de `construir()` como o `folium_static`, reaproveitando o HTML
+    gerado enquanto a chave e as versões dos datasets não mudam: sem remontar as
+    camadas nem renderizar o mapa a cada rerun.
+    """
+    html = derivado(nome, chave, lambda: folium.Figure().add_child(construir()).render(), depende_de=depende_de)
+    return components.html(html, height=height + 10, width=width)
+
+
+def estatisticas():
+    """Entradas e bytes em cache (todas as sessões) e o limite."""
+    with _lock:
+        return {"entradas": len(_entradas), "bytes": _total, "limite_bytes": LIMITE_BYTES}
+
+
+def limpar():
+    """Descarta todas as entradas (os slots das sessões passam a recalcular)."""
+    global _total
+    with _lock:
+        _entradas.clear()
+        _total = 0
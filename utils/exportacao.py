@@ -0,0 +1,167 @@
+import os
+import json
+import hashlib
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from utils.cache import CACHE_DIR, versao_dataframe
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet é opcional
+    pa = pq = None
+
+# Arquivos exportados ficam em disco, um por (dataset, versão, filtros, formato)
+EXPORT_DIR = os.path.join(CACHE_DIR, "exportacoes")
+MAX_ARQUIVOS = 64
+TAMANHO_BLOCO = 5000  # linhas por bloco na geração
+
+FORMATOS = {
+    "csv": ("CSV", ".csv", "text/csv"),
+    "parquet": ("Parquet", ".parquet", "application/vnd.apache.parquet"),
+    "geojson": ("GeoJSON", ".geojson", "application/geo+json"),
+}
+# Opções aceitas pelo gerador de cada formato
+_OPCOES_FORMATO = {
+    "csv": {"sep", "encoding", "decimal", "date_format", "tamanho_bloco"},
+    "parquet": set(),
+    "geojson": {"lat", "lon", "tamanho_bloco"},
+}
+
+
+# ====================== Geração em blocos ======================
+def _blocos(df, tamanho_bloco):
+    for i in range(0, len(df), tamanho_bloco):
+        yield df.iloc[i:i + tamanho_bloco]
+
+
+def iterar_csv(df, tamanho_bloco=TAMANHO_BLOCO, sep=";", encoding="utf-8-sig", **kwargs):
+    """CSV em blocos de bytes (cabeçalho no primeiro bloco; BOM se `encoding` for utf-8-sig)."""
+    cod = "utf-8" if encoding == "utf-8-sig" else encoding
+    if encoding == "utf-8-sig":
+        yield "\ufeff".encode("utf-8")
+    yield df.iloc[:0].to_csv(index=False, sep=sep, **kwargs).encode(cod)
+    for bloco in _blocos(df, tamanho_bloco):
+        yield bloco.to_csv(index=False, header=False, sep=sep, **kwargs).encode(cod)
+
+
+def iterar_geojson(df, lat="Latitude", lon="Longitude", tamanho_bloco=TAMANHO_BLOCO):
+    """FeatureCollection de pontos em blocos de bytes; linhas sem coordenadas são ignoradas."""
+    df = df[pd.to_numeric(df[lat], errors="coerce").notna() & pd.to_numeric(df[lon], errors="coerce").notna()]
+    yield b'{"type": "FeatureCollection", "features": ['
+    primeiro = True
+    for bloco in _blocos(df, tamanho_bloco):
+        props = json.loads(bloco.drop(columns=[lat, lon]).to_json(orient="records", date_format="iso", force_ascii=False))
+        lats = bloco[lat].astype(float).to_numpy()
+        lons = bloco[lon].astype(float).to_numpy()
+        feats = [
+            json.dumps({"type": "Feature", "geometry": {"type": "Point", "coordinates": [x, y]}, "properties": p}, ensure_ascii=False)
+            for x, y, p in zip(lons.tolist(), lats.tolist(), props)
+        ]
+        if feats:
+            yield (("" if primeiro else ",") + ",".join(feats)).encode("utf-8")
+            primeiro = False
+    yield b"]}"
+
+
+def escrever_parquet(df, destino, tamanho_bloco=TAMANHO_BLOCO * 10):
+    """Parquet com um row group por bloco (via pyarrow)."""
+    if pq is None:
+        raise RuntimeError("pyarrow não está instalado")
+    tabela = pa.Table.from_pandas(df.iloc[:0], preserve_index=False)
+    with pq.ParquetWriter(destino, tabela.schema, compression="zstd") as w:
+        for bloco in _blocos(df, tamanho_bloco):
+            w.write_table(pa.Table.from_pandas(bloco, schema=tabela.schema, preserve_index=False))
+
+
+# ====================== Cache por (versão, filtros) ======================
+def _chave(nome, versao, filtros, formato, opcoes):
+    bruto = json.dumps([nome, versao, filtros, formato, opcoes], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(bruto.encode("utf-8")).hexdigest()
+
+
+def _podar(pasta, manter=MAX_ARQUIVOS):
+    try:
+        arquivos = sorted((e for e in os.scandir(pasta) if e.is_file()), key=lambda e: e.stat().st_mtime, reverse=True)
+    except FileNotFoundError:
+        return
+    for e in arquivos[manter:]:
+        try:
+            os.remove(e.path)
+        except OSError:
+            pass
+
+
+def exportar(df, formato, nome="dados", versao=None, filtros=None, **opcoes):
+    """
+    Gera (ou reaproveita) a exportação de `df` e retorna o caminho do arquivo.
+    A geração é feita em blocos direto para um arquivo temporário; o resultado fica
+    em cache por (nome, versão do dataset, filtros, formato, opções).
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    versao = versao or versao_dataframe(df)
+    destino = os.path.join(EXPORT_DIR, _chave(nome, versao, filtros, formato, opcoes) + FORMATOS[formato][1])
+    if os.path.exists(destino):
+        os.utime(destino)  # mais recente para a poda
+        return destino
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(suffix=".part", dir=EXPORT_DIR)
+    try:
+        if formato == "parquet":
+            os.close(fd)
+            escrever_parquet(df, tmp)
+        else:
+            blocos = iterar_csv(df, **opcoes) if formato == "csv" else iterar_geojson(df, **opcoes)
+            with os.fdopen(fd, "wb") as f:
+                for b in blocos:
+                    f.write(b)
+        os.replace(tmp, destino)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    _podar(EXPORT_DIR)
+    return destino
+
+
+def _ler(caminho):
+    with open(caminho, "rb") as f:
+        return f.read()
+
+
+# ====================== Botões ======================
+def botoes_exportacao(df, nome, formatos=("csv", "parquet"), filtros=None, versao=None, key=None, **opcoes):
+    """
+    Um botão de download por formato. Nada é gerado durante o rerun: o arquivo só é
+    montado (ou lido do cache) quando o usuário clica. `opcoes` vão para o gerador
+    do formato (ex.: sep/encoding do CSV, lat/lon do GeoJSON).
+    """
+    if df is None or df.empty:
+        return
+    formatos = [f for f in formatos if f != "parquet" or pq is not None]
+    if "geojson" in formatos and not {opcoes.get("lat", "Latitude"), opcoes.get("lon", "Longitude")}.issubset(df.columns):
+        formatos.remove("geojson")
+    data_arquivo = datetime.now().strftime("%Y%m%d")
+    cols = st.columns(len(formatos))
+    for col, formato in zip(cols, formatos):
+        rotulo, ext, mime = FORMATOS[formato]
+        opcoes_fmt = {k: v for k, v in opcoes.items() if k in _OPCOES_FORMATO[formato]}
+
+        def gerar(formato=formato, opcoes_fmt=opcoes_fmt):
+            return _ler(exportar(df, formato, nome=nome, versao=versao, filtros=filtros, **opcoes_fmt))
+
+        with col:
+            st.download_button(
+                label=f"Baixar {rotulo}",
+                data=gerar,
+                file_name=f"{nome}_{data_arquivo}{ext}",
+                mime=mime,
+                on_click="ignore",
+                key=f"{key or nome}_{formato}",
+                use_container_width=True,
+            )
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+from utils.cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Banco local onde os envios do Fale Conosco ficam até chegarem à planilha
+FILA_DB = os.environ.get("PORTAL_FILA_DB", os.path.join(CACHE_DIR, "fila_envios.sqlite3"))
+
+TAMANHO_LOTE = 50
+ESPERA_BASE = 2.0      # segundos (1ª nova tentativa)
+ESPERA_MAXIMA = 600.0  # teto do backoff exponencial
+RESERVA = 120.0        # segundos que um lote fica reservado para o processo que o está enviando
+
+_SQL_CRIAR = """
+CREATE TABLE IF NOT EXISTS envios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    linha TEXT NOT NULL,
+    criado_em REAL NOT NULL,
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    proxima_tentativa REAL NOT NULL DEFAULT 0,
+    enviado_em REAL,
+    erro TEXT,
+    reservado_ate REAL
+)
+"""
+
+
+class FilaEnvios:
+    """
+    Fila durável (SQLite) de linhas a anexar em uma planilha.
+
+    `enfileirar` grava e retorna na hora; um único thread em segundo plano envia
+    as pendentes em lotes com `append_rows`, com backoff exponencial em caso de
+    falha. `obter_aba` é uma função sem argumentos que devolve o worksheet
+    (ou qualquer objeto com `append_rows(linhas)`).
+
+    Vários processos podem usar o mesmo arquivo (ex.: Procfile.multiprocesso):
+    cada lote é reservado (`reservado_ate`) numa transação `BEGIN IMMEDIATE`
+    antes do envio, e a reserva é liberada ao fim, com sucesso ou falha. Se o
+    processo morrer no meio, a reserva vence depois de RESERVA segundos e o lote
+    volta para a fila.
+    """
+
+    def __init__(self, obter_aba, caminho_db=FILA_DB, tamanho_lote=TAMANHO_LOTE):
+        self.obter_aba = obter_aba
+        self.caminho_db = caminho_db
+        self.tamanho_lote = tamanho_lote
+        self._evento = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        pasta = os.path.dirname(caminho_db)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        with self._conectar() as con:
+            con.execute(_SQL_CRIAR)
+            colunas = {c[1] for c in con.execute("PRAGMA table_info(envios)")}
+            if "reservado_ate" not in colunas:  # banco criado antes da reserva de lotes
+                con.execute("ALTER TABLE envios ADD COLUMN reservado_ate REAL")
+
+    @contextmanager
+    def _conectar(self, imediata=False):
+        # imediata: a transação já começa com o lock de escrita (BEGIN IMMEDIATE),
+        # para ler e marcar as linhas sem outro processo no meio
+        con = sqlite3.connect(self.caminho_db, timeout=30, isolation_level=None if imediata else "")
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            with con:  # commit/rollback da transação
+                if imediata:
+                    con.execute("BEGIN IMMEDIATE")
+                yield con
+        finally:
+            con.close()
+
+    # ------------- Produtor -------------
+    def enfileirar(self, linha):
+        """Grava a linha na fila (commit imediato) e acorda o trabalhador. Retorna o id do envio."""
+        with self._conectar() as con:
+            cur = con.execute(
+                "INSERT INTO envios (linha, criado_em) VALUES (?, ?)",
+                (json.dumps(linha, ensure_ascii=False), time.time()),
+            )
+            id_envio = cur.lastrowid
+        self._evento.set()
+        return id_envio
+
+    def pendentes(self):
+        with self._conectar() as con:
+            return con.execute("SELECT COUNT(*) FROM envios WHERE enviado_em IS NULL").fetchone()[0]
+
+    # ------------- Consumidor -------------
+    def _reservar(self, agora):
+        """Seleciona e reserva um lote de pendentes vencidas e não reservadas, numa só transação."""
+        with self._conectar(imediata=True) as con:
+            registros = con.execute(
+                "SELECT id, linha, tentativas FROM envios "
+                "WHERE enviado_em IS NULL AND proxima_tentativa <= ? "
+                "AND (reservado_ate IS NULL OR reservado_ate <= ?) ORDER BY id LIMIT ?",
+                (agora, agora, self.tamanho_lote),
+            ).fetchall()
+            if registros:
+                ids = [r[0] for r in registros]
+                con.execute(
+                    f"UPDATE envios SET reservado_ate = ? WHERE id IN ({','.join('?' * len(ids))})",
+                    [agora + RESERVA, *ids],
+                )
+        return registros
+
+    def processar_lote(self, agora=None):
+        """Envia um lote de pendentes vencidas. Retorna quantas linhas foram enviadas."""
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            registros = self._reservar(agora)
+            if not registros:
+                return 0
+            ids = [r[0] for r in registros]
+            marcadores = ",".join("?" * len(ids))
+            try:
+                self.obter_aba().append_rows([json.loads(r[1]) for r in registros])
+            except Exception as e:
+                tentativas = max(r[2] for r in registros) + 1
+                espera = min(ESPERA_BASE * (2 ** (tentativas - 1)), ESPERA_MAXIMA) * random.uniform(0.8, 1.2)
+                logger.warning("Falha ao enviar %d linha(s) para a planilha (tentativa %d): %s", len(ids), tentativas, e)
+                # Descarta cliente/aba em cache (token expirado, conexão caída...)
+                if hasattr(self.obter_aba, "cache_clear"):
+                    self.obter_aba.cache_clear()
+                with self._conectar() as con:
+                    con.execute(
+                        f"UPDATE envios SET tentativas = tentativas + 1, proxima_tentativa = ?, erro = ?, "
+                        f"reservado_ate = NULL WHERE id IN ({marcadores})",
+                        [agora + espera, str(e)[:500], *ids],
+                    )
+                raise
+            with self._conectar() as con:
+                con.execute(
+                    f"UPDATE envios SET enviado_em = ?, erro = NULL, reservado_ate = NULL WHERE id IN ({marcadores})",
+                    [time.time(), *ids],
+                )
+            return len(ids)
+
+    def _proxima_espera(self):
+        with self._conectar() as con:
+            # Lotes reservados por outro processo só voltam quando a reserva vence
+            prox = con.execute(
+                "SELECT MIN(MAX(proxima_tentativa, COALESCE(reservado_ate, 0))) FROM envios WHERE enviado_em IS NULL"
+            ).fetchone()[0]
+        if prox is None:
+            return None
+        return max(prox - time.time(), 0.0)
+
+    def _loop(self):
+        while not self._parar.is_set():
+            try:
+                while self.processar_lote():
+                    pass
+            except Exception:
+                pass  # já registrado e reagendado em processar_lote
+            try:
+                espera = self._proxima_espera()
+            except sqlite3.Error as e:
+                logger.warning("Erro ao consultar a fila de envios: %s", e)
+                espera = ESPERA_BASE
+            self._evento.wait(timeout=espera if espera is not None else 60.0)
+            self._evento.clear()
+
+    def iniciar(self):
+        """Inicia (uma única vez) o thread trabalhador em segundo plano."""
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._loop, name="fila-envios", daemon=True)
+            self._thread.start()
+        self._evento.set()
+        return self
+
+    def parar(self, timeout=5.0):
+        self._parar.set()
+        self._evento.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
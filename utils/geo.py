@@ -0,0 +1,455 @@
+import re
+import sys
+import json
+import weakref
+import threading
+from collections.abc import Mapping
+
+import numpy as np
+
+RAIO_TERRA = 6378137.0  # raio do elipsoide WGS84 usado pela Web Mercator (EPSG:3857)
+
+_RE_EPSG = re.compile(r"EPSG::?(\d+)")
+
+
+# ============== Leitura em streaming ================
+def iterar_features(caminho):
+    """
+    Lê um GeoJSON feature a feature, sem carregar o arquivo inteiro com `json.load`.
+
+    Aceita GeoJSONL (uma feature por linha, compacta ou não) e FeatureCollections
+    gravadas com uma feature por linha (formato do ogr2ogr). Qualquer outro
+    layout (ex.: FeatureCollection minificada numa linha só) é lido inteiro com
+    `json.load`. Retorna (crs_epsg, gerador_de_features); o EPSG vem do "crs"
+    quando existir, senão assume 4326.
+    """
+    with open(caminho, "r", encoding="utf-8") as f:
+        primeira = ""
+        for linha in f:
+            primeira = linha.strip().strip("\x1e")  # aceita também RFC 8142 (RS)
+            if primeira:
+                break
+    try:
+        obj = json.loads(primeira)
+    except json.JSONDecodeError:
+        obj = None
+    if isinstance(obj, dict) and obj.get("type") == "Feature":
+        return 4326, _iterar_geojsonl(caminho)
+    if obj is not None:
+        # Documento completo na primeira linha (minificado)
+        return _ler_completo(caminho)
+
+    cabecalho = []
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            if '"features"' in linha:
+                # Features na mesma linha do cabeçalho: o streaming linha a linha não se aplica
+                if linha.split('"features"', 1)[1].strip().lstrip(":").strip().lstrip("[").strip():
+                    return _ler_completo(caminho)
+                break
+            cabecalho.append(linha)
+    return _epsg_do_texto("".join(cabecalho)), _iterar_feature_collection(caminho)
+
+
+def _epsg_do_texto(texto):
+    m = _RE_EPSG.search(texto)
+    return int(m.group(1)) if m else 4326
+
+
+def _ler_completo(caminho):
+    with open(caminho, "r", encoding="utf-8") as f:
+        dados = json.load(f)
+    epsg = _epsg_do_texto(json.dumps(dados.get("crs", ""))) if isinstance(dados, dict) else 4326
+    if isinstance(dados, dict) and dados.get("type") == "Feature":
+        return epsg, iter([dados])
+    features = dados.get("features", []) if isinstance(dados, dict) else []
+    return epsg, iter(features)
+
+
+def _iterar_geojsonl(caminho):
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            linha = linha.strip().strip("\x1e")
+            if linha:
+                yield json.loads(linha)
+
+
+def _iterar_feature_collection(caminho):
+    dentro = False
+    lidas = 0
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            if not dentro:
+                dentro = '"features"' in linha
+                continue
+            linha = linha.strip().rstrip(",")
+            if linha.startswith("{"):
+                try:
+                    feat = json.loads(linha)
+                    lidas += 1
+                    yield feat
+                    continue
+                except json.JSONDecodeError:
+                    pass
+            if linha.startswith("]") and lidas:
+                return
+            if linha:
+                # Feature quebrada em várias linhas (ou layout desconhecido): recorre à leitura completa
+                break
+    # Nada lido linha a linha, ou leitura interrompida: completa com o json.load
+    yield from list(_ler_completo(caminho)[1])[lidas:]
+
+
+# ============== Reprojeção e simplificação (NumPy) ================
+def mercator_para_wgs84(xy):
+    """Converte um array (n, 2+) de EPSG:3857 (metros) para EPSG:4326 (lon, lat em graus)."""
+    xy = np.asarray(xy, dtype="float64")
+    lon = np.degrees(xy[:, 0] / RAIO_TERRA)
+    lat = np.degrees(2.0 * np.arctan(np.exp(xy[:, 1] / RAIO_TERRA)) - np.pi / 2.0)
+    return np.column_stack((lon, lat))
+
+
+def simplificar_linha(pontos, tolerancia):
+    """Douglas-Peucker sobre um array (n, 2); as distâncias de cada trecho são calculadas em bloco."""
+    n = len(pontos)
+    if n < 3 or tolerancia <= 0:
+        return pontos
+    manter = np.zeros(n, dtype=bool)
+    manter[0] = manter[-1] = True
+    pilha = [(0, n - 1)]
+    while pilha:
+        ini, fim = pilha.pop()
+        if fim - ini < 2:
+            continue
+        a, b = pontos[ini], pontos[fim]
+        seg = pontos[ini + 1:fim]
+        d = b - a
+        norma = np.hypot(d[0], d[1])
+        if norma == 0:
+            dist = np.hypot(seg[:, 0] - a[0], seg[:, 1] - a[1])
+        else:
+            dist = np.abs(d[0] * (seg[:, 1] - a[1]) - d[1] * (seg[:, 0] - a[0])) / norma
+        i = int(np.argmax(dist))
+        if dist[i] > tolerancia:
+            k = ini + 1 + i
+            manter[k] = True
+            pilha.append((ini, k))
+            pilha.append((k, fim))
+    return pontos[manter]
+
+
+def _transformar_partes(partes, epsg, tolerancia, casas):
+    saida = []
+    for parte in partes:
+        arr = np.asarray(parte, dtype="float64")
+        if arr.ndim != 2 or len(arr) == 0:
+            continue
+        arr = arr[:, :2]  # descarta a coordenada Z
+        if epsg == 3857:
+            arr = mercator_para_wgs84(arr)
+        arr = simplificar_linha(arr, tolerancia)
+        saida.append(np.round(arr, casas).tolist())
+    return saida
+
+
+def reprojetar_geometria(geom, epsg=4326, tolerancia=0.0, casas=6):
+    """Reprojeta (3857 → 4326), remove Z e simplifica uma geometria GeoJSON."""
+    if not geom:
+        return None
+    gtype = geom.get("type")
+    coords = geom.get("coordinates", [])
+    if gtype == "Point":
+        arr = _transformar_partes([[coords]], epsg, 0, casas)
+        return {"type": gtype, "coordinates": arr[0][0]} if arr else None
+    if gtype in ("LineString", "MultiPoint"):
+        partes = _transformar_partes([coords], epsg, tolerancia if gtype == "LineString" else 0, casas)
+        return {"type": gtype, "coordinates": partes[0]} if partes else None
+    if gtype in ("MultiLineString", "Polygon"):
+        return {"type": gtype, "coordinates": _transformar_partes(coords, epsg, tolerancia, casas)}
+    if gtype == "MultiPolygon":
+        return {"type": gtype, "coordinates": [_transformar_partes(p, epsg, tolerancia, casas) for p in coords]}
+    return geom
+
+
+def carregar_camada(caminho, tolerancia=0.0002, campos=None):
+    """
+    Lê uma camada em streaming e retorna uma FeatureCollection em EPSG:4326 simplificada.
+
+    `tolerancia` é dada em graus (0.0002 ≈ 20 m); `campos` limita as propriedades
+    mantidas (por padrão descarta apenas as nulas).
+    """
+    epsg, features = iterar_features(caminho)
+    saida = []
+    for feat in features:
+        geom = reprojetar_geometria(feat.get("geometry"), epsg, tolerancia)
+        if not geom:
+            continue
+        props = feat.get("properties") or {}
+        if campos is not None:
+            props = {k: props.get(k) for k in campos}
+        else:
+            props = {k: v for k, v in props.items() if v is not None}
+        saida.append({"type": "Feature", "properties": props, "geometry": geom})
+    return {"type": "FeatureCollection", "features": saida}
+
+
+# ============== Coordenadas achatadas por camada ================
+def _partes(geom):
+    """Partes (listas de posições) de uma geometria e, p/ polígonos, nº de anéis de cada polígono."""
+    gtype = (geom or {}).get("type")
+    coords = (geom or {}).get("coordinates", []) or []
+    if gtype == "Point":
+        return [[coords]] if coords else [], None
+    if gtype in ("LineString", "MultiPoint"):
+        return [coords], None
+    if gtype == "MultiLineString":
+        return list(coords), None
+    if gtype == "Polygon":
+        return list(coords), [len(coords)]
+    if gtype == "MultiPolygon":
+        return [anel for poligono in coords for anel in poligono], [len(p) for p in coords]
+    return [], None
+
+
+class CoordenadasCamada:
+    """
+    Coordenadas de todas as features de uma FeatureCollection em um único array
+    contíguo (N, 2) de (lon, lat), com offsets de partes e de features.
+
+    `partes[p]:partes[p+1]` são os vértices da parte p (anel, linha ou ponto) e
+    `features[i]:features[i+1]` são as partes da feature i. Bounds, centroides e
+    simplificação são calculados sobre esse array, sem percorrer listas Python.
+    """
+
+    def __init__(self, coords, partes, features, tipos, aneis, propriedades):
+        self.coords = coords
+        self.partes = partes
+        self.features = features
+        self.tipos = tipos
+        self.aneis = aneis
+        self.propriedades = propriedades
+        self._bounds_feat = None
+
+    @classmethod
+    def de_geojson(cls, geojson_fc, dtype="float64"):
+        return cls.de_features((geojson_fc or {}).get("features", []) or [], dtype)
+
+    @classmethod
+    def de_features(cls, features_geojson, dtype="float64"):
+        """Monta a camada a partir de um iterável de features (ex.: `iterar_features`), uma por vez."""
+        blocos, partes, features, tipos, aneis, props = [], [0], [0], [], [], []
+        total = 0
+        for feat in features_geojson:
+            geom = (feat or {}).get("geometry") or {}
+            lista, n_aneis = _partes(geom)
+            for parte in lista:
+                arr = np.asarray(parte, dtype=dtype)
+                if arr.ndim != 2 or arr.shape[0] == 0:
+                    continue
+                blocos.append(arr[:, :2])
+                total += arr.shape[0]
+                partes.append(total)
+            features.append(len(partes) - 1)
+            tipos.append(geom.get("type"))
+            aneis.append(n_aneis)
+            props.append(_internar((feat or {}).get("properties")))
+        coords = np.ascontiguousarray(np.concatenate(blocos)) if blocos else np.empty((0, 2), dtype=dtype)
+        return cls(coords, np.asarray(partes, dtype="int64"), np.asarray(features, dtype="int64"), tipos, aneis, props)
+
+    def __len__(self):
+        return len(self.tipos)
+
+    @property
+    def nbytes(self):
+        """Bytes dos arrays (coordenadas e offsets); as propriedades não entram na conta."""
+        return int(self.coords.nbytes + self.partes.nbytes + self.features.nbytes)
+
+    # ------------- Bounds -------------
+    def total_bounds(self):
+        """(min_lon, min_lat, max_lon, max_lat) da camada, ou None se vazia."""
+        if self.coords.shape[0] == 0:
+            return None
+        mn = self.coords.min(axis=0)
+        mx = self.coords.max(axis=0)
+        return float(mn[0]), float(mn[1]), float(mx[0]), float(mx[1])
+
+    def bounds(self):
+        """Limites no formato do Folium: [[lat_min, lon_min], [lat_max, lon_max]]."""
+        tb = self.total_bounds()
+        if tb is None:
+            return None
+        return [[tb[1], tb[0]], [tb[3], tb[2]]]
+
+    def _inicio_vertices_por_feature(self):
+        return self.partes[self.features]
+
+    def bounds_por_feature(self):
+        """Array (n_features, 4) com (min_lon, min_lat, max_lon, max_lat); NaN p/ features vazias."""
+        if self._bounds_feat is None:
+            ini = self._inicio_vertices_por_feature()
+            saida = np.full((len(self), 4), np.nan)
+            nao_vazias = np.flatnonzero(ini[1:] > ini[:-1])
+            if nao_vazias.size:
+                pos = ini[nao_vazias]
+                saida[nao_vazias, 0:2] = np.minimum.reduceat(self.coords, pos, axis=0)
+                saida[nao_vazias, 2:4] = np.maximum.reduceat(self.coords, pos, axis=0)
+            self._bounds_feat = saida
+        return self._bounds_feat
+
+    # ------------- Centroides -------------
+    def centroides(self):
+        """
+        Centroide (lon, lat) de cada feature: ponderado pela área (shoelace) nos
+        polígonos e média dos vértices nas demais geometrias.
+        """
+        n = len(self)
+        ini = self._inicio_vertices_por_feature()
+        qtd = ini[1:] - ini[:-1]
+        saida = np.full((n, 2), np.nan)
+        nao_vazias = np.flatnonzero(qtd > 0)
+        if nao_vazias.size == 0:
+            return saida
+        somas = np.add.reduceat(self.coords, ini[nao_vazias], axis=0)
+        saida[nao_vazias] = somas / qtd[nao_vazias, None]
+
+        # Shoelace vetorizado sobre todas as arestas internas das partes
+        x, y = self.coords[:-1, 0], self.coords[:-1, 1]
+        x1, y1 = self.coords[1:, 0], self.coords[1:, 1]
+        valida = np.ones(len(x), dtype=bool)
+        valida[self.partes[1:-1] - 1] = False  # pares que atravessam o limite entre partes
+        cruz = np.where(valida, x * y1 - x1 * y, 0.0)
+        cx = np.where(valida, (x + x1) * cruz, 0.0)
+        cy = np.where(valida, (y + y1) * cruz, 0.0)
+        acum = np.concatenate(([0.0], np.cumsum(cruz)))
+        acx = np.concatenate(([0.0], np.cumsum(cx)))
+        acy = np.concatenate(([0.0], np.cumsum(cy)))
+        fim = np.maximum(ini[1:] - 1, ini[:-1])
+        area2 = acum[fim] - acum[ini[:-1]]
+        poligonal = np.array([t in ("Polygon", "MultiPolygon") for t in self.tipos]) & (np.abs(area2) > 1e-15)
+        idx = np.flatnonzero(poligonal)
+        if idx.size:
+            a = area2[idx]
+            saida[idx, 0] = (acx[fim[idx]] - acx[ini[:-1][idx]]) / (3.0 * a)
+            saida[idx, 1] = (acy[fim[idx]] - acy[ini[:-1][idx]]) / (3.0 * a)
+        return saida
+
+    # ------------- Arestas (p/ ponto-no-polígono) -------------
+    def arestas(self):
+        """
+        Arestas (x0, y0, x1, y1) de todas as partes e offsets por feature:
+        `arestas[off[i]:off[i+1]]` pertencem à feature i.
+        """
+        if self.coords.shape[0] < 2:
+            return np.empty((0, 4)), np.zeros(len(self) + 1, dtype="int64")
+        valida = np.ones(self.coords.shape[0] - 1, dtype=bool)
+        valida[self.partes[1:-1] - 1] = False
+        pares = np.hstack((self.coords[:-1], self.coords[1:]))[valida]
+        # nº de arestas antes de cada vértice inicial de feature
+        antes = np.concatenate(([0], np.cumsum(valida)))
+        return pares.astype("float64", copy=False), antes[np.minimum(self._inicio_vertices_por_feature(), len(valida))]
+
+    # ------------- Reconstrução / simplificação -------------
+    def geometria(self, i, tolerancia=0.0, casas=None):
+        """Reconstrói a geometria GeoJSON da feature `i` (opcionalmente simplificada)."""
+        tipo = self.tipos[i]
+        if tipo is None:
+            return None
+        partes = []
+        for p in range(self.features[i], self.features[i + 1]):
+            arr = self.coords[self.partes[p]:self.partes[p + 1]]
+            if tolerancia > 0 and tipo not in ("Point", "MultiPoint"):
+                arr = _simplificar_parte(arr, tolerancia, fechada=tipo in ("Polygon", "MultiPolygon"))
+            arr = arr.astype("float64")
+            partes.append((np.round(arr, casas) if casas is not None else arr).tolist())
+        if tipo == "Point":
+            return {"type": tipo, "coordinates": partes[0][0] if partes else []}
+        if tipo in ("LineString", "MultiPoint"):
+            return {"type": tipo, "coordinates": partes[0] if partes else []}
+        if tipo in ("MultiLineString", "Polygon"):
+            return {"type": tipo, "coordinates": partes}
+        # MultiPolygon: reagrupa os anéis por polígono
+        poligonos, k = [], 0
+        for n_aneis in self.aneis[i] or []:
+            poligonos.append(partes[k:k + n_aneis])
+            k += n_aneis
+        return {"type": tipo, "coordinates": poligonos}
+
+    def para_geojson(self, tolerancia=0.0, casas=None):
+        """FeatureCollection reconstruída a partir do array (simplificada se `tolerancia` > 0)."""
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "properties": self.propriedades[i], "geometry": self.geometria(i, tolerancia, casas)}
+                for i in range(len(self))
+            ],
+        }
+
+    def simplificar(self, tolerancia, casas=6):
+        return self.para_geojson(tolerancia, casas)
+
+
+def _internar(props):
+    """Propriedades com chaves e textos internados: valores repetidos entre features viram um único objeto."""
+    return {sys.intern(k) if type(k) is str else k: sys.intern(v) if type(v) is str else v
+            for k, v in (props or {}).items()}
+
+
+def carregar_camada_compacta(caminho, dtype="float64"):
+    """
+    Lê um GeoJSON em streaming direto para `CoordenadasCamada`, sem montar a árvore
+    de dicts/listas do arquivo inteiro (a coordenada Z é descartada).
+    """
+    _, features = iterar_features(caminho)
+    return CoordenadasCamada.de_features(features, dtype)
+
+
+class FeatureCollection(dict):
+    """FeatureCollection materializada; subclasse de dict só para aceitar weakref."""
+
+
+class CamadasGeoJSON(Mapping):
+    """
+    Conjunto de camadas guardadas em forma compacta (`CoordenadasCamada`). O dict
+    GeoJSON de uma camada só é montado quando pedido (`camadas["geojson_bacia"]`) e
+    fica em cache apenas enquanto ainda estiver em uso; entre execuções o processo
+    guarda só os arrays. Quem recebe o dict não deve alterá-lo.
+    """
+
+    def __init__(self, camadas):
+        self._camadas = dict(camadas)
+        self._materializadas = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def camada(self, nome):
+        """Representação compacta da camada (vazia se a camada não foi carregada)."""
+        camada = self._camadas.get(nome)
+        return camada if camada is not None else CoordenadasCamada.de_features([])
+
+    def __getitem__(self, nome):
+        camada = self._camadas[nome]
+        with self._lock:
+            fc = self._materializadas.get(nome)
+            if fc is None:
+                fc = FeatureCollection(camada.para_geojson())
+                self._materializadas[nome] = fc
+        return fc
+
+    def __iter__(self):
+        return iter(self._camadas)
+
+    def __len__(self):
+        return len(self._camadas)
+
+    def __contains__(self, nome):
+        return nome in self._camadas
+
+    @property
+    def nbytes(self):
+        return sum(c.nbytes for c in self._camadas.values())
+
+
+def _simplificar_parte(arr, tolerancia, fechada=False):
+    simples = simplificar_linha(arr, tolerancia)
+    if fechada and len(simples) < 4:
+        return arr  # não degenera anéis em linhas
+    return simples
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Log JSON Lines (uma linha por execução do script); vazio = não grava
+PERFIL_LOG = os.environ.get("PORTAL_PERFIL_LOG", "")
+# Painel de depuração: PORTAL_DEBUG=1 ou ?debug=1 na URL
+DEBUG = os.environ.get("PORTAL_DEBUG", "") == "1"
+
+_local = threading.local()
+_lock = threading.Lock()
+_totais = {}  # etapa -> {chamadas, hits, misses, total_ms, max_ms}
+
+
+# ====================== Registro da execução atual ======================
+def _registro():
+    return getattr(_local, "registro", None)
+
+
+def iniciar_execucao():
+    """Abre o registro desta execução do script (uma requisição de página)."""
+    _local.registro = {"inicio": time.perf_counter(), "etapas": [], "pilha": []}
+
+
+def tamanho_payload(obj):
+    """Tamanho aproximado em bytes do resultado (DataFrame, arrays e objetos com `nbytes`, bytes/str, tuplas destes)."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=False))
+    if isinstance(obj, np.ndarray) or hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+    if isinstance(obj, (bytes, bytearray, str)):
+        return len(obj)
+    if isinstance(obj, tuple):
+        tamanhos = [t for t in (tamanho_payload(o) for o in obj) if t is not None]
+        return sum(tamanhos) if tamanhos else None
+    return None
+
+
+def _acumular(etapa, ms, cache):
+    with _lock:
+        t = _totais.setdefault(etapa, {"chamadas": 0, "hits": 0, "misses": 0, "total_ms": 0.0, "max_ms": 0.0})
+        t["chamadas"] += 1
+        t["total_ms"] += ms
+        t["max_ms"] = max(t["max_ms"], ms)
+        if cache == "hit":
+            t["hits"] += 1
+        elif cache == "miss":
+            t["misses"] += 1
+
+
+@contextmanager
+def medir(etapa, **extra):
+    """
+    Mede uma etapa (tempo, erro e campos extras, ex.: bytes=...). O dicionário
+    devolvido pode ser completado dentro do bloco (ex.: `m["bytes"] = len(html)`).
+    """
+    reg = _registro()
+    item = {"etapa": etapa, **extra}
+    if reg is not None:
+        item["pai"] = reg["pilha"][-1]["etapa"] if reg["pilha"] else None
+        item["nivel"] = len(reg["pilha"])
+        reg["pilha"].append(item)
+    t0 = time.perf_counter()
+    try:
+        yield item
+    except Exception as e:
+        item["erro"] = type(e).__name__
+        raise
+    finally:
+        item["ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        _acumular(etapa, item["ms"], item.get("cache"))
+        if reg is not None:
+            reg["pilha"].pop()
+            reg["etapas"].append(item)
+
+
+def instrumentar(etapa=None):
+    """
+    Decorador para páginas (`render_*`) e loaders. Colocado acima de
+    `@st.cache_data`/`@lru_cache`, mede a chamada inteira; junto com
+    `@registrar_miss` abaixo do cache, também distingue hit de miss.
+    """
+    def decorador(func):
+        nome = etapa or func.__name__
+        cacheada = any(hasattr(func, a) for a in ("clear", "cache_clear"))
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with medir(nome) as item:
+                if cacheada:
+                    item["cache"] = "hit"  # vira "miss" se o corpo rodar (@registrar_miss)
+                resultado = func(*args, **kwargs)
+                if cacheada:
+                    item["bytes"] = tamanho_payload(resultado)
+                return resultado
+
+        # Mantém a API do cache embrulhado (clear/cache_clear/cache_info)
+        for attr in ("clear", "cache_clear", "cache_info"):
+            if hasattr(func, attr):
+                setattr(wrapper, attr, getattr(func, attr))
+        return wrapper
+    return decorador
+
+
+def registrar_miss(func):
+    """Marca, na etapa aberta por `@instrumentar`, que o corpo da função rodou (cache miss)."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        reg = _registro()
+        if reg is not None and reg["pilha"]:
+            reg["pilha"][-1]["cache"] = "miss"
+        return func(*args, **kwargs)
+    return wrapper
+
+
+# ====================== Fechamento: log e painel ======================
+def _gravar_log(linha):
+    try:
+        pasta = os.path.dirname(PERFIL_LOG)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        with _lock, open(PERFIL_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(linha, ensure_ascii=False, default=str) + "\n")
+    except OSError as e:
+        logger.warning("Não foi possível gravar o log de desempenho: %s", e)
+
+
+def _sessao_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else None
+    except Exception:
+        return None
+
+
+def debug_ativo():
+    try:
+        return DEBUG or st.query_params.get("debug") == "1"
+    except Exception:
+        return DEBUG
+
+
+def finalizar_execucao():
+    """Fecha o registro da execução: grava a linha JSONL e mostra o painel de depuração, se ativo."""
+    reg = _registro()
+    if reg is None:
+        return None
+    _local.registro = None
+    linha = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "sessao": _sessao_id(),
+        "total_ms": round((time.perf_counter() - reg["inicio"]) * 1000, 3),
+        "etapas": reg["etapas"],
+    }
+    if PERFIL_LOG:
+        _gravar_log(linha)
+    if debug_ativo():
+        painel_debug(linha)
+    return linha
+
+
+def estatisticas():
+    """Totais acumulados no processo, por etapa."""
+    with _lock:
+        return {k: dict(v) for k, v in _totais.items()}
+
+
+def painel_debug(linha):
+    with st.expander(f"⏱️ Desempenho desta execução — {linha['total_ms']:.0f} ms", expanded=False):
+        etapas = pd.DataFrame(linha["etapas"])
+        if not etapas.empty:
+            etapas = etapas.reindex(columns=["etapa", "pai", "nivel", "ms", "cache", "bytes", "erro"])
+            st.dataframe(etapas.sort_values("ms", ascending=False), use_container_width=True, hide_index=True)
+        totais = pd.DataFrame.from_dict(estatisticas(), orient="index")
+        if not totais.empty:
+            totais["média_ms"] = totais["total_ms"] / totais["chamadas"]
+            st.markdown("**Acumulado no processo**")
+            st.dataframe(totais.sort_values("total_ms", ascending=False).round(2), use_container_width=True)
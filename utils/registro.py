@@ -0,0 +1,142 @@
+"""
+Registro de datasets somente leitura e versionados.
+
+Os loaders de utils/common.py devolvem o mesmo DataFrame enquanto o cache vale
+(snapshot Arrow por mmap ou segmento compartilhado). O registro embrulha esse
+DataFrame num `Dataset` daquela versão, compartilhado entre sessões e threads:
+as opções dos filtros e outros derivados são calculados uma vez por versão, e
+`filtrar` monta uma única máscara e aloca só as linhas do resultado, sem copiar
+nem alterar a base.
+
+    ds = dataset(load_reservatorios_data)
+    df_filtrado = ds.filtrar(isin={"Reservatório": sel}, entre={"Percentual": (0, 50)})
+
+A versão é o hash do conteúdo: uma recarga que traz os mesmos dados mantém o
+mesmo `Dataset` (e tudo o que depende dele); quando o conteúdo muda, os ouvintes
+registrados com `ao_mudar` recebem (nome, versão antiga, versão nova) e descartam
+só o que dependia daquele dataset.
+"""
+import logging
+import threading
+
+import numpy as np
+
+from utils.cache import versao_dataframe
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_registro = {}  # nome do loader -> Dataset da versão atual
+_ouvintes = []  # ouvinte(nome, versao_antiga, versao_nova), chamados quando um dataset muda
+
+
+def mascara(df, isin=None, entre=None):
+    """
+    Máscara booleana (NumPy) das linhas que atendem a todos os critérios:
+    `isin={coluna: valores}` (vazio ou None = sem filtro) e
+    `entre={coluna: (ini, fim)}` (inclusivo; None = sem limite). Nulos nunca passam.
+    """
+    m = np.ones(len(df), dtype=bool)
+    for coluna, valores in (isin or {}).items():
+        if valores is None or len(valores) == 0:
+            continue
+        m &= df[coluna].isin(list(valores)).to_numpy(dtype=bool, na_value=False)
+    for coluna, (ini, fim) in (entre or {}).items():
+        s = df[coluna]
+        if ini is not None:
+            m &= (s >= ini).to_numpy(dtype=bool, na_value=False)
+        if fim is not None:
+            m &= (s <= fim).to_numpy(dtype=bool, na_value=False)
+    return m
+
+
+def filtrar(df, isin=None, entre=None, mascara_extra=None):
+    """
+    Linhas de `df` que atendem aos critérios de `mascara` (e a `mascara_extra`, se
+    houver), num DataFrame novo. A base não é copiada nem alterada: sem nenhum
+    filtro efetivo devolve uma cópia rasa (copy-on-write), senão só as linhas escolhidas.
+    """
+    m = mascara(df, isin, entre)
+    if mascara_extra is not None:
+        m &= np.asarray(mascara_extra, dtype=bool)
+    if m.all():
+        return df.copy(deep=False)
+    return df.iloc[np.flatnonzero(m)]
+
+
+class Dataset:
+    """Uma versão de um dataset. `df` é compartilhado e somente leitura: consulte com `filtrar`."""
+
+    def __init__(self, nome, df, versao=None):
+        self.nome = nome
+        self.df = df
+        # Sempre definida: entra nas chaves dos derivados (utils/derivados.py)
+        self.versao = versao or df.attrs.get("versao") or versao_dataframe(df)
+        self._derivados = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    def derivado(self, chave, calcular):
+        """`calcular(df)`, calculado uma vez nesta versão (o valor é compartilhado: não alterar)."""
+        with self._lock:
+            if chave not in self._derivados:
+                self._derivados[chave] = calcular(self.df)
+            return self._derivados[chave]
+
+    def opcoes(self, coluna, ordenar=True):
+        """Valores distintos de `coluna`, sem nulos, para os widgets de filtro ([] se a coluna não existe)."""
+        if coluna not in self.df.columns:
+            return []
+
+        def calcular(df):
+            valores = df[coluna].dropna().unique().tolist()
+            return sorted(valores) if ordenar else valores
+
+        return self.derivado(("opcoes", coluna, ordenar), calcular)
+
+    def filtrar(self, isin=None, entre=None, mascara_extra=None):
+        return filtrar(self.df, isin, entre, mascara_extra)
+
+
+def ao_mudar(ouvinte):
+    """Registra `ouvinte(nome, versao_antiga, versao_nova)`, chamado quando um dataset muda de conteúdo."""
+    _ouvintes.append(ouvinte)
+    return ouvinte
+
+
+def dataset(loader):
+    """
+    `Dataset` da versão devolvida agora por `loader()`. Enquanto o loader devolve o
+    mesmo DataFrame (ou outro com o mesmo conteúdo, ex.: depois de um `.clear()`),
+    o mesmo `Dataset` é reaproveitado com os derivados já calculados; exceções do
+    loader sobem para a página.
+    """
+    df = loader()
+    nome = getattr(loader, "__qualname__", repr(loader))
+    with _lock:
+        atual = _registro.get(nome)
+    if atual is not None and atual.df is df:
+        return atual
+
+    # DataFrame novo: o hash do conteúdo (fora do lock) decide se é outra versão
+    versao = df.attrs.get("versao") or versao_dataframe(df)
+    with _lock:
+        atual = _registro.get(nome)
+        if atual is not None and atual.versao == versao:
+            atual.df = df  # mesmo conteúdo: passa a apontar para o snapshot recarregado
+            return atual
+        antiga = atual.versao if atual is not None else None
+        atual = _registro[nome] = Dataset(nome, df, versao)
+    if antiga is not None:
+        for ouvinte in list(_ouvintes):
+            try:
+                ouvinte(nome, antiga, versao)
+            except Exception:
+                logger.exception("Ouvinte de mudança do dataset %s falhou", nome)
+    return atual
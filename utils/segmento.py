@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import functools
+import threading
+
+import numpy as np
+
+from utils.cache import versao_dataframe, gravar_arrow, abrir_arrow, pa
+from utils.geo import CoordenadasCamada
+
+logger = logging.getLogger(__name__)
+
+# Modo multi-processo: um processo carregador (python -m utils.carregador) publica
+# os datasets e as camadas nesta pasta; os workers do Streamlit só anexam (mmap).
+SEGMENTO_DIR = os.environ.get("PORTAL_SEGMENTO_DIR", "")
+ARQUIVO_VERSAO = "VERSION"
+MANTER_VERSOES = 3          # versões antigas mantidas para workers que ainda as usam
+INTERVALO_VERIFICACAO = 2.0  # segundos entre leituras do VERSION por processo
+
+_lock = threading.Lock()
+_atual = None
+_verificado_em = 0.0
+
+
+def ativo():
+    return bool(SEGMENTO_DIR)
+
+
+# ====================== Escrita (processo carregador) ======================
+def _gravar_camada(pasta, camada):
+    os.makedirs(pasta, exist_ok=True)
+    for nome in ("coords", "partes", "features"):
+        np.save(os.path.join(pasta, f"{nome}.npy"), np.ascontiguousarray(getattr(camada, nome)))
+    with open(os.path.join(pasta, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"tipos": camada.tipos, "aneis": camada.aneis, "propriedades": camada.propriedades}, f, ensure_ascii=False)
+
+
+def _versao_camada(camada):
+    h = hashlib.sha1(np.ascontiguousarray(camada.coords).tobytes())
+    h.update(json.dumps([camada.tipos, camada.propriedades], sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def ler_versao(raiz=None):
+    """Conteúdo do arquivo VERSION (dict) ou None se nada foi publicado ainda."""
+    try:
+        with open(os.path.join(raiz or SEGMENTO_DIR, ARQUIVO_VERSAO), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def publicar(datasets, camadas, raiz=None):
+    """
+    Publica uma nova versão do segmento: grava tudo em `versoes/<versão>/` e só
+    então troca o VERSION (atômico). Se o conteúdo não mudou, nada é regravado.
+    Retorna a versão publicada.
+    """
+    raiz = raiz or SEGMENTO_DIR
+    if pa is None:  # sem pyarrow o segmento só compartilha as camadas (.npy)
+        datasets = {}
+    versoes_ds = {nome: df.attrs.get("versao") or versao_dataframe(df) for nome, df in datasets.items()}
+    versoes_cm = {nome: _versao_camada(c) for nome, c in camadas.items()}
+    versao = hashlib.sha1(json.dumps([versoes_ds, versoes_cm], sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+    atual = ler_versao(raiz)
+    if atual and atual.get("versao") == versao:
+        return versao
+
+    pasta_versoes = os.path.join(raiz, "versoes")
+    destino = os.path.join(pasta_versoes, versao)
+    if not os.path.isdir(destino):
+        tmp = f"{destino}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        for nome, df in datasets.items():
+            os.makedirs(os.path.join(tmp, "datasets"), exist_ok=True)
+            gravar_arrow(df, os.path.join(tmp, "datasets", f"{nome}.arrow"))
+        for nome, camada in camadas.items():
+            _gravar_camada(os.path.join(tmp, "camadas", nome), camada)
+        os.makedirs(tmp, exist_ok=True)
+        os.replace(tmp, destino)
+
+    meta = {"versao": versao, "publicado_em": time.time(), "datasets": versoes_ds, "camadas": sorted(camadas)}
+    tmp = os.path.join(raiz, f"{ARQUIVO_VERSAO}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(raiz, ARQUIVO_VERSAO))
+    _podar(pasta_versoes, versao)
+    return versao
+
+
+def _podar(pasta_versoes, atual, manter=MANTER_VERSOES):
+    """Remove versões antigas (arquivos já mapeados por algum worker continuam válidos até ele soltar)."""
+    try:
+        versoes = sorted((e for e in os.scandir(pasta_versoes) if e.is_dir() and not e.name.endswith(".tmp")),
+                         key=lambda e: e.stat().st_mtime, reverse=True)
+    except FileNotFoundError:
+        return
+    for e in [e for e in versoes if e.name != atual][max(manter - 1, 0):]:
+        shutil.rmtree(e.path, ignore_errors=True)
+
+
+# ====================== Leitura (workers) ======================
+class Segmento:
+    """Uma versão publicada; datasets e camadas são abertos (mmap) na primeira vez que são pedidos."""
+
+    def __init__(self, pasta, meta):
+        self.pasta = pasta
+        self.meta = meta
+        self.versao = meta["versao"]
+        self._abertos = {}
+        self._lock = threading.Lock()
+
+    def _abrir(self, chave, abrir):
+        with self._lock:
+            if chave not in self._abertos:
+                try:
+                    self._abertos[chave] = abrir()
+                except (OSError, ValueError) as e:
+                    logger.warning("Segmento %s: falha ao abrir %s: %s", self.versao, chave, e)
+                    self._abertos[chave] = None
+            return self._abertos[chave]
+
+    def dataset(self, nome, montar=None):
+        """DataFrame somente leitura do dataset `nome` (ou `montar(df)`, calculado uma vez por versão)."""
+        if nome not in self.meta.get("datasets", {}) or pa is None:
+            return None
+        df = self._abrir(("dataset", nome), lambda: self._ler_dataset(nome))
+        if df is None or montar is None:
+            return df
+        return self._abrir(("montado", nome, montar), lambda: montar(df))
+
+    def _ler_dataset(self, nome):
+        df = abrir_arrow(os.path.join(self.pasta, "datasets", f"{nome}.arrow"))
+        df.attrs["versao"] = self.meta["datasets"][nome]
+        return df
+
+    def camada(self, nome):
+        if nome not in self.meta.get("camadas", []):
+            return None
+        return self._abrir(("camada", nome), lambda: self._ler_camada(nome))
+
+    def camadas(self):
+        return {nome: c for nome in self.meta.get("camadas", []) if (c := self.camada(nome)) is not None}
+
+    def _ler_camada(self, nome):
+        pasta = os.path.join(self.pasta, "camadas", nome)
+        arrays = {n: np.load(os.path.join(pasta, f"{n}.npy"), mmap_mode="r") for n in ("coords", "partes", "features")}
+        with open(os.path.join(pasta, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return CoordenadasCamada(arrays["coords"], arrays["partes"], arrays["features"],
+                                 meta["tipos"], meta["aneis"], meta["propriedades"])
+
+
+def segmento_atual():
+    """
+    Versão publicada mais recente (None fora do modo segmento ou antes da primeira
+    publicação). O VERSION é relido no máximo a cada INTERVALO_VERIFICACAO segundos.
+    """
+    global _atual, _verificado_em
+    if not ativo():
+        return None
+    agora = time.monotonic()
+    with _lock:
+        if _atual is not None and agora - _verificado_em < INTERVALO_VERIFICACAO:
+            return _atual
+        _verificado_em = agora
+        meta = ler_versao()
+        if meta and (_atual is None or meta.get("versao") != _atual.versao):
+            pasta = os.path.join(SEGMENTO_DIR, "versoes", meta["versao"])
+            if os.path.isdir(pasta):
+                _atual = Segmento(pasta, meta)
+        return _atual
+
+
+def do_segmento(nome, montar=None):
+    """
+    Decorador para loaders sem argumentos: no modo segmento, devolve o dataset
+    publicado pelo carregador (anexado por mmap, compartilhado entre sessões e
+    somente leitura) sem baixar nem parsear nada; senão, ou se o dataset não foi
+    publicado, chama o loader normalmente. Fica acima de `@st.cache_data`.
+    """
+    def decorador(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            seg = segmento_atual() if not args and not kwargs else None
+            if seg is not None:
+                valor = seg.dataset(nome, montar)
+                if valor is not None:
+                    return valor
+            return func(*args, **kwargs)
+
+        for attr in ("clear", "cache_clear"):
+            if hasattr(func, attr):
+                setattr(wrapper, attr, getattr(func, attr))
+        return wrapper
+    return decorador
@@ -0,0 +1,238 @@
+"""
+Sincronização incremental de planilhas do Google Sheets.
+
+A cada atualização, em vez de baixar a exportação CSV inteira, o sincronizador
+lê pela API do Sheets, num único pedido em lote, as colunas-chave (ex.:
+Reservatório + Data) de uma linha a cada PASSO_AMOSTRA, compara com a cópia
+local e baixa só as linhas a partir do primeiro bloco divergente (inserções ou
+remoções deslocam todas as amostras seguintes) mais uma janela das últimas
+linhas, onde entram as linhas novas e costumam acontecer as correções.
+
+Atualidade: a API não calcula hashes do lado do servidor, e comparar impressões
+digitais de todas as colunas exigiria baixar as próprias linhas; por isso uma
+correção anterior à janela que não muda as colunas-chave de uma linha amostrada
+não é vista pelo delta. Para que nada fique mais velho que na exportação CSV, a
+aba é relida inteira sempre que a última leitura completa tem INTERVALO_COMPLETO
+segundos (5 min, o TTL de antes) ou se o cabeçalho muda; entre duas leituras
+completas, os deltas baratos (a cada minuto, pelo TTL do loader) trazem antes as
+linhas novas e as correções recentes. Sem credenciais, ou se a API falhar, usa a
+exportação CSV completa, baixada no máximo a cada INTERVALO_COMPLETO segundos.
+
+A cópia local (cabeçalho e linhas como texto) fica em `.cache/sync/<nome>.json`,
+e o DataFrame é montado com `pd.read_csv` sobre ela, com os mesmos tipos da
+leitura direta do CSV. A cópia guarda também uma impressão digital de cada linha
+(`impressoes_diagnostico`), usada apenas para contar no log as linhas alteradas
+em cada sincronização: ela não participa da escolha do que é baixado.
+"""
+import io
+import os
+import csv
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import NamedTuple
+
+import pandas as pd
+
+from utils import conexoes
+from utils.cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+SYNC_DIR = os.path.join(CACHE_DIR, "sync")
+JANELA_RECHECAGEM = 200   # últimas linhas relidas a cada sincronização (correções recentes)
+PASSO_AMOSTRA = 256       # linhas entre duas amostras das colunas-chave
+INTERVALO_COMPLETO = 300  # segundos entre duas leituras completas (API ou CSV), o TTL de antes do delta
+
+
+class Sincronizacao(NamedTuple):
+    df: pd.DataFrame
+    modo: str            # "delta", "completo" (API), "csv" ou "local" (CSV baixado há menos de intervalo_completo)
+    linhas: int
+    alteradas: int       # linhas novas, alteradas ou removidas em relação à cópia local (diagnóstico)
+    celulas_baixadas: int
+
+
+def impressao_diagnostico(linha):
+    """Impressão digital (hex) de uma linha de valores; só para contar as linhas alteradas no log."""
+    return hashlib.blake2b("\x1f".join(linha).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def coluna_a1(n):
+    """Letra(s) da n-ésima coluna (1 → A, 27 → AA)."""
+    letras = ""
+    while n > 0:
+        n, resto = divmod(n - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+class FonteSheets:
+    """
+    Leitura por intervalos A1 de uma aba pela API do Sheets (gspread). Qualquer
+    objeto com `valores(intervalo)` e `valores_lote(intervalos)` (listas de
+    linhas de texto, como a API devolve) serve de fonte.
+    """
+
+    def __init__(self, abrir_aba):
+        self._abrir_aba = abrir_aba
+
+    def valores(self, intervalo):
+        return self._abrir_aba().get_values(intervalo)
+
+    def valores_lote(self, intervalos):
+        return [list(v) for v in self._abrir_aba().batch_get(intervalos)]
+
+
+def fonte_de_secrets(planilha_id, indice_aba=0, secao="gcp_service_account"):
+    """`FonteSheets` com a conta de serviço de `st.secrets`, ou None se não houver credenciais."""
+    import streamlit as st
+    try:
+        credenciais = dict(st.secrets[secao])
+    except Exception:
+        return None
+    return FonteSheets(lambda: conexoes.cliente_gspread(credenciais).open_by_key(planilha_id).get_worksheet(indice_aba))
+
+
+class SincronizadorPlanilha:
+    """Mantém a cópia local de uma aba e a atualiza por delta (API) ou por CSV completo."""
+
+    def __init__(self, nome, url_csv, fonte=None, colunas_chave=2, passo=PASSO_AMOSTRA,
+                 janela=JANELA_RECHECAGEM, intervalo_completo=INTERVALO_COMPLETO, pasta=None):
+        self.nome = nome
+        self.url_csv = url_csv
+        self.fonte = fonte
+        self.colunas_chave = colunas_chave
+        self.passo = passo
+        self.janela = janela
+        self.intervalo_completo = intervalo_completo
+        self.pasta = pasta or SYNC_DIR
+        self._lock = threading.Lock()
+
+    # ---------- cópia local ----------
+    def _caminho(self):
+        return os.path.join(self.pasta, f"{self.nome}.json")
+
+    def ler_estado(self):
+        try:
+            with open(self._caminho(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _completo_recente(self, estado):
+        """Se a última leitura completa (API ou CSV) tem menos de `intervalo_completo` segundos."""
+        return bool(estado) and time.time() - estado.get("completo_em", 0) < self.intervalo_completo
+
+    def _gravar_estado(self, estado):
+        os.makedirs(self.pasta, exist_ok=True)
+        tmp = f"{self._caminho()}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(estado, f, ensure_ascii=False)
+        os.replace(tmp, self._caminho())
+
+    # ---------- leituras ----------
+    @staticmethod
+    def _completar(linhas, largura):
+        # A API corta as células vazias do fim de cada linha
+        return [list(l) + [""] * (largura - len(l)) for l in linhas]
+
+    def _linhas_api(self, intervalo, largura):
+        return self._completar(self.fonte.valores(intervalo), largura)
+
+    def _primeira_divergencia(self, locais, k):
+        """
+        Índice a partir do qual a cópia local pode estar desatualizada, comparando as
+        colunas-chave de uma linha a cada `passo` (um pedido em lote). Devolve também
+        as células baixadas.
+        """
+        amostras = list(range(0, len(locais), self.passo))
+        if not amostras:
+            return 0, 0
+        col = coluna_a1(k)
+        remotas = self.fonte.valores_lote([f"A{i + 2}:{col}{i + 2}" for i in amostras])
+        anterior = 0
+        for i, valores in zip(amostras, remotas):
+            remota = self._completar(valores, k)[0] if valores else [""] * k
+            if remota != locais[i][:k]:
+                return anterior, k * len(amostras)
+            anterior = i + 1
+        return len(locais), k * len(amostras)
+
+    def _delta(self, estado, forcar_completo=False):
+        cabecalho = self.fonte.valores("1:1")
+        cabecalho = cabecalho[0] if cabecalho else []
+        if not cabecalho:
+            raise ValueError("aba sem cabeçalho")
+        largura = len(cabecalho)
+        ultima = coluna_a1(largura)
+
+        completo = (forcar_completo or estado is None or estado.get("cabecalho") != cabecalho
+                    or not self._completo_recente(estado))
+        if completo:
+            linhas = self._linhas_api(f"A2:{ultima}", largura)
+            return cabecalho, linhas, 0, "completo", largura * (len(linhas) + 1)
+
+        locais = estado["linhas"]
+        inicio, amostradas = self._primeira_divergencia(locais, min(self.colunas_chave, largura))
+        inicio = min(inicio, max(len(locais) - self.janela, 0))
+
+        cauda = self._linhas_api(f"A{inicio + 2}:{ultima}", largura)
+        baixadas = largura + amostradas + largura * len(cauda)
+        return cabecalho, locais[:inicio] + cauda, inicio, "delta", baixadas
+
+    def _csv(self):
+        texto = conexoes.baixar(self.url_csv).decode("utf-8")
+        linhas = list(csv.reader(io.StringIO(texto)))
+        if not linhas:
+            raise ValueError("CSV vazio")
+        cabecalho, linhas = linhas[0], linhas[1:]
+        return cabecalho, linhas, 0, "csv", sum(len(l) for l in linhas) + len(cabecalho)
+
+    # ---------- sincronização ----------
+    def sincronizar(self, completo=False):
+        """Atualiza a cópia local e devolve o DataFrame (`Sincronizacao`); `completo` força a releitura da aba."""
+        with self._lock:
+            estado = self.ler_estado()
+            resultado = None
+            if self.fonte is not None:
+                try:
+                    resultado = self._delta(estado, completo)
+                except Exception as e:
+                    logger.warning("Sincronização via API de %s falhou, usando o CSV completo: %s", self.nome, e)
+            if resultado is None and not completo and self._completo_recente(estado):
+                # Sem API, o CSV inteiro continua sendo baixado só a cada intervalo_completo
+                linhas = estado["linhas"]
+                return Sincronizacao(dataframe(estado["cabecalho"], linhas), "local", len(linhas), 0, 0)
+            cabecalho, linhas, inicio, modo, baixadas = resultado or self._csv()
+
+            # Diagnóstico: quantas linhas mudaram em relação à cópia anterior (não decide o que baixar)
+            antigas = estado.get("impressoes_diagnostico", []) if estado and estado.get("cabecalho") == cabecalho else []
+            impressoes = antigas[:inicio] + [impressao_diagnostico(l) for l in linhas[inicio:]]
+            alteradas = sum(a != b for a, b in zip(impressoes[inicio:], antigas[inicio:]))
+            alteradas += abs(len(impressoes) - len(antigas))
+
+            self._gravar_estado({
+                "cabecalho": cabecalho,
+                "linhas": linhas,
+                "impressoes_diagnostico": impressoes,
+                "sincronizacoes": (estado or {}).get("sincronizacoes", 0) + 1 if modo != "csv" else 0,
+                "modo": modo,
+                "atualizado_em": time.time(),
+                "completo_em": time.time() if modo != "delta" else estado["completo_em"],
+            })
+            logger.info("%s: %s, %d linhas, %d alteradas, %d células baixadas",
+                        self.nome, modo, len(linhas), alteradas, baixadas)
+            return Sincronizacao(dataframe(cabecalho, linhas), modo, len(linhas), alteradas, baixadas)
+
+
+def dataframe(cabecalho, linhas):
+    """DataFrame das linhas em texto, com a mesma inferência de tipos de `pd.read_csv` sobre a exportação."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    escritor.writerow(cabecalho)
+    escritor.writerows(linhas)
+    buffer.seek(0)
+    return pd.read_csv(buffer)
@@ -0,0 +1,159 @@
+import math
+from functools import lru_cache
+import numpy as np
+
+from utils.common import coordenadas_da_camada
+from utils.geo import CoordenadasCamada
+
+
+class IndiceEspacial:
+    """
+    Índice em grade sobre as features de uma FeatureCollection.
+
+    Usa as coordenadas achatadas da camada (`CoordenadasCamada`): bounding box de
+    cada feature, arestas dos polígonos (teste ponto-no-polígono) e coordenadas dos
+    pontos (vizinho mais próximo). Coordenadas sempre em (lon, lat), como no GeoJSON.
+    """
+
+    def __init__(self, camada, celulas_por_eixo=None):
+        self.camada = camada
+        self.bboxes = self.camada.bounds_por_feature()
+        self._arestas, self._off_arestas = self.camada.arestas()
+        self._poligonal = np.array([t in ("Polygon", "MultiPolygon") for t in self.camada.tipos], dtype=bool)
+
+        ini = self.camada.partes[self.camada.features[:-1]]
+        eh_ponto = np.array([t == "Point" for t in self.camada.tipos], dtype=bool) & ~np.isnan(self.bboxes[:, 0])
+        self._idx_pontos = np.flatnonzero(eh_ponto)
+        self._pontos = self.camada.coords[ini[self._idx_pontos]].astype("float64")
+
+        self._validos = ~np.isnan(self.bboxes[:, 0])
+        self._montar_grade(celulas_por_eixo or max(1, int(math.sqrt(max(len(camada), 1)))))
+
+    @classmethod
+    def de_geojson(cls, geojson_fc, celulas_por_eixo=None):
+        return cls(CoordenadasCamada.de_geojson(geojson_fc), celulas_por_eixo)
+
+    # ------------- Grade -------------
+    def _montar_grade(self, k):
+        self._grade = {}
+        if not self._validos.any():
+            self._origem = (0.0, 0.0)
+            self._passo = (1.0, 1.0)
+            return
+        minx, miny, maxx, maxy = self.total_bounds()
+        self._origem = (minx, miny)
+        self._passo = (max((maxx - minx) / k, 1e-9), max((maxy - miny) / k, 1e-9))
+        self._k = k
+        for i in np.flatnonzero(self._validos):
+            x0, y0, x1, y1 = self.bboxes[i]
+            cx0, cy0 = self._celula(x0, y0)
+            cx1, cy1 = self._celula(x1, y1)
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self._grade.setdefault((cx, cy), []).append(int(i))
+
+    def _celula(self, x, y):
+        cx = int((x - self._origem[0]) // self._passo[0])
+        cy = int((y - self._origem[1]) // self._passo[1])
+        k = getattr(self, "_k", 1)
+        return min(max(cx, 0), k - 1), min(max(cy, 0), k - 1)
+
+    def candidatos(self, lon, lat):
+        """Índices das features cujo bounding box contém o ponto."""
+        if not self._grade:
+            return []
+        x0, y0, x1, y1 = self.total_bounds()
+        if not (x0 <= lon <= x1 and y0 <= lat <= y1):
+            return []
+        lista = self._grade.get(self._celula(lon, lat), [])
+        return [i for i in lista
+                if self.bboxes[i, 0] <= lon <= self.bboxes[i, 2] and self.bboxes[i, 1] <= lat <= self.bboxes[i, 3]]
+
+    # ------------- Consultas -------------
+    def total_bounds(self):
+        """(min_lon, min_lat, max_lon, max_lat) de toda a camada."""
+        return self.camada.total_bounds()
+
+    def bounds(self):
+        """Limites no formato do Folium: [[lat_min, lon_min], [lat_max, lon_max]]."""
+        return self.camada.bounds()
+
+    def contem(self, i, lon, lat):
+        """Teste ponto-no-polígono (par-ímpar) vetorizado sobre as arestas da feature `i`."""
+        if not self._poligonal[i]:
+            return False
+        arestas = self._arestas[self._off_arestas[i]:self._off_arestas[i + 1]]
+        xi, yi, xj, yj = arestas[:, 0], arestas[:, 1], arestas[:, 2], arestas[:, 3]
+        cruza = (yi > lat) != (yj > lat)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_corte = (xj - xi) * (lat - yi) / (yj - yi) + xi
+        return bool(np.count_nonzero(cruza & (lon < x_corte)) % 2)
+
+    def localizar(self, lon, lat):
+        """Índice da feature poligonal que contém o ponto, ou None."""
+        for i in self.candidatos(lon, lat):
+            if self.contem(i, lon, lat):
+                return i
+        return None
+
+    def localizar_varios(self, lons, lats):
+        """Versão em lote de `localizar`; retorna array de índices (-1 quando fora)."""
+        lons = np.asarray(lons, dtype="float64")
+        lats = np.asarray(lats, dtype="float64")
+        saida = np.full(len(lons), -1, dtype="int64")
+        for j, (lon, lat) in enumerate(zip(lons, lats)):
+            if np.isnan(lon) or np.isnan(lat):
+                continue
+            i = self.localizar(lon, lat)
+            if i is not None:
+                saida[j] = i
+        return saida
+
+    def propriedade(self, i, campo, padrao=None):
+        if i is None or i < 0:
+            return padrao
+        return self.camada.propriedades[i].get(campo, padrao)
+
+    def mais_proximos(self, lons, lats, k=1):
+        """
+        Para cada ponto de consulta, os `k` pontos da camada mais próximos
+        (distância em km pela fórmula do haversine). Retorna (indices, distancias).
+        """
+        lons = np.atleast_1d(np.asarray(lons, dtype="float64"))
+        lats = np.atleast_1d(np.asarray(lats, dtype="float64"))
+        if len(self._pontos) == 0:
+            return np.empty((len(lons), 0), dtype="int64"), np.empty((len(lons), 0))
+        dist = distancia_km(lons[:, None], lats[:, None], self._pontos[None, :, 0], self._pontos[None, :, 1])
+        k = min(k, dist.shape[1])
+        ordem = np.argsort(dist, axis=1)[:, :k]
+        return self._idx_pontos[ordem], np.take_along_axis(dist, ordem, axis=1)
+
+    def mais_proximo(self, lon, lat):
+        """Índice e distância (km) do ponto da camada mais próximo, ou (None, None)."""
+        idx, dist = self.mais_proximos([lon], [lat], k=1)
+        if idx.shape[1] == 0:
+            return None, None
+        return int(idx[0, 0]), float(dist[0, 0])
+
+    @classmethod
+    def de_pontos(cls, lons, lats, propriedades=None):
+        """Monta um índice a partir de arrays de coordenadas (ex.: colunas de um DataFrame)."""
+        propriedades = propriedades if propriedades is not None else [{}] * len(lons)
+        feats = [
+            {"type": "Feature", "properties": props, "geometry": {"type": "Point", "coordinates": [float(x), float(y)]}}
+            for x, y, props in zip(lons, lats, propriedades)
+        ]
+        return cls.de_geojson({"type": "FeatureCollection", "features": feats})
+
+
+def distancia_km(lon1, lat1, lon2, lat2):
+    """Distância do haversine (km), com broadcasting do NumPy."""
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0088 * 2 * np.arcsin(np.sqrt(a))
+
+
+@lru_cache(maxsize=None)
+def indice_da_camada(nome):
+    """Índice espacial (cacheado por processo) de uma camada de `load_geojson_data`, ex.: 'geojson_poligno'."""
+    return IndiceEspacial(coordenadas_da_camada(nome))
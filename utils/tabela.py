@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+from utils.cache import versao_dataframe
+from utils.instrumentacao import medir, tamanho_payload
+
+TAMANHOS_PAGINA = [25, 50, 100, 250]
+MAX_PERMUTACOES = 32  # (versão, coluna, sentido) guardados em memória
+
+_permutacoes = OrderedDict()
+_lock = threading.Lock()
+
+
+def permutacao_ordenada(base, coluna, ascendente, versao=None):
+    """
+    Posições de `base` ordenadas por `coluna` (estável, vazios no fim). Calculada uma
+    vez por (versão do dataset, coluna, sentido) e reaproveitada entre reruns e sessões.
+    """
+    chave = (versao or versao_dataframe(base), coluna, bool(ascendente))
+    with _lock:
+        perm = _permutacoes.get(chave)
+        if perm is not None:
+            _permutacoes.move_to_end(chave)
+            return perm
+    serie = base[coluna].reset_index(drop=True)
+    perm = serie.sort_values(ascending=ascendente, kind="stable", na_position="last").index.to_numpy(dtype=np.int64)
+    perm.setflags(write=False)
+    with _lock:
+        _permutacoes[chave] = perm
+        while len(_permutacoes) > MAX_PERMUTACOES:
+            _permutacoes.popitem(last=False)
+    return perm
+
+
+def ordem_das_linhas(df, base, coluna, ascendente, versao=None):
+    """
+    Posições de `df` (subconjunto filtrado de `base`, com os mesmos rótulos de índice)
+    na ordem de `coluna`, aproveitando a permutação já calculada para o dataset inteiro.
+    """
+    if base is None or not base.index.is_unique or coluna not in base.columns:
+        return permutacao_ordenada(df, coluna, ascendente)
+    em_base = base.index.get_indexer(df.index)
+    if (em_base < 0).any():
+        return permutacao_ordenada(df, coluna, ascendente)
+    linha_em_df = np.full(len(base), -1, dtype=np.int64)
+    linha_em_df[em_base] = np.arange(len(df))
+    ordem = linha_em_df[permutacao_ordenada(base, coluna, ascendente, versao)]
+    return ordem[ordem >= 0]
+
+
+def tabela_paginada(df, key, base=None, versao=None, ordenar_por=None, ascendente=True, tamanho_pagina=50, **kwargs_dataframe):
+    """
+    Mostra `df` em páginas: só a janela da página atual é enviada ao navegador.
+    Com `base` (o dataset completo de onde `df` foi filtrado) a ordenação usa as
+    permutações em cache do dataset inteiro; `versao` identifica esse dataset.
+    """
+    if df is None or df.empty:
+        st.info("Sem dados para exibir.")
+        return
+
+    colunas = [c for c in df.columns if base is None or c in base.columns] or list(df.columns)
+    padrao = colunas.index(ordenar_por) if ordenar_por in colunas else 0
+    c1, c2, c3, c4 = st.columns([2, 1, 1, 1])
+    with c1:
+        coluna = st.selectbox("Ordenar por", colunas, index=padrao, key=f"{key}_ordem_col")
+    with c2:
+        sentido = st.selectbox("Ordem", ["Crescente", "Decrescente"], index=0 if ascendente else 1, key=f"{key}_ordem_dir")
+    with c3:
+        por_pagina = st.selectbox(
+            "Linhas por página", TAMANHOS_PAGINA,
+            index=TAMANHOS_PAGINA.index(tamanho_pagina) if tamanho_pagina in TAMANHOS_PAGINA else 1,
+            key=f"{key}_por_pagina",
+        )
+    n_paginas = max(1, -(-len(df) // por_pagina))
+    chave_pagina = f"{key}_pagina"
+    if st.session_state.get(chave_pagina, 1) > n_paginas:
+        st.session_state[chave_pagina] = 1  # filtros mudaram e a página deixou de existir
+    with c4:
+        pagina = st.number_input("Página", min_value=1, max_value=n_paginas, step=1, key=chave_pagina)
+
+    if versao is None and base is not None:
+        versao = base.attrs.get("versao")  # carimbada pelo loader, evita refazer o hash a cada rerun
+    ordem = ordem_das_linhas(df, base, coluna, sentido == "Crescente", versao)
+    inicio = (int(pagina) - 1) * por_pagina
+    janela = df.iloc[ordem[inicio:inicio + por_pagina]]
+    with medir("tabela paginada", bytes=tamanho_payload(janela)):
+        st.dataframe(janela, **kwargs_dataframe)
+    st.caption(f"Linhas {inicio + 1}–{inicio + len(janela)} de {len(df)} · página {int(pagina)} de {n_paginas}")